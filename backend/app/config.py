@@ -63,10 +63,107 @@ class Config:
     EASTMONEY_API_URL = "http://fundgz.1234567.com.cn/js/{code}.js"
     EASTMONEY_DETAILED_API_URL = "http://fund.eastmoney.com/pingzhongdata/{code}.js"
     EASTMONEY_ALL_FUNDS_API_URL = "http://fund.eastmoney.com/js/fundcode_search.js"
+    EASTMONEY_LSJZ_API_URL = "http://api.fund.eastmoney.com/f10/lsjz"
+
+    # Upstream HTTP (shared pooled client, see services/http_client.py)
+    UPSTREAM_TIMEOUTS = {          # seconds, per source
+        "eastmoney": 5.0,
+        "sina": 5.0,
+        "pingzhong": 10.0,         # multi-hundred-KB script
+        "fundlist": 20.0,          # fundcode_search.js, full fund list
+        "lsjz": 8.0,               # paged NAV history
+    }
+    UPSTREAM_DEFAULT_TIMEOUT = 5.0
+    UPSTREAM_RETRIES = 2           # retries on network errors / 5xx / 429
+    UPSTREAM_RETRY_BACKOFF = 0.3   # base seconds, exponential with full jitter
+    UPSTREAM_MAX_CONNECTIONS = 32  # per source
+    UPSTREAM_MAX_KEEPALIVE = 16    # idle keep-alive connections per source
+
+    # Source Health
+    CIRCUIT_FAILURE_THRESHOLD = 5  # consecutive failed calls before a source is skipped
+    CIRCUIT_COOLDOWN = 30          # seconds a tripped source is skipped before a trial call
+    SOURCE_LATENCY_WINDOW = 200    # recent calls kept per source for p50/p95
+
+    # Hedging: ask Sina for estimates Eastmoney has not returned within its
+    # recent p95 latency (clamped), or VALUATION_HEDGE_DELAY until enough samples
+    VALUATION_HEDGE_DELAY = float(os.getenv("VALUATION_HEDGE_DELAY", "1.0"))
+    VALUATION_HEDGE_PERCENTILE = 95
+    VALUATION_HEDGE_MIN_SAMPLES = 20
+    VALUATION_HEDGE_DELAY_MIN = 0.2
+    VALUATION_HEDGE_DELAY_MAX = 3.0
 
     # Update Intervals
     FUND_LIST_UPDATE_INTERVAL = 86400  # 24 hours
+    FUND_LIST_SOURCE = os.getenv("FUND_LIST_SOURCE", "eastmoney")  # or "akshare"
+    FUND_LIST_MIN_RATIO = 0.5          # skip deletions if a sync returns fewer rows than this share
     STOCK_SPOT_CACHE_DURATION = 60     # 1 minute (for holdings calculation)
+    DETAIL_STATIC_CACHE_TTL = 3600     # PingZhong data / technical indicators
+    NAV_PUBLISH_HOUR = 19              # NAVs of a trading day appear in the evening
+    NAV_RECHECK_INTERVAL = 1800        # min seconds between upstream checks for a late NAV
+    NAV_REFETCH_DAYS = 7               # stored days re-requested per sync, to pick up upstream corrections
+    LSJZ_PAGE_SIZE = 20                # lsjz API page size
+    LSJZ_MAX_PAGES = 10                # larger gaps reload the full history instead
+    ROLLING_WINDOW = 250               # NAVs in the rolling indicator window (~1 year)
+    FUND_METRICS_HOUR = 21             # nightly fund_metrics refresh (CST), after most NAVs are out
+    NAV_STORE_ENABLED = os.getenv("NAV_STORE_ENABLED", "true").lower() in ("1", "true", "yes")
+    NAV_STORE_DIR = os.getenv("NAV_STORE_DIR", "")  # default: "nav" next to the database
+    NAV_STORE_MAX_OPEN = 512           # memory-mapped funds kept open (one fd each)
+    HOLDINGS_REFRESH_INTERVAL = 86400  # re-check tracked funds for a new report daily
+    HOLDINGS_REFRESH_BATCH = 20        # max funds refreshed per scheduler run
+
+    # Batch Valuation
+    VALUATION_BATCH_MAX_CODES = 200    # max codes per /api/funds/valuations call
+    VALUATION_BATCH_WORKERS = 8        # concurrent Eastmoney requests per batch
+    SINA_BATCH_SIZE = 80               # max symbols per Sina list= request
+    SINA_MAX_URL_LENGTH = 1000         # Sina rejects longer list= URLs
+    STOCK_QUOTE_CACHE_MAX_SIZE = 4096  # stock symbols kept in the quote cache
+
+    # Holdings Estimator (fallback when both upstreams fail)
+    ESTIMATOR_MATRIX_TTL = 600         # rebuild the weight matrix from fund_holdings every 10 min
+    ESTIMATOR_MIN_COVERAGE = 0.2       # min quoted holdings weight (fraction of NAV) to publish
+
+    # Worker processes for CPU-bound batch work (screener, backtests); <= 1 computes inline
+    PROCESS_POOL_WORKERS = int(os.getenv("PROCESS_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+    # Screener (GET /api/screener)
+    SCREENER_CACHE_TTL = 900           # metric table per period
+    SCREENER_PARALLEL_MIN_FUNDS = 2000 # smaller universes are computed inline
+    SCREENER_MAX_STALE_DAYS = 10       # skip funds whose last NAV is older than this
+    SCREENER_MIN_COVERAGE = 0.9        # min share of the period's dates a fund must have NAVs for
+
+    # Portfolio risk (GET /api/account/risk)
+    RISK_DEFAULT_DAYS = 365            # calendar days of daily returns
+    RISK_MAX_DAYS = 365 * 5
+    RISK_MIN_COVERAGE = 0.5            # funds with NAVs on fewer of the window's dates are excluded
+    RISK_CACHE_TTL = 86400             # keys include each fund's last NAV date
+
+    # DCA backtests (POST /api/backtest/dca)
+    BACKTEST_MAX_FUNDS = 200
+    BACKTEST_MAX_SCHEDULES = 24
+    BACKTEST_MAX_CURVE_POINTS = 1000
+    BACKTEST_PARALLEL_MIN_FUNDS = 8    # fewer funds are simulated inline
+
+    # Equity curve (GET /api/account/equity)
+    EQUITY_CHECKPOINT_INTERVAL = 20    # NAV dates between replay checkpoints
+    EQUITY_MAX_POINTS = 1000
+
+    # Responses smaller than this are sent uncompressed
+    GZIP_MIN_SIZE = 1024
+
+    # History charts: upper bound for ?points= downsampling
+    HISTORY_MAX_POINTS = 5000
+
+    # Fund Search: serve /api/search from an in-memory index (rebuilt after each fund list sync)
+    SEARCH_INDEX_IN_MEMORY = os.getenv("SEARCH_INDEX_IN_MEMORY", "true").lower() in ("1", "true", "yes")
+
+    # Valuation Stream (SSE, seconds)
+    STREAM_REFRESH_INTERVAL = 10       # one upstream refresh per tick for all clients
+    STREAM_KEEPALIVE_INTERVAL = 15
+
+    # Valuation Cache (seconds)
+    VALUATION_CACHE_TTL_INTRADAY = int(os.getenv("VALUATION_CACHE_TTL_INTRADAY", "10"))
+    VALUATION_CACHE_TTL_CLOSED = int(os.getenv("VALUATION_CACHE_TTL_CLOSED", "1800"))
+    VALUATION_CACHE_MAX_SIZE = int(os.getenv("VALUATION_CACHE_MAX_SIZE", "2048"))
 
     # AI Configuration - 动态读取
     OPENAI_API_KEY = _get_setting("OPENAI_API_KEY", "")
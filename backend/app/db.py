@@ -17,6 +17,44 @@ def get_db_connection():
     conn.execute("PRAGMA journal_mode=WAL")
     return conn
 
+def _ensure_search_index(cursor):
+    """
+    FTS5 trigram index over funds (code, name, pinyin initials), kept in sync
+    with the funds table by triggers. Skipped when SQLite lacks FTS5/trigram
+    (< 3.34); search then falls back to LIKE.
+    """
+    exists = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'funds_fts'"
+    ).fetchone()
+    if exists:
+        return
+    try:
+        cursor.execute("""
+            CREATE VIRTUAL TABLE funds_fts USING fts5(
+                code, name, pinyin,
+                content='funds', content_rowid='rowid', tokenize='trigram'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        logger.warning(f"FTS5 trigram index unavailable, search uses LIKE: {e}")
+        return
+
+    cursor.executescript("""
+        CREATE TRIGGER IF NOT EXISTS funds_fts_ai AFTER INSERT ON funds BEGIN
+            INSERT INTO funds_fts (rowid, code, name, pinyin) VALUES (new.rowid, new.code, new.name, new.pinyin);
+        END;
+        CREATE TRIGGER IF NOT EXISTS funds_fts_ad AFTER DELETE ON funds BEGIN
+            INSERT INTO funds_fts (funds_fts, rowid, code, name, pinyin) VALUES ('delete', old.rowid, old.code, old.name, old.pinyin);
+        END;
+        CREATE TRIGGER IF NOT EXISTS funds_fts_au AFTER UPDATE OF code, name, pinyin ON funds BEGIN
+            INSERT INTO funds_fts (funds_fts, rowid, code, name, pinyin) VALUES ('delete', old.rowid, old.code, old.name, old.pinyin);
+            INSERT INTO funds_fts (rowid, code, name, pinyin) VALUES (new.rowid, new.code, new.name, new.pinyin);
+        END;
+    """)
+    cursor.execute("INSERT INTO funds_fts (funds_fts) VALUES ('rebuild')")
+    logger.info("Built fund search index")
+
+
 def init_db():
     """Initialize the database schema with migration support."""
     conn = get_db_connection()
@@ -136,12 +174,164 @@ def init_db():
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_fund_history_code ON fund_history(code);")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_fund_history_date ON fund_history(date);")
 
+    # NAV history sync state - last stored date and last upstream check per fund
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS fund_history_sync (
+            code TEXT PRIMARY KEY,
+            last_date TEXT,
+            checked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Rolling indicator state - running sums over the last ROLLING_WINDOW NAVs per fund
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS fund_rolling_state (
+            code TEXT PRIMARY KEY,
+            last_date TEXT NOT NULL,
+            start_date TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            first_nav REAL NOT NULL,
+            last_nav REAL NOT NULL,
+            sum_r REAL NOT NULL,
+            sum_r2 REAL NOT NULL,
+            peak_nav REAL NOT NULL,
+            peak_date TEXT NOT NULL,
+            max_drawdown REAL NOT NULL,
+            mdd_peak_date TEXT NOT NULL,
+            ath_nav REAL NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Rolling series - one row per NAV date: rolling Sharpe and drawdown from the all-time high
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS fund_rolling_series (
+            code TEXT NOT NULL,
+            date TEXT NOT NULL,
+            sharpe REAL,
+            drawdown REAL NOT NULL,
+            PRIMARY KEY (code, date)
+        ) WITHOUT ROWID
+    """)
+
+    # Materialized indicators - refreshed nightly for held and subscribed funds (fractions)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS fund_metrics (
+            code TEXT PRIMARY KEY,
+            as_of TEXT NOT NULL,
+            return_1m REAL,
+            return_3m REAL,
+            return_6m REAL,
+            return_1y REAL,
+            annual_return REAL,
+            volatility REAL,
+            sharpe REAL,
+            max_drawdown REAL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Portfolio equity curve replayed from the transaction ledger (one row per NAV date)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS equity_curve (
+            date TEXT PRIMARY KEY,
+            value REAL NOT NULL,
+            net_invested REAL NOT NULL,
+            pnl REAL NOT NULL
+        ) WITHOUT ROWID
+    """)
+
+    # Equity replay checkpoints - shares per fund and net invested at the end of a date
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS equity_checkpoints (
+            date TEXT PRIMARY KEY,
+            holdings TEXT NOT NULL,
+            net_invested REAL NOT NULL
+        )
+    """)
+
+    # Equity replay marks - ledger and NAV dates already reflected in equity_curve
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS equity_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            ledger_applied_at TEXT,
+            ledger_count INTEGER NOT NULL DEFAULT 0,
+            nav_marks TEXT NOT NULL DEFAULT '{}',
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Fund holdings table - disclosed stock holdings per report period (e.g. 2024Q4)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS fund_holdings (
+            code TEXT NOT NULL,
+            report_period TEXT NOT NULL,
+            stock_code TEXT NOT NULL,
+            stock_name TEXT,
+            percent REAL NOT NULL DEFAULT 0.0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (code, report_period, stock_code)
+        )
+    """)
+
+    # Holdings sync state - latest report period and last check per fund
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS fund_holdings_sync (
+            code TEXT PRIMARY KEY,
+            report_period TEXT,
+            checked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
     # Migration: Drop old incompatible tables
     if current_version < 1:
         logger.info("Running migration: dropping old incompatible tables")
         cursor.execute("DROP TABLE IF EXISTS valuation_accuracy")
         cursor.execute("INSERT OR IGNORE INTO schema_version (version) VALUES (1)")
 
+    # Migration: persisted sector classification per fund
+    # (NULL = not classified yet, '' = no major category matched)
+    if current_version < 2:
+        logger.info("Running migration: adding funds.sector")
+        columns = {row["name"] for row in cursor.execute("PRAGMA table_info(funds)")}
+        if "sector" not in columns:
+            cursor.execute("ALTER TABLE funds ADD COLUMN sector TEXT")
+        from .services.classifier import classify_sector
+        rows = cursor.execute("SELECT code, name FROM funds WHERE sector IS NULL").fetchall()
+        cursor.executemany(
+            "UPDATE funds SET sector = ? WHERE code = ?",
+            [(classify_sector(r["name"]) or "", r["code"]) for r in rows]
+        )
+        cursor.execute("INSERT OR IGNORE INTO schema_version (version) VALUES (2)")
+
+    # Migration: pinyin initials for search (backfilled by a fund list sync at startup)
+    if current_version < 3:
+        logger.info("Running migration: adding funds.pinyin")
+        columns = {row["name"] for row in cursor.execute("PRAGMA table_info(funds)")}
+        if "pinyin" not in columns:
+            cursor.execute("ALTER TABLE funds ADD COLUMN pinyin TEXT")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_funds_pinyin ON funds(pinyin)")
+        cursor.execute("INSERT OR IGNORE INTO schema_version (version) VALUES (3)")
+
+    # Migration: content hash per fund row, so the list sync writes only diffs
+    # (NULL hashes are filled by the first sync)
+    if current_version < 4:
+        logger.info("Running migration: adding funds.content_hash")
+        columns = {row["name"] for row in cursor.execute("PRAGMA table_info(funds)")}
+        if "content_hash" not in columns:
+            cursor.execute("ALTER TABLE funds ADD COLUMN content_hash TEXT")
+        cursor.execute("INSERT OR IGNORE INTO schema_version (version) VALUES (4)")
+
+    # Migration: NAV history revision, bumped when upstream corrects a stored NAV
+    if current_version < 5:
+        logger.info("Running migration: adding fund_history_sync.revision")
+        columns = {row["name"] for row in cursor.execute("PRAGMA table_info(fund_history_sync)")}
+        if "revision" not in columns:
+            cursor.execute("ALTER TABLE fund_history_sync ADD COLUMN revision INTEGER NOT NULL DEFAULT 0")
+        cursor.execute("INSERT OR IGNORE INTO schema_version (version) VALUES (5)")
+
+    _ensure_search_index(cursor)
+
     conn.commit()
     conn.close()
     logger.info("Database initialized.")
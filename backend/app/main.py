@@ -1,5 +1,6 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 from contextlib import asynccontextmanager
@@ -7,9 +8,13 @@ import os
 import sys
 import json
 
-from .routers import funds, ai, account, settings
+from .routers import funds, ai, account, settings, system, stream, backtest
 from .db import init_db
 from .services.scheduler import start_scheduler
+from .services import http_client
+from .services.workers import shutdown_process_pool
+from .responses import ORJSONResponse
+from .config import Config
 
 # 读取版本号
 def get_version():
@@ -40,9 +45,13 @@ async def lifespan(app: FastAPI):
     start_scheduler()
     yield
     # Shutdown
-    pass
+    await http_client.aclose()
+    shutdown_process_pool()
 
-app = FastAPI(title="Fund Intraday Valuation API", lifespan=lifespan)
+app = FastAPI(title="Fund Intraday Valuation API", lifespan=lifespan, default_response_class=ORJSONResponse)
+
+# Compress large JSON bodies (full histories, positions); SSE is never compressed
+app.add_middleware(GZipMiddleware, minimum_size=Config.GZIP_MIN_SIZE)
 
 # CORS: allow all for MVP
 app.add_middleware(
@@ -58,6 +67,9 @@ app.include_router(funds.router, prefix="/api")
 app.include_router(ai.router, prefix="/api")
 app.include_router(account.router, prefix="/api")
 app.include_router(settings.router, prefix="/api")
+app.include_router(system.router, prefix="/api")
+app.include_router(stream.router, prefix="/api")
+app.include_router(backtest.router, prefix="/api")
 
 # Project info endpoint
 @app.get("/api/info")
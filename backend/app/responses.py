@@ -0,0 +1,70 @@
+"""
+Response helpers: orjson serialization and conditional GET.
+
+Polling endpoints (fund detail, history, positions) return
+`conditional_json(request, payload, etag)`: the body is serialized once with
+orjson (skipping FastAPI's jsonable_encoder pass), tagged with an ETag and
+answered with an empty 304 when the client already has that version.
+Browsers revalidate XHR/fetch requests with If-None-Match on their own.
+"""
+import hashlib
+from typing import Any, Optional
+
+import orjson
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+class ORJSONResponse(JSONResponse):
+    """Default response class: orjson instead of the stdlib encoder."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=_ORJSON_OPTIONS)
+
+
+def make_etag(*parts: Any) -> str:
+    """Weak ETag from a data version (e.g. the last NAV date plus query params)."""
+    digest = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def _etag_of_body(body: bytes) -> str:
+    return f'W/"{hashlib.sha1(body).hexdigest()[:20]}"'
+
+
+def _strip_weak(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """If-None-Match uses weak comparison (RFC 9110 13.1.2)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    target = _strip_weak(etag)
+    return any(_strip_weak(tag) == target for tag in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+def conditional_json(request: Request, payload: Any, etag: Optional[str] = None) -> Response:
+    """
+    JSON response with an ETag (the given version tag, or a hash of the
+    body) and Cache-Control: no-cache, or 304 if If-None-Match matches.
+    """
+    body = orjson.dumps(payload, option=_ORJSON_OPTIONS)
+    etag = etag or _etag_of_body(body)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": "no-cache"},
+    )
@@ -1,9 +1,13 @@
-from fastapi import APIRouter, HTTPException, Body, Query
+from fastapi import APIRouter, HTTPException, Body, Query, Request
 from pydantic import BaseModel
 from typing import Dict, Any, Optional
 
-from ..services.account import get_all_positions, upsert_position, remove_position
+from ..config import Config
+from ..services.account import load_positions_async, positions_version, build_positions, upsert_position, remove_position
+from ..services.equity import get_equity_curve
+from ..services.risk import get_account_risk
 from ..services.trade import add_position_trade, reduce_position_trade, list_transactions
+from ..responses import conditional_json, is_not_modified, make_etag, not_modified
 
 router = APIRouter()
 
@@ -23,9 +27,41 @@ class ReduceTradeModel(BaseModel):
     trade_time: Optional[str] = None
 
 @router.get("/account/positions")
-def get_positions():
+async def get_positions(request: Request):
     try:
-        return get_all_positions()
+        rows, valuations = await load_positions_async()
+        etag = make_etag("positions", positions_version(rows, valuations))
+        if is_not_modified(request, etag):
+            return not_modified(etag)
+        return conditional_json(request, build_positions(rows, valuations), etag)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/account/risk")
+def get_risk(request: Request, days: int = Query(Config.RISK_DEFAULT_DAYS, ge=30, le=Config.RISK_MAX_DAYS)):
+    """
+    Covariance/correlation of held funds, portfolio volatility and each
+    position's risk contribution over the last `days` calendar days.
+    """
+    try:
+        return conditional_json(request, get_account_risk(days))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/account/equity")
+def get_equity(
+    request: Request,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    points: Optional[int] = Query(None, ge=3, le=Config.EQUITY_MAX_POINTS),
+):
+    """
+    Daily portfolio value, net invested and PnL replayed from confirmed
+    add/reduce trades. Positions entered without trades are listed under
+    "untracked" and not included.
+    """
+    try:
+        return conditional_json(request, get_equity_curve(start, end, points))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -0,0 +1,65 @@
+import logging
+from datetime import date, time
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+
+from ..config import Config
+from ..services.backtest import FREQUENCIES, run_dca_backtest
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+class ScheduleModel(BaseModel):
+    frequency: str = "monthly"        # daily / weekly / biweekly / monthly
+    day: int = 1                      # weekday 1-5 (weekly, biweekly) or day of month 1-31
+    amount: float = Field(..., gt=0)
+    time: str = "10:00"               # order time; at or after 15:00 confirms next trading day
+
+
+class DcaBacktestModel(BaseModel):
+    codes: List[str]
+    schedules: List[ScheduleModel]
+    start: date
+    end: Optional[date] = None        # default: today
+    fee_rate: float = Field(0.0, ge=0, lt=0.1)
+    curve_points: int = Field(0, ge=0, le=Config.BACKTEST_MAX_CURVE_POINTS)
+
+
+@router.post("/backtest/dca")
+def dca_backtest(data: DcaBacktestModel):
+    """
+    Fixed-amount periodic purchases on many funds x schedules, with the same
+    T+1 confirmation as real add trades. Returns invested, final value,
+    return, XIRR and worst drawdown of value vs invested per fund and
+    schedule; curve_points > 0 adds a downsampled value curve.
+    """
+    codes = list(dict.fromkeys(c.strip() for c in data.codes if c.strip()))
+    if not codes or len(codes) > Config.BACKTEST_MAX_FUNDS:
+        raise HTTPException(status_code=400, detail=f"1-{Config.BACKTEST_MAX_FUNDS} codes required")
+    if not data.schedules or len(data.schedules) > Config.BACKTEST_MAX_SCHEDULES:
+        raise HTTPException(status_code=400, detail=f"1-{Config.BACKTEST_MAX_SCHEDULES} schedules required")
+    end = data.end or date.today()
+    if data.start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    schedules = []
+    for s in data.schedules:
+        if s.frequency not in FREQUENCIES:
+            raise HTTPException(status_code=400, detail=f"Unknown frequency: {s.frequency}")
+        max_day = 31 if s.frequency == "monthly" else 5
+        if s.frequency != "daily" and not 1 <= s.day <= max_day:
+            raise HTTPException(status_code=400, detail=f"day must be 1-{max_day} for {s.frequency}")
+        try:
+            time.fromisoformat(s.time)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid time: {s.time}")
+        schedules.append(s.model_dump())
+
+    try:
+        return run_dca_backtest(codes, schedules, data.start, end, fee_rate=data.fee_rate, curve_points=data.curve_points)
+    except Exception as e:
+        logger.error(f"DCA backtest failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,8 +1,11 @@
 import logging
-from fastapi import APIRouter, HTTPException, Query, Body
-from ..services.fund import search_funds, get_fund_intraday, get_fund_history
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Body, Request
+from ..services.fund import search_funds, get_fund_intraday, parse_detail_fields, get_fund_history, get_fund_history_series, get_history_version, get_detail_version, get_fund_rolling_series, HISTORY_FORMATS, get_combined_valuations_async, get_funds_holdings
 from ..config import Config
+from ..responses import conditional_json, is_not_modified, make_etag, not_modified
 
+from ..services.screener import screen_funds, SCREENER_PERIODS, SORT_FIELDS
 from ..services.subscription import add_subscription
 
 logger = logging.getLogger(__name__)
@@ -15,27 +18,142 @@ def search(q: str = Query(..., min_length=1)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/funds/valuations")
+async def fund_valuations(codes: str = Query(..., min_length=1, description="Comma separated fund codes")):
+    """
+    Real-time estimates for many funds in one call, for API clients and
+    scripts (the web UI gets them through /account/positions and the
+    valuation stream). Duplicate codes are dropped, the first occurrence
+    keeps its place; one item per code, in request order: `{"id": code,
+    ...estimate}`, only `id` when no source had an estimate. More than
+    VALUATION_BATCH_MAX_CODES codes is a 400.
+    """
+    code_list = list(dict.fromkeys(c.strip() for c in codes.split(",") if c.strip()))
+    if len(code_list) > Config.VALUATION_BATCH_MAX_CODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many codes (max {Config.VALUATION_BATCH_MAX_CODES})"
+        )
+    try:
+        valuations = await get_combined_valuations_async(code_list)
+        return [{"id": code, **valuations.get(code, {})} for code in code_list]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/funds/holdings")
+def funds_holdings(codes: str = Query(..., min_length=1)):
+    """
+    Holdings with live stock changes for many funds; shared stocks are quoted once.
+    """
+    code_list = list(dict.fromkeys(c.strip() for c in codes.split(",") if c.strip()))
+    if len(code_list) > Config.VALUATION_BATCH_MAX_CODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many codes (max {Config.VALUATION_BATCH_MAX_CODES})"
+        )
+    try:
+        return get_funds_holdings(code_list)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/screener")
+def screener(
+    period: str = Query("1y"),
+    sort: str = Query("sharpe"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    min_sharpe: Optional[float] = Query(None),
+    min_return: Optional[float] = Query(None, description="Period return, percent"),
+    max_volatility: Optional[float] = Query(None, description="Annualized, percent"),
+    max_drawdown: Optional[float] = Query(None, description="Max depth, percent (e.g. 20)"),
+    fund_type: Optional[str] = Query(None, alias="type"),
+    sector: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+):
+    """
+    Rank all funds with a stored NAV history by period metrics.
+    """
+    if period not in SCREENER_PERIODS:
+        raise HTTPException(status_code=400, detail=f"Unknown period: {period}")
+    if sort not in SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"Unknown sort field: {sort}")
+    try:
+        return screen_funds(
+            period=period, sort=sort, order=order,
+            min_sharpe=min_sharpe, min_return=min_return,
+            max_volatility=max_volatility, max_drawdown=max_drawdown,
+            fund_type=fund_type, sector=sector, limit=limit, offset=offset,
+        )
+    except Exception as e:
+        logger.error(f"Screener failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/fund/{fund_id}")
-def fund_detail(fund_id: str):
+def fund_detail(request: Request, fund_id: str, fields: Optional[str] = Query(None)):
+    """
+    Fund detail. `fields` limits the sections computed, e.g.
+    `?fields=estimate` for cheap polling (default: all sections).
+    The ETag is the data version (valuation time, last NAV date, holdings
+    period), so a 304 skips building the sections.
+    """
     try:
-        return get_fund_intraday(fund_id)
+        selected = parse_detail_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        etag = make_etag("detail", get_detail_version(fund_id, selected))
+        if is_not_modified(request, etag):
+            return not_modified(etag)
+        return conditional_json(request, get_fund_intraday(fund_id, selected), etag)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/fund/{fund_id}/history")
-def fund_history(fund_id: str, limit: int = 30):
+def fund_history(
+    request: Request,
+    fund_id: str,
+    limit: int = 30,
+    points: Optional[int] = Query(None, ge=3, le=Config.HISTORY_MAX_POINTS),
+    format: str = Query("records"),
+):
     """
     Get historical NAV data for charts.
+    points: downsample to at most N shape-preserving (LTTB) points.
+    format: "records" ([{date, nav}]) or "columns" ({dates: [], navs: []}).
+    The ETag is the last stored NAV date, so an unchanged history is a 304
+    without reading or serializing it.
     """
+    if format not in HISTORY_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format: {format}")
     try:
-        return get_fund_history(fund_id, limit=limit)
+        version = get_history_version(fund_id)
+        etag = make_etag("history", fund_id, version, limit, points, format) if version else None
+        if etag and is_not_modified(request, etag):
+            return not_modified(etag)
+        if points is None and format == "records":
+            payload = get_fund_history(fund_id, limit=limit)
+        else:
+            payload = get_fund_history_series(fund_id, limit=limit, points=points, fmt=format)
+        return conditional_json(request, payload, etag)
     except Exception as e:
         # Don't break UI if history fails
         print(f"History error: {e}")
         return []
 
+@router.get("/fund/{fund_id}/rolling")
+def fund_rolling(request: Request, fund_id: str, limit: int = Query(250, ge=1, le=Config.HISTORY_MAX_POINTS)):
+    """
+    Rolling 1Y Sharpe and drawdown from the all-time high, one point per NAV:
+    {dates: [], sharpe: [], drawdown: []} (sharpe is null for the first days).
+    """
+    try:
+        return conditional_json(request, get_fund_rolling_series(fund_id, limit=limit))
+    except Exception as e:
+        logger.error(f"Rolling series failed for {fund_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.post("/fund/{fund_id}/subscribe")
 def subscribe_fund(fund_id: str, data: dict = Body(...)):
     """
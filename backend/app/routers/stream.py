@@ -0,0 +1,46 @@
+import asyncio
+import json
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from ..config import Config
+from ..services.stream import get_valuation_hub
+
+router = APIRouter()
+
+@router.get("/stream/valuations")
+async def stream_valuations(request: Request, codes: str = Query(..., min_length=1)):
+    """
+    Server-Sent Events: pushes `valuations` events carrying only the
+    estimates that changed since the last push.
+    """
+    code_list = list(dict.fromkeys(c.strip() for c in codes.split(",") if c.strip()))
+    if len(code_list) > Config.VALUATION_BATCH_MAX_CODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many codes (max {Config.VALUATION_BATCH_MAX_CODES})"
+        )
+
+    hub = get_valuation_hub()
+    client = hub.subscribe(code_list)
+
+    async def events():
+        try:
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    await asyncio.wait_for(client.event.wait(), timeout=Config.STREAM_KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ": ping\n\n"
+                    continue
+                payload = json.dumps(client.drain(), ensure_ascii=False)
+                yield f"event: valuations\ndata: {payload}\n\n"
+        finally:
+            hub.unsubscribe(client)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
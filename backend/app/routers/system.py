@@ -0,0 +1,39 @@
+from fastapi import APIRouter, HTTPException
+
+from ..services.cache import get_cache_stats
+from ..services.resilience import get_source_stats
+from ..services.scheduler import fetch_and_update_funds
+from ..services.stream import get_valuation_hub
+
+router = APIRouter()
+
+@router.get("/system/cache")
+def cache_stats():
+    """
+    Hit/miss counters of the in-process caches, for tuning TTLs.
+    """
+    return get_cache_stats()
+
+@router.get("/system/sources")
+def source_stats():
+    """
+    Per upstream source: latency p50/p95, error rate and circuit breaker state.
+    """
+    return get_source_stats()
+
+@router.get("/system/stream")
+async def stream_stats():
+    """
+    Connected stream clients and the unique codes refreshed per tick.
+    """
+    return get_valuation_hub().stats()
+
+@router.post("/system/funds/sync")
+def sync_funds():
+    """
+    Sync the fund list now; returns inserted/updated/deleted/unchanged counts.
+    """
+    counts = fetch_and_update_funds()
+    if counts is None:
+        raise HTTPException(status_code=502, detail="Fund list sync failed")
+    return counts
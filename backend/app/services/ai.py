@@ -10,7 +10,8 @@ from langchain_core.output_parsers import StrOutputParser
 
 from ..config import Config
 from .prompts import LINUS_FINANCIAL_ANALYSIS_PROMPT
-from .fund import get_fund_history, _calculate_technical_indicators
+from .fund import get_fund_history, get_nav_arrays, _calculate_technical_indicators, get_stored_indicators, get_current_metrics
+from .fund_metrics import returns_from_metrics
 
 
 class AIService:
@@ -106,7 +107,14 @@ class AIService:
         indicators = self._calculate_indicators(history[:30] if len(history) >= 30 else history)
 
         # Calculate technical indicators (Sharpe, Volatility, Max Drawdown)
-        technical_indicators = _calculate_technical_indicators(history)
+        # Precomputed (nightly fund_metrics / rolling state); computed here only as a fallback
+        technical_indicators = get_stored_indicators(fund_id)
+        if technical_indicators is None:
+            arrays = get_nav_arrays(fund_id)
+            technical_indicators = _calculate_technical_indicators(arrays[1][-250:] if arrays is not None else history)
+        metrics = get_current_metrics(fund_id)
+        if metrics:
+            technical_indicators = {**technical_indicators, "period_returns": returns_from_metrics(metrics)}
 
         # 1.5 Data Consistency Check
         consistency_note = ""
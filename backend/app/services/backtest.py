@@ -0,0 +1,262 @@
+"""
+DCA (定投) backtests on stored NAV histories.
+
+A schedule is a fixed amount bought every day / week / two weeks / month
+at a given order time. Order times are turned into confirmation dates once
+per schedule with get_confirm_date (same T+1 rule as real add trades:
+before 15:00 on a trading day -> that day's NAV, otherwise the next
+trading day's); those dates are shared by every fund. The calendar only
+knows weekends, so an order confirming on a holiday takes the next
+published NAV.
+
+Per fund, all schedules are simulated at once over (dates x schedules)
+matrices: shares bought per confirmation date are scattered into the
+matrix and cumulated, so the daily value and invested curves need no
+per-day loop. The money-weighted return (XIRR) is solved by a Newton
+iteration vectorized over schedules. Funds are spread across the shared
+process pool when there are enough of them.
+"""
+import logging
+from datetime import date, datetime, time as dtime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..config import Config
+from ..db import get_db_connection
+from . import nav_store
+from .downsample import lttb_indices
+from .nav_history import sync_fund_history
+from .trading_calendar import get_confirm_date, is_trading_day
+from .workers import get_process_pool
+
+logger = logging.getLogger(__name__)
+
+FREQUENCIES = ("daily", "weekly", "biweekly", "monthly")
+
+
+def _order_dates(frequency: str, day: int, start: date, end: date) -> List[date]:
+    """
+    Order dates of a schedule in [start, end]. `day` is the weekday (1=Mon)
+    for weekly/biweekly, the day of month for monthly (clamped to the
+    month's length); daily orders are placed on trading days only.
+    """
+    dates: List[date] = []
+    if frequency == "daily":
+        d = start
+        while d <= end:
+            if is_trading_day(d):
+                dates.append(d)
+            d += timedelta(days=1)
+    elif frequency in ("weekly", "biweekly"):
+        d = start + timedelta(days=(day - 1 - start.weekday()) % 7)
+        step = timedelta(days=7 if frequency == "weekly" else 14)
+        while d <= end:
+            dates.append(d)
+            d += step
+    else:
+        y, m = start.year, start.month
+        while True:
+            next_month = date(y + m // 12, m % 12 + 1, 1)
+            d = date(y, m, min(day, (next_month - timedelta(days=1)).day))
+            if d > end:
+                break
+            if d >= start:
+                dates.append(d)
+            y, m = next_month.year, next_month.month
+    return dates
+
+
+def _epoch_day(d: date) -> int:
+    return (d - date(1970, 1, 1)).days
+
+
+def confirm_days(schedule: Dict[str, Any], start: date, end: date) -> np.ndarray:
+    """Confirmation dates (epoch days) of a schedule's orders, via get_confirm_date."""
+    order_time = dtime.fromisoformat(schedule["time"])
+    return np.array([
+        _epoch_day(get_confirm_date(datetime.combine(d, order_time)))
+        for d in _order_dates(schedule["frequency"], schedule["day"], start, end)
+    ], dtype=np.int64)
+
+
+def _xirr(flows: np.ndarray, years: np.ndarray, iterations: int = 100) -> np.ndarray:
+    """
+    Per row, the annual rate r with sum(flows * (1 + r) ** years) = 0, i.e.
+    every flow compounded to the last day (`years` before it) nets to zero.
+    Newton, vectorized over rows; zero-padded flows are ignored. NaN where
+    it does not converge, and for rows without both an outflow and an
+    inflow (no rate exists, e.g. a final value of zero).
+    """
+    rate = np.full(flows.shape[0], 0.1)
+    done = np.zeros(flows.shape[0], dtype=bool)
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        for _ in range(iterations):
+            growth = (1 + rate[:, None]) ** years
+            f = np.sum(flows * growth, axis=1)
+            df = np.sum(years * flows * growth / (1 + rate[:, None]), axis=1)
+            step = np.where(done, 0.0, f / df)
+            rate = np.maximum(rate - step, -0.9999)
+            done |= np.abs(step) < 1e-9
+            if done.all():
+                break
+        # A small step is not enough: Newton can stall on the -99.99% floor
+        residual = np.abs(np.sum(flows * (1 + rate[:, None]) ** years, axis=1))
+    solvable = np.any(flows > 0, axis=1) & np.any(flows < 0, axis=1)
+    converged = done & solvable & np.isfinite(rate) & (residual <= 1e-6 * np.sum(np.abs(flows), axis=1))
+    return np.where(converged, rate, np.nan)
+
+
+def _nan_to_none(x: float, digits: int) -> Optional[float]:
+    return None if not np.isfinite(x) else round(float(x), digits)
+
+
+def backtest_fund(
+    days: np.ndarray,
+    navs: np.ndarray,
+    launch_day: int,
+    schedule_days: List[np.ndarray],
+    amounts: np.ndarray,
+    fee_rate: float,
+    curve_points: int = 0,
+) -> List[Dict[str, Any]]:
+    """
+    Simulate every schedule on one fund's NAVs within the backtest range
+    (`launch_day` is its first NAV ever: earlier orders are skipped).
+    Returns one summary per schedule (amounts in CNY, return/xirr/max_loss
+    as fractions), with a downsampled value curve when curve_points > 0.
+    """
+    n_sched = len(schedule_days)
+    if len(days) == 0:
+        return [{"orders": 0} for _ in range(n_sched)]
+
+    # Order -> index of the first NAV on or after its confirmation date
+    shares = np.zeros((len(days), n_sched))
+    invested = np.zeros((len(days), n_sched))
+    idx_list = []
+    for s, conf in enumerate(schedule_days):
+        idx = np.searchsorted(days, conf)
+        idx = idx[(conf >= launch_day) & (idx < len(days))]  # before launch / not yet confirmed
+        idx_list.append(idx)
+        # Same rounding as add_position_trade; the purchase fee is taken off the amount
+        bought = np.round(amounts[s] / (1 + fee_rate) / navs[idx], 4)
+        np.add.at(shares[:, s], idx, bought)
+        np.add.at(invested[:, s], idx, amounts[s])
+    shares = np.cumsum(shares, axis=0)
+    invested = np.cumsum(invested, axis=0)
+    value = shares * navs[:, None]
+
+    # Cash flows for XIRR: -amount per order, +final value on the last day
+    max_orders = max((len(i) for i in idx_list), default=0)
+    flows = np.zeros((n_sched, max_orders + 1))
+    years = np.zeros((n_sched, max_orders + 1))
+    for s, idx in enumerate(idx_list):
+        flows[s, :len(idx)] = -amounts[s]
+        years[s, :len(idx)] = (days[-1] - days[idx]) / 365.0
+        flows[s, -1] = value[-1, s]
+    xirr = _xirr(flows, years)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ratio = np.where(invested > 0, value / invested - 1, np.nan)
+    results = []
+    for s, idx in enumerate(idx_list):
+        total = float(invested[-1, s])
+        result = {
+            "orders": int(len(idx)),
+            "invested": round(total, 2),
+            "value": round(float(value[-1, s]), 2),
+            "profit": round(float(value[-1, s]) - total, 2),
+            "shares": round(float(shares[-1, s]), 4),
+            "return": _nan_to_none(ratio[-1, s], 6),
+            "xirr": _nan_to_none(xirr[s], 6) if len(idx) else None,
+            "max_loss": _nan_to_none(np.nanmin(ratio[:, s]), 6) if len(idx) else None,
+        }
+        if curve_points:
+            keep = lttb_indices(days.astype(np.float64), value[:, s], curve_points) if len(days) > curve_points else np.arange(len(days))
+            result["curve"] = {
+                "dates": days[keep].astype("datetime64[D]").astype(str).tolist(),
+                "value": np.round(value[keep, s], 2).tolist(),
+                "invested": np.round(invested[keep, s], 2).tolist(),
+            }
+        results.append(result)
+    return results
+
+
+def _backtest_chunk(tasks: List[Tuple]) -> List[List[Dict[str, Any]]]:
+    """Process pool entry: backtest_fund for a list of argument tuples."""
+    return [backtest_fund(*args) for args in tasks]
+
+
+def _fund_names(codes: List[str]) -> Dict[str, str]:
+    placeholders = ",".join("?" * len(codes))
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(f"SELECT code, name FROM funds WHERE code IN ({placeholders})", codes).fetchall()
+    finally:
+        conn.close()
+    return {r["code"]: r["name"] for r in rows}
+
+
+def run_dca_backtest(
+    codes: List[str],
+    schedules: List[Dict[str, Any]],
+    start: date,
+    end: date,
+    fee_rate: float = 0.0,
+    curve_points: int = 0,
+) -> Dict[str, Any]:
+    """
+    Backtest every schedule on every fund over [start, end]. Schedules are
+    dicts with frequency, day, amount and time ("HH:MM", order time).
+    Funds without NAVs in the range are listed under "missing".
+    """
+    start_day, end_day = _epoch_day(start), _epoch_day(end)
+    # Confirmation after `end` is not counted: the order would still be pending
+    schedule_days = [confirm_days(s, start, end) for s in schedules]
+    amounts = np.array([float(s["amount"]) for s in schedules])
+
+    tasks, fund_codes, missing = [], [], []
+    for code in codes:
+        try:
+            sync_fund_history(code)
+            arrays = nav_store.load_arrays(code)
+        except Exception as e:
+            logger.warning(f"Backtest history load failed for {code}: {e}")
+            arrays = None
+        if arrays is None or len(arrays[0]) == 0:
+            missing.append(code)
+            continue
+        days, navs = arrays
+        lo, hi = np.searchsorted(days, start_day), np.searchsorted(days, end_day, side="right")
+        if lo >= hi:
+            missing.append(code)
+            continue
+        # Plain copies of the range: picklable for the pool, and no map is kept open
+        tasks.append((np.array(days[lo:hi], dtype=np.int64), np.array(navs[lo:hi]), int(days[0]),
+                      schedule_days, amounts, fee_rate, curve_points))
+        fund_codes.append(code)
+
+    pool = get_process_pool() if len(tasks) >= Config.BACKTEST_PARALLEL_MIN_FUNDS else None
+    if pool is None:
+        outputs = _backtest_chunk(tasks)
+    else:
+        size = -(-len(tasks) // Config.PROCESS_POOL_WORKERS)
+        chunks = [tasks[i:i + size] for i in range(0, len(tasks), size)]
+        try:
+            outputs = [r for part in pool.map(_backtest_chunk, chunks) for r in part]
+        except Exception as e:
+            logger.warning(f"Backtest process pool failed, computing inline: {e}")
+            outputs = _backtest_chunk(tasks)
+
+    names = _fund_names(fund_codes) if fund_codes else {}
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "fee_rate": fee_rate,
+        "schedules": schedules,
+        "results": [
+            {"code": code, "name": names.get(code), "runs": runs}
+            for code, runs in zip(fund_codes, outputs)
+        ],
+        "missing": missing,
+    }
@@ -0,0 +1,233 @@
+"""
+In-process TTL cache with LRU eviction and single-flight loading.
+
+Several callers (browser tabs, the scheduler, account polling) tend to ask
+for the same key within the same second. Concurrent misses for one key share
+a single Future, so only the first caller hits the upstream.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Union
+
+Ttl = Union[float, Callable[[], float]]
+
+_registry: Dict[str, "TTLCache"] = {}
+
+
+class LoadAbandoned(Exception):
+    """The owner of an in-flight load was cancelled; waiters load the keys themselves."""
+
+
+class TTLCache:
+    def __init__(self, name: str, ttl: Ttl, max_size: int = 1024):
+        """
+        ttl: seconds, or a callable returning seconds (evaluated on each store,
+        so it can depend on the time of day).
+        """
+        self.name = name
+        self.ttl = ttl
+        self.max_size = max_size
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+        _registry[name] = self
+
+    def _ttl_seconds(self) -> float:
+        return float(self.ttl() if callable(self.ttl) else self.ttl)
+
+    def _lookup(self, key: Hashable, now: float):
+        """Must be called with the lock held."""
+        entry = self._data.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at <= now:
+            del self._data[key]
+            return False, None
+        self._data.move_to_end(key)
+        return True, value
+
+    def _store(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Must be called with the lock held."""
+        ttl = self._ttl_seconds() if ttl is None else ttl
+        if ttl <= 0:
+            return
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            found, value = self._lookup(key, time.monotonic())
+            if found:
+                self.hits += 1
+                return value
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def _claim(self, keys: Iterable[Hashable]):
+        """
+        Split keys into cached values, keys this caller must load (a Future is
+        registered for them) and keys another caller is already loading.
+        """
+        results: Dict[Hashable, Any] = {}
+        owned: Dict[Hashable, Future] = {}
+        waiting: Dict[Hashable, Future] = {}
+        with self._lock:
+            now = time.monotonic()
+            for key in keys:
+                if key in results or key in owned or key in waiting:
+                    continue
+                found, value = self._lookup(key, now)
+                if found:
+                    self.hits += 1
+                    results[key] = value
+                    continue
+                self.misses += 1
+                fut = self._inflight.get(key)
+                if fut is None:
+                    fut = Future()
+                    self._inflight[key] = fut
+                    owned[key] = fut
+                else:
+                    self.coalesced += 1
+                    waiting[key] = fut
+        return results, owned, waiting
+
+    def _settle(self, owned: Dict[Hashable, Future], loaded: Dict[Hashable, Any], results: Dict[Hashable, Any]):
+        """Store loaded values (falsy ones are not cached) and wake up waiters."""
+        with self._lock:
+            for key in owned:
+                value = loaded.get(key)
+                if value:
+                    self._store(key, value)
+                self._inflight.pop(key, None)
+        for key, fut in owned.items():
+            results[key] = loaded.get(key)
+            fut.set_result(loaded.get(key))
+
+    def _abandon(self, owned: Dict[Hashable, Future], e: BaseException):
+        """
+        Fail the waiters of a load that raised. Cancellation (a client
+        disconnect) belongs to the owner only: waiters get LoadAbandoned
+        and retry, instead of being cancelled with it.
+        """
+        if not isinstance(e, Exception):
+            error = LoadAbandoned(f"{self.name}: load abandoned ({type(e).__name__})")
+            error.__cause__ = e
+            e = error
+        with self._lock:
+            for key in owned:
+                self._inflight.pop(key, None)
+        for fut in owned.values():
+            fut.set_exception(e)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        Return the cached value, or load it. Only one loader runs per key at a
+        time; other callers wait for its result. Falsy results are not cached.
+        """
+        return self.get_many_or_load([key], lambda keys: {key: loader()}).get(key)
+
+    def get_many_or_load(
+        self,
+        keys: Iterable[Hashable],
+        loader: Callable[[List[Hashable]], Dict[Hashable, Any]],
+    ) -> Dict[Hashable, Any]:
+        """
+        Batch version of get_or_load. Keys missing from the cache and not
+        already being loaded are passed to `loader` in one call; keys another
+        caller is loading are waited for instead of fetched twice.
+        """
+        results, owned, waiting = self._claim(keys)
+        if owned:
+            try:
+                loaded = loader(list(owned)) or {}
+            except BaseException as e:
+                self._abandon(owned, e)
+                raise
+            self._settle(owned, loaded, results)
+        abandoned = []
+        for key, fut in waiting.items():
+            try:
+                results[key] = fut.result()
+            except LoadAbandoned:
+                abandoned.append(key)
+            except Exception:
+                results[key] = None
+        if abandoned:
+            results.update(self.get_many_or_load(abandoned, loader))
+        return results
+
+    async def aget_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Async version of get_or_load; shares in-flight loads with sync callers."""
+        async def load_one(keys):
+            return {key: await loader()}
+        return (await self.aget_many_or_load([key], load_one)).get(key)
+
+    async def aget_many_or_load(
+        self,
+        keys: Iterable[Hashable],
+        loader: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]],
+    ) -> Dict[Hashable, Any]:
+        """Async version of get_many_or_load."""
+        results, owned, waiting = self._claim(keys)
+        if owned:
+            try:
+                loaded = await loader(list(owned)) or {}
+            except BaseException as e:
+                self._abandon(owned, e)
+                raise
+            self._settle(owned, loaded, results)
+        abandoned = []
+        for key, fut in waiting.items():
+            try:
+                results[key] = await asyncio.wrap_future(fut)
+            except LoadAbandoned:
+                abandoned.append(key)
+            except Exception:
+                results[key] = None
+        if abandoned:
+            results.update(await self.aget_many_or_load(abandoned, loader))
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl": round(self._ttl_seconds(), 1),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "evictions": self.evictions,
+                "coalesced": self.coalesced,
+                "inflight": len(self._inflight),
+            }
+
+
+def get_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Hit/miss counters of every cache created in this process."""
+    return {name: cache.stats() for name, cache in _registry.items()}
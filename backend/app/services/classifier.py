@@ -0,0 +1,115 @@
+"""
+Sector classification of fund names.
+
+All MAJOR_CATEGORIES keywords are compiled once into an Aho-Corasick
+automaton, so a name is classified in a single left-to-right scan instead
+of one substring search per keyword. The result is persisted in
+funds.sector when the fund list is synced; request paths read the column.
+"""
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Major Sector Categories Mapping (from MaYiFund)
+MAJOR_CATEGORIES = {
+    "科技": ["人工智能", "半导体", "云计算", "5G", "光模块", "CPO", "F5G", "通信设备", "PCB", "消费电子",
+             "计算机", "软件开发", "信创", "网络安全", "IT服务", "国产软件", "计算机设备", "光通信",
+             "算力", "脑机接口", "通信", "电子", "光学光电子", "元件", "存储芯片", "第三代半导体",
+             "光刻胶", "电子化学品", "LED", "毫米波", "智能穿戴", "东数西算", "数据要素", "国资云",
+             "Web3.0", "AIGC", "AI应用", "AI手机", "AI眼镜", "DeepSeek", "TMT", "科技"],
+    "医药健康": ["医药生物", "医疗器械", "生物疫苗", "CRO", "创新药", "精准医疗", "医疗服务", "中药",
+                 "化学制药", "生物制品", "基因测序", "超级真菌"],
+    "消费": ["食品饮料", "白酒", "家用电器", "纺织服饰", "商贸零售", "新零售", "家居用品", "文娱用品",
+             "婴童", "养老产业", "体育", "教育", "在线教育", "社会服务", "轻工制造", "新消费",
+             "可选消费", "消费", "家电零部件", "智能家居"],
+    "金融": ["银行", "证券", "保险", "非银金融", "国有大型银行", "股份制银行", "城商行", "金融"],
+    "能源": ["新能源", "煤炭", "石油石化", "电力", "绿色电力", "氢能源", "储能", "锂电池", "电池",
+             "光伏设备", "风电设备", "充电桩", "固态电池", "能源", "煤炭开采", "公用事业", "锂矿"],
+    "工业制造": ["机械设备", "汽车", "新能源车", "工程机械", "高端装备", "电力设备", "专用设备",
+                 "通用设备", "自动化设备", "机器人", "人形机器人", "汽车零部件", "汽车服务",
+                 "汽车热管理", "尾气治理", "特斯拉", "无人驾驶", "智能驾驶", "电网设备", "电机",
+                 "高端制造", "工业4.0", "工业互联", "低空经济", "通用航空"],
+    "材料": ["有色金属", "黄金", "黄金股", "贵金属", "基础化工", "钢铁", "建筑材料", "稀土永磁", "小金属",
+             "工业金属", "材料", "大宗商品", "资源"],
+    "军工": ["国防军工", "航天装备", "航空装备", "航海装备", "军工电子", "军民融合", "商业航天",
+             "卫星互联网", "航母", "航空机场"],
+    "基建地产": ["建筑装饰", "房地产", "房地产开发", "房地产服务", "交通运输", "物流"],
+    "环保": ["环保", "环保设备", "环境治理", "垃圾分类", "碳中和", "可控核聚变", "液冷"],
+    "传媒": ["传媒", "游戏", "影视", "元宇宙", "超清视频", "数字孪生"],
+    "主题": ["国企改革", "一带一路", "中特估", "中字头", "并购重组", "华为", "新兴产业",
+             "国家安防", "安全主题", "农牧主题", "农林牧渔", "养殖业", "猪肉", "高端装备"],
+    "QDII": ["QDII", "全球", "纳斯达克", "标普", "美国", "德国", "日本", "越南", "印度", "海外", "恒生", "港股", "H股"],
+    "债券": ["债", "纯债", "固收", "短债", "中短债", "长债", "国债"]
+}
+
+_NO_MATCH = 1 << 30
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over (keyword, rank) pairs. `best(text)` returns
+    the lowest rank of any keyword occurring in text, i.e. the same answer as
+    checking the categories in order with `any(kw in text ...)`.
+    """
+
+    def __init__(self, keywords: Iterable[Tuple[str, int]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._rank: List[int] = [_NO_MATCH]
+        for word, rank in keywords:
+            node = 0
+            for ch in word:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._rank.append(_NO_MATCH)
+                node = nxt
+            self._rank[node] = min(self._rank[node], rank)
+        self._build_links()
+
+    def _build_links(self):
+        """
+        BFS over the trie: compute failure links, propagate the best rank of
+        suffix matches to each state and fold the links into the goto tables
+        (a full DFA, so scanning never walks failure chains).
+        """
+        goto, rank = self._goto, self._rank
+        children = [dict(row) for row in goto]
+        fail = [0] * len(goto)
+        queue = deque([0])
+        while queue:
+            node = queue.popleft()
+            for ch, child in children[node].items():
+                # goto[fail[node]] is already complete: it is shallower
+                fail[child] = goto[fail[node]].get(ch, 0) if node else 0
+                rank[child] = min(rank[child], rank[fail[child]])
+                queue.append(child)
+            if node:
+                for ch, target in goto[fail[node]].items():
+                    goto[node].setdefault(ch, target)
+
+    def best(self, text: str) -> Optional[int]:
+        goto, rank = self._goto, self._rank
+        node, best = 0, _NO_MATCH
+        for ch in text:
+            node = goto[node].get(ch, 0)
+            r = rank[node]
+            if r < best:
+                best = r
+                if best == 0:
+                    break
+        return None if best == _NO_MATCH else best
+
+
+_categories = list(MAJOR_CATEGORIES)
+_matcher = KeywordMatcher(
+    (kw, rank) for rank, keywords in enumerate(MAJOR_CATEGORIES.values()) for kw in keywords
+)
+
+
+def classify_sector(name: Optional[str]) -> Optional[str]:
+    """Major category of a fund name, or None when no keyword matches."""
+    if not name:
+        return None
+    rank = _matcher.best(name)
+    return None if rank is None else _categories[rank]
@@ -0,0 +1,50 @@
+"""
+Shape-preserving downsampling for chart series.
+
+Largest-Triangle-Three-Buckets (Steinarsson, 2013): keep the first and last
+point, split the rest into n-2 buckets and from each keep the point that
+forms the largest triangle with the previously kept point and the average
+of the next bucket. Peaks and troughs survive, unlike striding or averaging.
+"""
+import numpy as np
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n: int) -> np.ndarray:
+    """
+    Indices of the `n` points LTTB keeps (all indices if len(x) <= n; the
+    end points, first one first, if n < 3). Points with a NaN coordinate are gaps:
+    they are never kept when the series is downsampled.
+    """
+    size = len(x)
+    if n >= size:
+        return np.arange(size)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    finite = np.isfinite(x) & np.isfinite(y)
+    if not finite.all():
+        valid = np.flatnonzero(finite)
+        return valid[lttb_indices(x[valid], y[valid], n)]
+    if n < 3:
+        # No room for a bucket
+        return np.array([0, size - 1][:max(n, 0)], dtype=np.int64)
+    # Bucket boundaries over the interior points 1 .. size-2
+    edges = np.linspace(1, size - 1, n - 1).astype(np.int64)
+    keep = np.empty(n, dtype=np.int64)
+    keep[0], keep[-1] = 0, size - 1
+
+    a = 0
+    for i in range(n - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (the last point for the final bucket)
+        if i + 2 < len(edges):
+            nxt_start, nxt_end = edges[i + 1], edges[i + 2]
+            avg_x, avg_y = x[nxt_start:nxt_end].mean(), y[nxt_start:nxt_end].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        bx, by = x[start:end], y[start:end]
+        # Twice the triangle area; the constant factor does not change argmax
+        area = np.abs((x[a] - avg_x) * (by - y[a]) - (x[a] - bx) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
@@ -0,0 +1,258 @@
+"""
+Portfolio equity curve replayed from the transaction ledger.
+
+Applied add/reduce trades (confirm_nav set) are replayed against
+fund_history: on every NAV date, shares per fund times that day's NAV
+gives the portfolio value, and adds minus redemption proceeds the net
+amount invested; PnL is their difference. Rows are stored in
+equity_curve, and every EQUITY_CHECKPOINT_INTERVAL dates the shares per
+fund and net invested are saved in equity_checkpoints.
+
+An update only replays the affected tail. It starts at the earliest of:
+the confirm date of a trade applied since the last run, the day after
+the last NAV seen for each fund (new days, or NAVs published late), and
+the first trade of a fund whose stored NAVs were corrected. From
+there it resumes at the last checkpoint before that date, in one
+vectorized pass over a (dates x funds) matrix. Positions entered directly
+(without trades) are not in the ledger and therefore not in the curve;
+they are reported as "untracked".
+"""
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ..config import Config
+from ..db import get_db_connection
+from .downsample import lttb_indices
+from .screener import build_nav_matrix, load_histories
+
+logger = logging.getLogger(__name__)
+
+
+def _day(date_str: str) -> int:
+    return int(np.datetime64(date_str[:10], "D").astype(np.int64))
+
+
+def _day_str(day: int) -> str:
+    return str(np.datetime64(int(day), "D"))
+
+
+def _load_ledger() -> List[Dict[str, Any]]:
+    conn = get_db_connection()
+    try:
+        rows = conn.execute("""
+            SELECT id, code, op_type, amount_cny, shares_added, shares_redeemed, confirm_date, applied_at
+            FROM transactions
+            WHERE applied_at IS NOT NULL AND confirm_nav IS NOT NULL
+            ORDER BY confirm_date, id
+        """).fetchall()
+    finally:
+        conn.close()
+    trades = []
+    for r in rows:
+        if r["op_type"] == "add":
+            shares, cash = r["shares_added"] or 0.0, r["amount_cny"] or 0.0
+        else:
+            shares, cash = -(r["shares_redeemed"] or 0.0), -(r["amount_cny"] or 0.0)
+        trades.append({"code": r["code"], "date": r["confirm_date"][:10], "applied_at": r["applied_at"],
+                       "shares": shares, "cash": cash})
+    return trades
+
+
+def _nav_marks(codes: List[str]) -> Dict[str, Optional[str]]:
+    if not codes:
+        return {}
+    placeholders = ",".join("?" * len(codes))
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(
+            f"SELECT code, last_date, revision FROM fund_history_sync WHERE code IN ({placeholders})", codes
+        ).fetchall()
+    finally:
+        conn.close()
+    # Same form as nav_history.history_version: "<last date>[#<revision>]"
+    return {r["code"]: f"{r['last_date']}#{r['revision']}" if r["revision"] and r["last_date"] else r["last_date"]
+            for r in rows}
+
+
+def _load_state() -> Optional[Dict[str, Any]]:
+    conn = get_db_connection()
+    try:
+        row = conn.execute("SELECT * FROM equity_state WHERE id = 1").fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    return {"ledger_applied_at": row["ledger_applied_at"], "ledger_count": row["ledger_count"],
+            "nav_marks": json.loads(row["nav_marks"])}
+
+
+def _dirty_date(state: Optional[Dict[str, Any]], trades: List[Dict[str, Any]], marks: Dict[str, Optional[str]]) -> Optional[str]:
+    """Earliest date whose row may have changed since the last run ("" = everything)."""
+    if state is None:
+        return ""
+    candidates = []
+    ledger_mark = max((t["applied_at"] for t in trades), default=None)
+    if len(trades) != state["ledger_count"] or ledger_mark != state["ledger_applied_at"]:
+        mark = state["ledger_applied_at"]
+        newer = [t["date"] for t in trades if mark is None or t["applied_at"] > mark]
+        if len(trades) - len(newer) > state["ledger_count"]:
+            # Applied in the same second as the mark: replay those ties too
+            newer += [t["date"] for t in trades if t["applied_at"] == mark]
+        candidates += newer
+        if len(trades) < state["ledger_count"]:
+            candidates.append("")  # ledger shrank: rebuild
+    seen = state["nav_marks"]
+    first_trade = {}
+    for t in trades:
+        first_trade.setdefault(t["code"], t["date"])
+    for code, mark in marks.items():
+        if not mark:
+            continue
+        if not seen.get(code):
+            candidates.append(first_trade.get(code, ""))
+            continue
+        last, _, revision = mark.partition("#")
+        seen_last, _, seen_revision = seen[code].partition("#")
+        if revision != seen_revision:
+            candidates.append(first_trade.get(code, ""))  # corrected NAVs: replay the fund
+        elif last > seen_last:
+            candidates.append(_day_str(_day(seen_last) + 1))
+    return min(candidates) if candidates else None
+
+
+def _save_state(trades: List[Dict[str, Any]], marks: Dict[str, Optional[str]], conn):
+    conn.execute("""
+        INSERT OR REPLACE INTO equity_state (id, ledger_applied_at, ledger_count, nav_marks, updated_at)
+        VALUES (1, ?, ?, ?, CURRENT_TIMESTAMP)
+    """, (max((t["applied_at"] for t in trades), default=None), len(trades), json.dumps(marks)))
+
+
+def update_equity_curve(trades: Optional[List[Dict[str, Any]]] = None) -> int:
+    """
+    Bring equity_curve up to the ledger (`trades`, loaded if not given) and
+    the stored NAVs, replaying only from the last checkpoint before the
+    earliest affected date. Returns the number of curve rows (re)written.
+    """
+    if trades is None:
+        trades = _load_ledger()
+    codes = sorted({t["code"] for t in trades})
+    marks = _nav_marks(codes)
+    dirty = _dirty_date(_load_state(), trades, marks)
+    if dirty is None:
+        return 0
+
+    conn = get_db_connection()
+    try:
+        checkpoint = None
+        if dirty:
+            checkpoint = conn.execute(
+                "SELECT date, holdings, net_invested FROM equity_checkpoints WHERE date < ? ORDER BY date DESC LIMIT 1",
+                (dirty,)
+            ).fetchone()
+    finally:
+        conn.close()
+
+    if checkpoint is not None:
+        holdings = json.loads(checkpoint["holdings"])
+        invested = float(checkpoint["net_invested"])
+        start_day = _day(checkpoint["date"]) + 1
+    else:
+        holdings, invested = {}, 0.0
+        start_day = _day(trades[0]["date"]) if trades else None
+    replay = [t for t in trades if start_day is not None and _day(t["date"]) >= start_day]
+    replay_codes = sorted(set(holdings) | {t["code"] for t in replay})
+
+    rows, checkpoints = [], []
+    if replay_codes:
+        histories = load_histories(replay_codes, start_day)
+        end_day = max((int(h[0][-1]) for h in histories.values() if len(h[0])), default=start_day - 1)
+        grid, matrix_codes, navs = build_nav_matrix(histories, start_day, end_day)
+        if len(grid):
+            col = {code: j for j, code in enumerate(matrix_codes)}
+            shares = np.zeros((len(grid), len(matrix_codes)))
+            flows = np.zeros(len(grid))
+            for code, s in holdings.items():
+                if code in col:
+                    shares[0, col[code]] += s
+            for t in replay:
+                i = int(np.searchsorted(grid, _day(t["date"])))
+                if i < len(grid) and t["code"] in col:
+                    shares[i, col[t["code"]]] += t["shares"]
+                    flows[i] += t["cash"]
+            shares = np.round(np.cumsum(shares, axis=0), 4)
+            net = invested + np.cumsum(flows)
+            value = np.sum(np.where(np.isnan(navs), 0.0, navs) * shares, axis=1)
+            dates = grid.astype("datetime64[D]").astype(str).tolist()
+            rows = list(zip(dates, np.round(value, 2).tolist(), np.round(net, 2).tolist(),
+                            np.round(value - net, 2).tolist()))
+            interval = Config.EQUITY_CHECKPOINT_INTERVAL
+            for i in range(interval - 1, len(grid), interval):
+                held = {code: float(shares[i, j]) for code, j in col.items() if shares[i, j] != 0}
+                checkpoints.append((dates[i], json.dumps(held), round(float(net[i]), 2)))
+
+    conn = get_db_connection()
+    try:
+        with conn:
+            since = _day_str(start_day) if start_day is not None else ""
+            conn.execute("DELETE FROM equity_curve WHERE date >= ?", (since,))
+            conn.execute("DELETE FROM equity_checkpoints WHERE date >= ?", (since,))
+            conn.executemany("INSERT INTO equity_curve (date, value, net_invested, pnl) VALUES (?, ?, ?, ?)", rows)
+            conn.executemany("INSERT INTO equity_checkpoints (date, holdings, net_invested) VALUES (?, ?, ?)", checkpoints)
+            _save_state(trades, marks, conn)
+    finally:
+        conn.close()
+    return len(rows)
+
+
+def _untracked_positions(trades: List[Dict[str, Any]]) -> List[str]:
+    """Held funds whose current shares do not match the replayed ledger."""
+    ledger: Dict[str, float] = {}
+    for t in trades:
+        ledger[t["code"]] = ledger.get(t["code"], 0.0) + t["shares"]
+    conn = get_db_connection()
+    try:
+        rows = conn.execute("SELECT code, shares FROM positions WHERE shares > 0").fetchall()
+    finally:
+        conn.close()
+    return [r["code"] for r in rows if abs(r["shares"] - ledger.get(r["code"], 0.0)) > 1e-3]
+
+
+def get_equity_curve(start: Optional[str] = None, end: Optional[str] = None, points: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Daily portfolio value, net invested and PnL (columns), oldest first,
+    after bringing the stored curve up to date with the stored NAVs (the
+    scheduler syncs them; no upstream request is made here). `points`
+    downsamples the range (LTTB on value); daily_pnl is the change of PnL
+    since the previous stored date.
+    """
+    trades = _load_ledger()
+    update_equity_curve(trades)
+    conn = get_db_connection()
+    try:
+        rows = conn.execute("""
+            SELECT date, value, net_invested, pnl FROM equity_curve
+            WHERE date >= ? AND date <= ? ORDER BY date
+        """, (start or "", end or "9999-12-31")).fetchall()
+        prev = conn.execute(
+            "SELECT pnl FROM equity_curve WHERE date < ? ORDER BY date DESC LIMIT 1", (rows[0]["date"],)
+        ).fetchone() if rows else None
+    finally:
+        conn.close()
+
+    pnl = np.array([r["pnl"] for r in rows], dtype=np.float64)
+    daily = np.diff(pnl, prepend=prev["pnl"] if prev else 0.0)
+    keep = np.arange(len(rows))
+    if points and len(rows) > points:
+        x = np.array([_day(r["date"]) for r in rows], dtype=np.float64)
+        keep = lttb_indices(x, np.array([r["value"] for r in rows], dtype=np.float64), points)
+    return {
+        "dates": [rows[i]["date"] for i in keep],
+        "value": [rows[i]["value"] for i in keep],
+        "net_invested": [rows[i]["net_invested"] for i in keep],
+        "pnl": [rows[i]["pnl"] for i in keep],
+        "daily_pnl": np.round(daily[keep], 2).tolist(),
+        "untracked": _untracked_positions(trades),
+    }
@@ -0,0 +1,139 @@
+"""
+In-house intraday estimate from disclosed holdings.
+
+estRate(fund) = sum(weight(fund, stock) * change(stock)), computed for many
+funds at once as a sparse (funds x stocks) weight matrix times a quote vector.
+The matrix is stored in COO form (row, col, weight) and multiplied with
+np.bincount, so one quote tick re-estimates hundreds of funds in a single
+vectorized operation.
+
+The base is the last NAV before the quotes' session: once that day's NAV
+is published it already contains the move, so it must not be the base.
+
+Only disclosed holdings are covered (top 10 for Q1/Q3 reports), so the
+estimate is conservative; `coverage` reports the weight it is based on.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from ..config import Config
+from ..db import get_db_connection
+from .cache import TTLCache
+from .holdings import load_holdings_weights
+from .trading_calendar import session_date
+
+logger = logging.getLogger(__name__)
+
+
+class HoldingsMatrix:
+    def __init__(self, fund_codes: List[str], stock_codes: List[str], rows: np.ndarray, cols: np.ndarray, weights: np.ndarray):
+        self.fund_codes = fund_codes
+        self.stock_codes = stock_codes
+        self.rows = rows
+        self.cols = cols
+        self.weights = weights  # fraction of NAV (percent / 100)
+        self.coverage = np.bincount(rows, weights=weights, minlength=len(fund_codes))
+
+    @classmethod
+    def build(cls, codes: List[str]) -> "HoldingsMatrix":
+        triples = load_holdings_weights(codes)
+        fund_index = {c: i for i, c in enumerate(codes)}
+        stock_index: Dict[str, int] = {}
+        rows = np.empty(len(triples), dtype=np.int32)
+        cols = np.empty(len(triples), dtype=np.int32)
+        weights = np.empty(len(triples), dtype=np.float64)
+        for k, (fund, stock, percent) in enumerate(triples):
+            rows[k] = fund_index[fund]
+            cols[k] = stock_index.setdefault(stock, len(stock_index))
+            weights[k] = percent / 100.0
+        return cls(list(codes), list(stock_index), rows, cols, weights)
+
+    def estimate_rates(self, changes: np.ndarray) -> np.ndarray:
+        """Sparse matrix x quote vector: estimated change percent per fund."""
+        return np.bincount(self.rows, weights=self.weights * changes[self.cols], minlength=len(self.fund_codes))
+
+    def quote_vector(self, spot_map: Dict[str, float]) -> Tuple[np.ndarray, np.ndarray]:
+        """Quote vector aligned with stock_codes (missing quotes count as 0) and a found-mask."""
+        changes = np.fromiter((spot_map.get(s, np.nan) for s in self.stock_codes), dtype=np.float64, count=len(self.stock_codes))
+        found = ~np.isnan(changes)
+        return np.where(found, changes, 0.0), found
+
+
+_matrix_cache = TTLCache("estimator_matrix", ttl=Config.ESTIMATOR_MATRIX_TTL, max_size=16)
+
+
+def get_holdings_matrix(codes: List[str]) -> HoldingsMatrix:
+    key = tuple(sorted(set(codes)))
+    return _matrix_cache.get_or_load(key, lambda: HoldingsMatrix.build(list(key)))
+
+
+def _base_navs(codes: List[str], session: str) -> Dict[str, Tuple[str, float]]:
+    """Latest stored NAV (date, nav) per fund dated before `session` (YYYY-MM-DD)."""
+    if not codes:
+        return {}
+    placeholders = ",".join("?" * len(codes))
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(f"""
+            SELECT h.code, h.date, h.nav FROM fund_history h
+            JOIN (SELECT code, MAX(date) AS d FROM fund_history
+                  WHERE code IN ({placeholders}) AND date < ? GROUP BY code) m
+              ON m.code = h.code AND m.d = h.date
+        """, [*codes, session]).fetchall()
+    finally:
+        conn.close()
+    return {r["code"]: (r["date"], float(r["nav"])) for r in rows}
+
+
+def _build_estimates(matrix: HoldingsMatrix, spot_map: Dict[str, float]) -> Dict[str, Dict[str, Any]]:
+    changes, found = matrix.quote_vector(spot_map)
+    rates = matrix.estimate_rates(changes)
+    quoted = np.bincount(matrix.rows, weights=matrix.weights * found[matrix.cols], minlength=len(matrix.fund_codes))
+    navs = _base_navs(matrix.fund_codes, session_date().isoformat())
+    now = time.strftime("%Y-%m-%d %H:%M")
+
+    results = {}
+    for i, code in enumerate(matrix.fund_codes):
+        # Need a base NAV and a meaningful share of quoted holdings
+        if code not in navs or quoted[i] < Config.ESTIMATOR_MIN_COVERAGE:
+            continue
+        nav_date, nav = navs[code]
+        rate = float(rates[i])
+        results[code] = {
+            "nav": nav,
+            "estimate": round(nav * (1 + rate / 100.0), 4),
+            "estRate": round(rate, 2),
+            "time": now,
+            "source": "holdings",
+            "coverage": round(float(quoted[i]) * 100, 2),
+        }
+    return results
+
+
+async def estimate_from_holdings_async(codes: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Estimate many funds from stored holdings x live stock changes.
+    Funds without holdings or a stored NAV are left out.
+    """
+    from .fund import fetch_stock_spots_sina
+
+    if not codes:
+        return {}
+    try:
+        matrix = await asyncio.to_thread(get_holdings_matrix, codes)
+        if not matrix.stock_codes:
+            return {}
+        spot_map = await fetch_stock_spots_sina(matrix.stock_codes)
+        return await asyncio.to_thread(_build_estimates, matrix, spot_map)
+    except Exception as e:
+        logger.error(f"Holdings estimate failed: {e}")
+        return {}
+
+
+def estimate_from_holdings(codes: List[str]) -> Dict[str, Dict[str, Any]]:
+    from . import http_client
+    return http_client.run_sync(estimate_from_holdings_async(codes))
@@ -1,144 +1,345 @@
+import asyncio
 import time
 import json
 import re
 from typing import List, Dict, Any
 
-import pandas as pd
-import akshare as ak
-import requests
+import numpy as np
 
 from ..db import get_db_connection
 from ..config import Config
-
-
-# Major Sector Categories Mapping (from MaYiFund)
-MAJOR_CATEGORIES = {
-    "科技": ["人工智能", "半导体", "云计算", "5G", "光模块", "CPO", "F5G", "通信设备", "PCB", "消费电子",
-             "计算机", "软件开发", "信创", "网络安全", "IT服务", "国产软件", "计算机设备", "光通信",
-             "算力", "脑机接口", "通信", "电子", "光学光电子", "元件", "存储芯片", "第三代半导体",
-             "光刻胶", "电子化学品", "LED", "毫米波", "智能穿戴", "东数西算", "数据要素", "国资云",
-             "Web3.0", "AIGC", "AI应用", "AI手机", "AI眼镜", "DeepSeek", "TMT", "科技"],
-    "医药健康": ["医药生物", "医疗器械", "生物疫苗", "CRO", "创新药", "精准医疗", "医疗服务", "中药",
-                 "化学制药", "生物制品", "基因测序", "超级真菌"],
-    "消费": ["食品饮料", "白酒", "家用电器", "纺织服饰", "商贸零售", "新零售", "家居用品", "文娱用品",
-             "婴童", "养老产业", "体育", "教育", "在线教育", "社会服务", "轻工制造", "新消费",
-             "可选消费", "消费", "家电零部件", "智能家居"],
-    "金融": ["银行", "证券", "保险", "非银金融", "国有大型银行", "股份制银行", "城商行", "金融"],
-    "能源": ["新能源", "煤炭", "石油石化", "电力", "绿色电力", "氢能源", "储能", "锂电池", "电池",
-             "光伏设备", "风电设备", "充电桩", "固态电池", "能源", "煤炭开采", "公用事业", "锂矿"],
-    "工业制造": ["机械设备", "汽车", "新能源车", "工程机械", "高端装备", "电力设备", "专用设备",
-                 "通用设备", "自动化设备", "机器人", "人形机器人", "汽车零部件", "汽车服务",
-                 "汽车热管理", "尾气治理", "特斯拉", "无人驾驶", "智能驾驶", "电网设备", "电机",
-                 "高端制造", "工业4.0", "工业互联", "低空经济", "通用航空"],
-    "材料": ["有色金属", "黄金", "黄金股", "贵金属", "基础化工", "钢铁", "建筑材料", "稀土永磁", "小金属",
-             "工业金属", "材料", "大宗商品", "资源"],
-    "军工": ["国防军工", "航天装备", "航空装备", "航海装备", "军工电子", "军民融合", "商业航天",
-             "卫星互联网", "航母", "航空机场"],
-    "基建地产": ["建筑装饰", "房地产", "房地产开发", "房地产服务", "交通运输", "物流"],
-    "环保": ["环保", "环保设备", "环境治理", "垃圾分类", "碳中和", "可控核聚变", "液冷"],
-    "传媒": ["传媒", "游戏", "影视", "元宇宙", "超清视频", "数字孪生"],
-    "主题": ["国企改革", "一带一路", "中特估", "中字头", "并购重组", "华为", "新兴产业",
-             "国家安防", "安全主题", "农牧主题", "农林牧渔", "养殖业", "猪肉", "高端装备"],
-    "QDII": ["QDII", "全球", "纳斯达克", "标普", "美国", "德国", "日本", "越南", "印度", "海外", "恒生", "港股", "H股"],
-    "债券": ["债", "纯债", "固收", "短债", "中短债", "长债", "国债"]
-}
-
-
-def get_eastmoney_valuation(code: str) -> Dict[str, Any]:
+from . import http_client
+from .cache import TTLCache
+from .pingzhong import parse_pingzhong_data, history_records
+from .holdings import get_fund_holdings, get_stored_holdings
+from .estimator import estimate_from_holdings_async
+from .resilience import get_monitor
+from .classifier import classify_sector
+from .search_index import get_search_index
+from .nav_history import sync_fund_history, get_navs_on_dates, history_version
+from . import nav_store
+from .rolling import update_rolling, get_rolling_indicators, get_rolling_series
+from .fund_metrics import get_fund_metrics, technical_from_metrics, returns_from_metrics
+from .downsample import lttb_indices
+from .trading_calendar import is_trading_time, seconds_until_next_session
+
+
+async def fetch_eastmoney_valuation(code: str) -> Dict[str, Any]:
     """
     Fetch real-time valuation from Tiantian Jijin (Eastmoney) API.
     """
-    url = f"http://fundgz.1234567.com.cn/js/{code}.js?rt={int(time.time()*1000)}"
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36)"
-    }
+    url = Config.EASTMONEY_API_URL.format(code=code)
     try:
-        response = requests.get(url, headers=headers, timeout=5)
-        if response.status_code == 200:
-            text = response.text
-            # Regex to capture JSON content inside jsonpgz(...)
-            # Allow optional semicolon at end
-            match = re.search(r"jsonpgz\((.*)\)", text)
-            if match and match.group(1):
-                data = json.loads(match.group(1))
-                return {
-                    "name": data.get("name"),
-                    "nav": float(data.get("dwjz", 0.0)),
-                    "estimate": float(data.get("gsz", 0.0)),
-                    "estRate": float(data.get("gszzl", 0.0)),
-                    "time": data.get("gztime")
-                }
+        text = await http_client.get_text("eastmoney", url, params={"rt": int(time.time() * 1000)})
+        # Regex to capture JSON content inside jsonpgz(...)
+        # Allow optional semicolon at end
+        match = re.search(r"jsonpgz\((.*)\)", text)
+        if match and match.group(1):
+            data = json.loads(match.group(1))
+            return {
+                "name": data.get("name"),
+                "nav": float(data.get("dwjz", 0.0)),
+                "estimate": float(data.get("gsz", 0.0)),
+                "estRate": float(data.get("gszzl", 0.0)),
+                "time": data.get("gztime")
+            }
     except Exception as e:
         print(f"Eastmoney API error for {code}: {e}")
     return {}
 
 
-def get_sina_valuation(code: str) -> Dict[str, Any]:
+def get_eastmoney_valuation(code: str) -> Dict[str, Any]:
+    return http_client.run_sync(fetch_eastmoney_valuation(code))
+
+
+def _parse_sina_fund_line(text: str) -> Dict[str, Any]:
+    """
+    Parse one `var hq_str_fu_xxx="..."` line from Sina Fund API.
+    """
+    # var hq_str_fu_005827="Name,15:00:00,1.234,1.230,...";
+    match = re.search(r'="(.*)"', text)
+    if match and match.group(1):
+        parts = match.group(1).split(',')
+        if len(parts) >= 8:
+            return {
+                # parts[0] is name (GBK), often garbled in utf-8 env, ignore it
+                "estimate": float(parts[2]),
+                "nav": float(parts[3]),
+                "estRate": float(parts[6]),
+                "time": f"{parts[7]} {parts[1]}"
+            }
+    return {}
+
+
+SINA_QUOTE_URL = "http://hq.sinajs.cn/list="
+
+
+def _sina_chunks(symbols: List[str]) -> List[List[str]]:
+    """
+    Split symbols into list= batches bounded by both symbol count and URL
+    length (Sina rejects over-long query strings).
+    """
+    chunks, chunk, length = [], [], len(SINA_QUOTE_URL)
+    for sym in symbols:
+        extra = len(sym) + 1
+        if chunk and (len(chunk) >= Config.SINA_BATCH_SIZE or length + extra > Config.SINA_MAX_URL_LENGTH):
+            chunks.append(chunk)
+            chunk, length = [], len(SINA_QUOTE_URL)
+        chunk.append(sym)
+        length += extra
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+async def fetch_sina_valuations(codes: List[str]) -> Dict[str, Dict[str, Any]]:
     """
     Backup source: Sina Fund API.
     Format: Name, Time, Estimate, NAV, ..., Rate, Date
+    Sina accepts `list=fu_a,fu_b,...`, so N funds cost
+    ceil(N / SINA_BATCH_SIZE) requests instead of N.
     """
-    url = f"http://hq.sinajs.cn/list=fu_{code}"
     headers = {"Referer": "http://finance.sina.com.cn"}
+
+    async def fetch_chunk(chunk: List[str]) -> Dict[str, Dict[str, Any]]:
+        url = SINA_QUOTE_URL + ','.join(f'fu_{c}' for c in chunk)
+        out = {}
+        try:
+            text = await http_client.get_text("sina", url, headers=headers)
+            for line in text.strip().split('\n'):
+                # var hq_str_fu_005827="..."
+                key = line.split('=')[0].split('_str_fu_')[-1].strip()
+                if key not in chunk: continue
+                try:
+                    data = _parse_sina_fund_line(line)
+                except ValueError:
+                    continue
+                if data:
+                    out[key] = data
+        except Exception as e:
+            print(f"Sina valuation error for {len(chunk)} codes: {e}")
+        return out
+
+    results = {}
+    chunks = _sina_chunks([f"fu_{c}" for c in codes])
+    for part in await asyncio.gather(*(fetch_chunk([s[3:] for s in c]) for c in chunks)):
+        results.update(part)
+    return results
+
+
+def get_sina_valuation(code: str) -> Dict[str, Any]:
+    return http_client.run_sync(fetch_sina_valuations([code])).get(code, {})
+
+
+def get_sina_valuations(codes: List[str]) -> Dict[str, Dict[str, Any]]:
+    return http_client.run_sync(fetch_sina_valuations(codes))
+
+
+def _valuation_ttl() -> float:
+    """
+    Intraday estimates move every minute; outside trading sessions they are
+    frozen, so keep them until the next session opens (capped).
+    """
+    if is_trading_time():
+        return Config.VALUATION_CACHE_TTL_INTRADAY
+    return max(
+        Config.VALUATION_CACHE_TTL_INTRADAY,
+        min(Config.VALUATION_CACHE_TTL_CLOSED, seconds_until_next_session())
+    )
+
+
+_valuation_cache = TTLCache("valuation", ttl=_valuation_ttl, max_size=Config.VALUATION_CACHE_MAX_SIZE)
+
+
+def _has_estimate(data: Dict[str, Any]) -> bool:
+    return data.get("estimate", 0.0) != 0.0
+
+
+def _hedge_delay() -> float:
+    """How long Eastmoney gets before Sina is asked too: its recent p95 latency."""
+    monitor = get_monitor("eastmoney")
+    if monitor.sample_count() < Config.VALUATION_HEDGE_MIN_SAMPLES:
+        return Config.VALUATION_HEDGE_DELAY
+    p = monitor.percentile(Config.VALUATION_HEDGE_PERCENTILE)
+    return min(Config.VALUATION_HEDGE_DELAY_MAX, max(Config.VALUATION_HEDGE_DELAY_MIN, p))
+
+
+async def _fetch_combined_valuations(codes: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Eastmoney first, hedged with Sina, then the in-house holdings estimate.
+
+    Eastmoney has no multi-code endpoint, so it is fetched with bounded
+    concurrency. Codes it has not answered within the hedge delay are also
+    requested from Sina (multi-symbol requests) and the first valid answer
+    per code wins. Sources with an open circuit are skipped. Whatever both
+    upstreams miss (e.g. while rate-limited) is estimated locally. Results
+    without a name get the stored one.
+    """
+    results: Dict[str, Dict[str, Any]] = {c: {} for c in codes}
+    sem = asyncio.Semaphore(Config.VALUATION_BATCH_WORKERS)
+
+    async def bounded(code: str):
+        async with sem:
+            return {code: await fetch_eastmoney_valuation(code)}
+
+    def absorb(tasks):
+        for task in tasks:
+            for code, data in task.result().items():
+                if data and not _has_estimate(results[code]):
+                    # Merge into what a source without an estimate returned
+                    results[code].update(data)
+
+    pending = set()
+    if http_client.source_available("eastmoney"):
+        pending = {asyncio.ensure_future(bounded(c)) for c in codes}
     try:
-        response = requests.get(url, headers=headers, timeout=5)
-        text = response.text
-        # var hq_str_fu_005827="Name,15:00:00,1.234,1.230,...";
-        match = re.search(r'="(.*)"', text)
-        if match and match.group(1):
-            parts = match.group(1).split(',')
-            if len(parts) >= 8:
-                return {
-                    # parts[0] is name (GBK), often garbled in utf-8 env, ignore it
-                    "estimate": float(parts[2]),
-                    "nav": float(parts[3]),
-                    "estRate": float(parts[6]),
-                    "time": f"{parts[7]} {parts[1]}"
-                }
-    except Exception as e:
-        print(f"Sina Valuation API error for {code}: {e}")
-    return {}
+        if pending:
+            done, pending = await asyncio.wait(pending, timeout=_hedge_delay())
+            absorb(done)
+        hedge = [c for c in codes if not _has_estimate(results[c])]
+        if hedge and http_client.source_available("sina"):
+            pending.add(asyncio.ensure_future(fetch_sina_valuations(hedge)))
+        while pending and not all(_has_estimate(results[c]) for c in codes):
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            absorb(done)
+    finally:
+        for task in pending:
+            task.cancel()
+
+    missing = [c for c in codes if not _has_estimate(results[c])]
+    if missing:
+        for code, local_data in (await estimate_from_holdings_async(missing)).items():
+            results[code].update(local_data)
+
+    # Sina and the holdings estimate carry no name (positions classify by it)
+    unnamed = [c for c in codes if results[c] and not results[c].get("name")]
+    if unnamed:
+        names = await asyncio.to_thread(_stored_fund_names, unnamed)
+        for code in unnamed:
+            name = names.get(code) or (_pingzhong_cache.get(code) or {}).get("name")
+            if name:
+                results[code]["name"] = name
+    return results
+
+
+def _stored_fund_names(codes: List[str]) -> Dict[str, str]:
+    """Names from the local funds table."""
+    placeholders = ",".join("?" * len(codes))
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(f"SELECT code, name FROM funds WHERE code IN ({placeholders})", codes).fetchall()
+    finally:
+        conn.close()
+    return {r["code"]: r["name"] for r in rows}
 
 
-def get_combined_valuation(code: str) -> Dict[str, Any]:
+def _normalize_codes(codes: List[str]) -> List[str]:
+    return list(dict.fromkeys(c.strip() for c in codes if c and c.strip()))
+
+
+async def get_combined_valuations_async(codes: List[str]) -> Dict[str, Dict[str, Any]]:
     """
-    Try Eastmoney first, fallback to Sina.
+    Cached multi-source valuations for many funds. Concurrent callers asking
+    for the same code share one upstream request.
+    """
+    codes = _normalize_codes(codes)
+    if not codes:
+        return {}
+    cached = await _valuation_cache.aget_many_or_load(codes, _fetch_combined_valuations)
+    return {code: dict(cached.get(code) or {}) for code in codes}
+
+
+def get_combined_valuations(codes: List[str]) -> Dict[str, Dict[str, Any]]:
     """
-    data = get_eastmoney_valuation(code)
-    if not data or data.get("estimate") == 0.0:
-        # Fallback to Sina
-        sina_data = get_sina_valuation(code)
-        if sina_data:
-            # Merge Sina info into Eastmoney structure
-            data.update(sina_data)
-    return data
+    Sync version of get_combined_valuations_async, sharing the same cache.
+    """
+    codes = _normalize_codes(codes)
+    if not codes:
+        return {}
+    cached = _valuation_cache.get_many_or_load(codes, lambda keys: http_client.run_sync(_fetch_combined_valuations(keys)))
+    return {code: dict(cached.get(code) or {}) for code in codes}
+
+
+def get_combined_valuation(code: str) -> Dict[str, Any]:
+    return get_combined_valuations([code]).get(code.strip(), {})
 
 
-def search_funds(q: str) -> List[Dict[str, Any]]:
+SEARCH_LIMIT = 20
+
+_fts_available: bool | None = None
+
+
+def _search_index_available(cursor) -> bool:
+    global _fts_available
+    if _fts_available is None:
+        _fts_available = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'funds_fts'"
+        ).fetchone() is not None
+    return _fts_available
+
+
+def search_funds(q: str, limit: int = SEARCH_LIMIT) -> List[Dict[str, Any]]:
     """
-    Search funds by keyword using local SQLite DB.
+    Search funds by keyword, from the in-memory index when it is loaded,
+    otherwise from the local SQLite DB.
+    Ranking: exact code, code prefix, pinyin initials prefix, then fuzzy
+    matches in name / pinyin / code (FTS5 trigram index, bm25 order).
     """
     if not q:
         return []
 
     q_clean = q.strip()
-    pattern = f"%{q_clean}%"
-    
+    if not q_clean:
+        return []
+
+    index = get_search_index()
+    if index is not None:
+        return index.search(q_clean, limit)
+    # Upper bound for prefix range scans on the (BINARY collated) indexes
+    upper = "\U0010ffff"
+
     conn = get_db_connection()
     cursor = conn.cursor()
-    
+    ranked: Dict[str, tuple] = {}
+
+    def collect(tier: int, sql: str, params: tuple):
+        for order, row in enumerate(cursor.execute(sql, params).fetchall()):
+            if row["code"] not in ranked:
+                ranked[row["code"]] = (tier, order, row)
+
     try:
-        cursor.execute("""
-            SELECT code, name, type 
-            FROM funds 
-            WHERE code LIKE ? OR name LIKE ? 
-            LIMIT 20
-        """, (pattern, pattern))
-        
-        rows = cursor.fetchall()
-        
+        if q_clean.isascii() and q_clean.isdigit():
+            collect(0, "SELECT code, name, type FROM funds WHERE code = ?", (q_clean,))
+            collect(1, """
+                SELECT code, name, type FROM funds
+                WHERE code >= ? AND code < ? ORDER BY code LIMIT ?
+            """, (q_clean, q_clean + upper, limit))
+        elif q_clean.isascii() and q_clean.isalnum():
+            initials = q_clean.upper()
+            collect(2, """
+                SELECT code, name, type FROM funds
+                WHERE pinyin >= ? AND pinyin < ? ORDER BY pinyin, code LIMIT ?
+            """, (initials, initials + upper, limit))
+
+        if len(ranked) < limit:
+            if len(q_clean) >= 3 and _search_index_available(cursor):
+                # Trigram tokens need at least 3 characters
+                phrase = '"' + q_clean.replace('"', '""') + '"'
+                collect(3, """
+                    SELECT f.code, f.name, f.type
+                    FROM funds_fts JOIN funds f ON f.rowid = funds_fts.rowid
+                    WHERE funds_fts MATCH ? ORDER BY bm25(funds_fts) LIMIT ?
+                """, ("{code name pinyin} : " + phrase, limit))
+            else:
+                pattern = f"%{q_clean}%"
+                collect(3, """
+                    SELECT code, name, type FROM funds
+                    WHERE code LIKE ? OR name LIKE ? OR pinyin LIKE ?
+                    ORDER BY length(name), code LIMIT ?
+                """, (pattern, pattern, pattern, limit))
+
         results = []
-        for row in rows:
+        for _, _, row in sorted(ranked.values(), key=lambda item: item[:2])[:limit]:
             results.append({
                 "id": str(row["code"]),
                 "name": row["name"],
@@ -149,72 +350,24 @@ def search_funds(q: str) -> List[Dict[str, Any]]:
         conn.close()
 
 
-def get_eastmoney_pingzhong_data(code: str) -> Dict[str, Any]:
+async def fetch_eastmoney_pingzhong_data(code: str) -> Dict[str, Any]:
     """
     Fetch static detailed data from Eastmoney (PingZhongData).
     """
     url = Config.EASTMONEY_DETAILED_API_URL.format(code=code)
     try:
-        response = requests.get(url, timeout=5)
-        if response.status_code == 200:
-            text = response.text
-            data = {}
-            name_match = re.search(r'fS_name\s*=\s*"(.*?)";', text)
-            if name_match: data["name"] = name_match.group(1)
-            
-            code_match = re.search(r'fS_code\s*=\s*"(.*?)";', text)
-            if code_match: data["code"] = code_match.group(1)
-            
-            manager_match = re.search(r'Data_currentFundManager\s*=\s*(\[.+?\])\s*;\s*/\*', text)
-            if manager_match:
-                try:
-                    managers = json.loads(manager_match.group(1))
-                    if managers:
-                        data["manager"] = ", ".join([m["name"] for m in managers])
-                except:
-                    pass
-
-            # Extract Performance Metrics
-            for key in ["syl_1n", "syl_6y", "syl_3y", "syl_1y"]:
-                m = re.search(rf'{key}\s*=\s*"(.*?)";', text)
-                if m: data[key] = m.group(1)
-
-            # Extract Performance Evaluation (Capability Scores)
-            # var Data_performanceEvaluation = {"avr":"72.25","categories":[...],"data":[80.0,70.0...]};
-            # Match until `};`
-            perf_match = re.search(r'Data_performanceEvaluation\s*=\s*(\{.+?\})\s*;\s*/\*', text)
-            if perf_match:
-                try:
-                    perf = json.loads(perf_match.group(1))
-                    if perf and "data" in perf and "categories" in perf:
-                        data["performance"] = dict(zip(perf["categories"], perf["data"]))
-                except:
-                    pass
-
-            # Extract Full History (Data_netWorthTrend)
-            # var Data_netWorthTrend = [{"x":1536076800000,"y":1.0,...},...];
-            history_match = re.search(r'Data_netWorthTrend\s*=\s*(\[.+?\])\s*;\s*/\*', text)
-            if history_match:
-                try:
-                    raw_hist = json.loads(history_match.group(1))
-                    # Convert to standard format: [{"date": "YYYY-MM-DD", "nav": 1.23}, ...]
-                    # x is ms timestamp
-                    data["history"] = [
-                        {
-                            "date": time.strftime('%Y-%m-%d', time.localtime(item['x']/1000)),
-                            "nav": float(item['y'])
-                        }
-                        for item in raw_hist
-                    ]
-                except:
-                    pass
-
-            return data
+        text = await http_client.get_text("pingzhong", url)
+        if text:
+            return parse_pingzhong_data(text)
     except Exception as e:
         print(f"PingZhong API error for {code}: {e}")
     return {}
 
 
+def get_eastmoney_pingzhong_data(code: str) -> Dict[str, Any]:
+    return http_client.run_sync(fetch_eastmoney_pingzhong_data(code))
+
+
 def _get_fund_info_from_db(code: str) -> Dict[str, Any]:
     """
     Get fund basic info from local SQLite cache.
@@ -222,188 +375,245 @@ def _get_fund_info_from_db(code: str) -> Dict[str, Any]:
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
-        cursor.execute("SELECT name, type FROM funds WHERE code = ?", (code,))
+        cursor.execute("SELECT name, type, sector FROM funds WHERE code = ?", (code,))
         row = cursor.fetchone()
         conn.close()
         if row:
-            return {"name": row["name"], "type": row["type"]}
+            return {"name": row["name"], "type": row["type"], "sector": row["sector"]}
     except Exception as e:
         print(f"DB fetch error for {code}: {e}")
     return {}
 
 
-def _fetch_stock_spots_sina(codes: List[str]) -> Dict[str, float]:
+def to_sina_symbol(code: Any) -> str | None:
     """
-    Fetch real-time stock prices from Sina API in batch.
+    Normalize a stock code to its Sina symbol.
     Supports A-share (sh/sz), HK (hk), US (gb_).
     """
-    if not codes:
-        return {}
-    
-    formatted = []
-    # Map cleaned code back to original for result dict
-    code_map = {} 
-    
-    for c in codes:
-        if not c: continue
-        c_str = str(c).strip()
-        prefix = ""
-        clean_c = c_str
-        
-        # Detect Market
-        if c_str.isdigit():
-            if len(c_str) == 6:
-                # A-share
-                prefix = "sh" if c_str.startswith(('60', '68', '90', '11')) else "sz"
-            elif len(c_str) == 5:
-                # HK
-                prefix = "hk"
-        elif c_str.isalpha():
-            # US
-            prefix = "gb_"
-            clean_c = c_str.lower()
-        
-        if prefix:
-            sina_code = f"{prefix}{clean_c}"
-            formatted.append(sina_code)
-            code_map[sina_code] = c_str
-            
-    if not formatted:
-        return {}
+    if not code: return None
+    c_str = str(code).strip()
+    # Detect Market
+    if c_str.isdigit():
+        if len(c_str) == 6:
+            # A-share
+            return ("sh" if c_str.startswith(('60', '68', '90', '11')) else "sz") + c_str
+        if len(c_str) == 5:
+            # HK
+            return "hk" + c_str
+    elif c_str.isalpha():
+        # US
+        return "gb_" + c_str.lower()
+    return None
 
-    url = f"http://hq.sinajs.cn/list={','.join(formatted)}"
+
+def _parse_sina_stock_change(symbol: str, data_part: str) -> float:
+    parts = data_part.split(',')
+    change = 0.0
+    if symbol.startswith("gb_"):
+        # US: name, price, change_percent, ...
+        # Example: "英伟达,135.20,2.55,..."
+        if len(parts) > 2:
+            change = float(parts[2])
+    elif symbol.startswith("hk"):
+        # HK: en, ch, open, prev_close, high, low, last, ...
+        if len(parts) > 6:
+            prev_close = float(parts[3])
+            last = float(parts[6])
+            if prev_close > 0:
+                change = round((last - prev_close) / prev_close * 100, 2)
+    else:
+        # A-share: name, open, prev_close, last, ...
+        if len(parts) > 3:
+            prev_close = float(parts[2])
+            last = float(parts[3])
+            if prev_close > 0:
+                change = round((last - prev_close) / prev_close * 100, 2)
+    return change
+
+
+async def _fetch_sina_stock_changes(symbols: List[str]) -> Dict[str, tuple]:
+    """
+    Loader for the stock quote cache: {symbol: (change_percent or None,)}.
+    Unknown symbols are cached as (None,) so they are not re-queried each time.
+    """
     headers = {"Referer": "http://finance.sina.com.cn"}
-    
-    try:
-        response = requests.get(url, headers=headers, timeout=5)
-        results = {}
-        for line in response.text.strip().split('\n'):
+
+    async def fetch_chunk(chunk: List[str]) -> Dict[str, tuple]:
+        out = {}
+        try:
+            text = await http_client.get_text("sina", SINA_QUOTE_URL + ','.join(chunk), headers=headers)
+        except Exception as e:
+            print(f"Sina fetch failed: {e}")
+            return out
+        for line in text.strip().split('\n'):
             if not line or '=' not in line or '"' not in line: continue
-            
             # var hq_str_sh600519="..."
-            line_key = line.split('=')[0].split('_str_')[-1] # sh600519 or hk00700 or gb_nvda
-            original_code = code_map.get(line_key)
-            if not original_code: continue
-
+            symbol = line.split('=')[0].split('_str_')[-1] # sh600519 or hk00700 or gb_nvda
             data_part = line.split('"')[1]
             if not data_part: continue
-            parts = data_part.split(',')
-            
-            change = 0.0
             try:
-                if line_key.startswith("gb_"):
-                    # US: name, price, change_percent, ...
-                    # Example: "英伟达,135.20,2.55,..."
-                    if len(parts) > 2:
-                        change = float(parts[2])
-                elif line_key.startswith("hk"):
-                    # HK: en, ch, open, prev_close, high, low, last, ...
-                    if len(parts) > 6:
-                        prev_close = float(parts[3])
-                        last = float(parts[6])
-                        if prev_close > 0:
-                            change = round((last - prev_close) / prev_close * 100, 2)
-                else:
-                    # A-share: name, open, prev_close, last, ...
-                    if len(parts) > 3:
-                        prev_close = float(parts[2])
-                        last = float(parts[3])
-                        if prev_close > 0:
-                            change = round((last - prev_close) / prev_close * 100, 2)
-                
-                results[original_code] = change
-            except:
+                out[symbol] = (_parse_sina_stock_change(symbol, data_part),)
+            except ValueError:
                 continue
-                
-        return results
-    except Exception as e:
-        print(f"Sina fetch failed: {e}")
+        for symbol in chunk:
+            out.setdefault(symbol, (None,))
+        return out
+
+    results = {}
+    for part in await asyncio.gather(*(fetch_chunk(c) for c in _sina_chunks(symbols))):
+        results.update(part)
+    return results
+
+
+_stock_quote_cache = TTLCache("stock_quotes", ttl=Config.STOCK_SPOT_CACHE_DURATION, max_size=Config.STOCK_QUOTE_CACHE_MAX_SIZE)
+
+
+async def fetch_stock_spots_sina(codes: List[str]) -> Dict[str, float]:
+    """
+    Real-time stock change percent for many stocks, keyed by the given codes.
+    Quotes are shared process-wide for STOCK_SPOT_CACHE_DURATION seconds, so
+    the same top holdings across funds are fetched once per interval.
+    """
+    symbol_map = {}
+    for c in codes:
+        symbol = to_sina_symbol(c)
+        if symbol:
+            symbol_map[str(c).strip()] = symbol
+    if not symbol_map:
         return {}
 
+    quotes = await _stock_quote_cache.aget_many_or_load(set(symbol_map.values()), _fetch_sina_stock_changes)
+    results = {}
+    for code, symbol in symbol_map.items():
+        quote = quotes.get(symbol)
+        if quote and quote[0] is not None:
+            results[code] = quote[0]
+    return results
+
+
+def _fetch_stock_spots_sina(codes: List[str]) -> Dict[str, float]:
+    return http_client.run_sync(fetch_stock_spots_sina(codes))
+
+
+def get_funds_holdings(codes: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Holdings with live changes for several funds. Stocks held by more than
+    one fund are quoted once: the union is fetched in chunked batch requests.
+    """
+    codes = _normalize_codes(codes)
+    stored = get_stored_holdings(codes)
+    for code in codes:
+        if code not in stored:
+            stored[code] = get_fund_holdings(code)
+
+    stock_codes = {h["code"] for data in stored.values() for h in data["holdings"]}
+    spot_map = _fetch_stock_spots_sina(list(stock_codes))
+    return {
+        code: {
+            "report_period": stored[code]["report_period"],
+            "concentration": stored[code]["concentration"],
+            "holdings": [
+                {"name": h["name"], "percent": h["percent"], "change": spot_map.get(h["code"], 0.0)}
+                for h in stored[code]["holdings"]
+            ],
+        }
+        for code in codes
+    }
+
+
+def get_history_version(code: str) -> str | None:
+    """Sync a fund's history if needed and return its version (last NAV date), for ETags."""
+    sync_fund_history(code)
+    return history_version(code)
+
+
+def get_nav_arrays(code: str) -> tuple | None:
+    """
+    Full NAV history as read-only (epoch days int32, NAV float64) arrays,
+    oldest first, memory-mapped from the NAV store (zero-copy). Synced
+    incrementally like get_fund_history. None if the store is disabled or
+    the fund has no history.
+    """
+    sync_fund_history(code)
+    return nav_store.get_arrays(code)
+
 
 def get_fund_history(code: str, limit: int = 30) -> List[Dict[str, Any]]:
     """
-    Get historical NAV data with database caching.
-    If limit >= 9999, fetch all available history.
+    Get historical NAV data from the local database, synced incrementally
+    (only when a newer NAV can exist, only the missing dates).
+    If limit >= 9999, return all available history.
     """
-    from ..db import get_db_connection
-    import time
+    sync_fund_history(code)
 
-    # 1. Try to get from database cache first
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    arrays = nav_store.get_arrays(code)
+    if arrays is not None:
+        days, navs = arrays
+        if limit < 9999:
+            days, navs = days[-limit:], navs[-limit:]
+        return history_records(days, navs)
 
-    # If limit is very large, get all data
-    if limit >= 9999:
-        cursor.execute("""
-            SELECT date, nav, updated_at FROM fund_history
-            WHERE code = ?
-            ORDER BY date DESC
-        """, (code,))
-    else:
-        cursor.execute("""
-            SELECT date, nav, updated_at FROM fund_history
-            WHERE code = ?
-            ORDER BY date DESC
-            LIMIT ?
-        """, (code, limit))
-
-    rows = cursor.fetchall()
-
-    # Check if cache is fresh (less than 24 hours old)
-    cache_valid = False
-    if rows:
-        latest_update = rows[0]["updated_at"]
-        # Parse timestamp
-        try:
-            from datetime import datetime
-            update_time = datetime.fromisoformat(latest_update)
-            age_hours = (datetime.now() - update_time).total_seconds() / 3600
-            # For "all history" requests, require more data to consider cache valid
-            min_rows = 10 if limit < 9999 else 100
-            cache_valid = age_hours < 24 and len(rows) >= min(limit, min_rows)
-        except:
-            pass
-
-    if cache_valid:
+    conn = get_db_connection()
+    try:
+        if limit >= 9999:
+            rows = conn.execute("""
+                SELECT date, nav FROM fund_history
+                WHERE code = ?
+                ORDER BY date DESC
+            """, (code,)).fetchall()
+        else:
+            rows = conn.execute("""
+                SELECT date, nav FROM fund_history
+                WHERE code = ?
+                ORDER BY date DESC
+                LIMIT ?
+            """, (code, limit)).fetchall()
+    finally:
         conn.close()
-        # Reverse to ascending order (oldest to newest) for chart display
-        return [{"date": row["date"], "nav": float(row["nav"])} for row in reversed(rows)]
 
-    # 2. Cache miss or stale, fetch from API
-    try:
-        df = ak.fund_open_fund_info_em(symbol=code, indicator="单位净值走势")
-        if df is None or df.empty:
-            conn.close()
-            return []
+    # Reverse to ascending order (oldest to newest) for chart display
+    return [{"date": row["date"], "nav": float(row["nav"])} for row in reversed(rows)]
+
+
+HISTORY_FORMATS = ("records", "columns")
 
-        # If limit < 9999, take only the most recent N records
+
+def get_fund_history_series(code: str, limit: int = 30, points: int | None = None, fmt: str = "records"):
+    """
+    History for charts: the last `limit` NAVs (all if limit >= 9999),
+    optionally downsampled to `points` with LTTB, as records
+    ([{"date", "nav"}, ...]) or columns ({"dates": [...], "navs": [...]}).
+    """
+    arrays = get_nav_arrays(code)
+    if arrays is not None:
+        days, navs = arrays
         if limit < 9999:
-            df = df.sort_values(by="净值日期", ascending=False).head(limit)
+            days, navs = days[-limit:], navs[-limit:]
+    else:
+        history = get_fund_history(code, limit=limit)
+        days = np.array([h["date"][:10] for h in history], dtype="datetime64[D]").astype(np.int32)
+        navs = np.array([h["nav"] for h in history], dtype=np.float64)
 
-        # Sort ascending for chart display
-        df = df.sort_values(by="净值日期", ascending=True)
+    if points and len(days) > points:
+        keep = lttb_indices(days, navs, points)
+        days, navs = days[keep], navs[keep]
 
-        results = []
-        for _, row in df.iterrows():
-            d = row["净值日期"]
-            date_str = d.strftime("%Y-%m-%d") if hasattr(d, "strftime") else str(d)[:10]
-            nav_value = float(row["单位净值"])
-            results.append({"date": date_str, "nav": nav_value})
-
-            # 3. Save to database cache
-            cursor.execute("""
-                INSERT OR REPLACE INTO fund_history (code, date, nav, updated_at)
-                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-            """, (code, date_str, nav_value))
-
-        conn.commit()
-        conn.close()
-        return results
-    except Exception as e:
-        print(f"History fetch error for {code}: {e}")
-        conn.close()
-        return []
+    if fmt == "columns":
+        return {
+            "dates": days.astype("datetime64[D]").astype(str).tolist(),
+            "navs": navs.tolist(),
+        }
+    return history_records(days, navs)
+
+
+def get_fund_rolling_series(code: str, limit: int = 250) -> Dict[str, List[Any]]:
+    """
+    Rolling 1Y Sharpe and drawdown-from-high curve (columns), read from the
+    series maintained alongside the rolling state; only new NAVs are computed.
+    """
+    sync_fund_history(code)
+    update_rolling(code)
+    return get_rolling_series(code, limit=limit)
 
 
 def get_nav_on_date(code: str, date_str: str) -> float | None:
@@ -411,37 +621,44 @@ def get_nav_on_date(code: str, date_str: str) -> float | None:
     Get fund NAV on a specific date (YYYY-MM-DD). Used for T+1 confirm.
     Returns None if that date's NAV is not yet available.
     """
-    history = get_fund_history(code, limit=90)
-    for item in history:
-        if item["date"][:10] == date_str[:10]:
-            return item["nav"]
-    return None
+    return get_navs_on_dates([(code, date_str)]).get((code, date_str[:10]))
+
+
+_EMPTY_INDICATORS = {
+    "sharpe": "--",
+    "volatility": "--",
+    "max_drawdown": "--",
+    "annual_return": "--"
+}
 
 
-def _calculate_technical_indicators(history: List[Dict[str, Any]]) -> Dict[str, Any]:
+def _calculate_technical_indicators(history: List[Dict[str, Any]] | np.ndarray) -> Dict[str, Any]:
     """
-    Calculate real technical indicators from NAV history.
+    Calculate real technical indicators from NAV history
+    (a list of {"date", "nav"} records, or a NAV array used without copying).
     """
-    if not history or len(history) < 10:
-        return {
-            "sharpe": "--",
-            "volatility": "--",
-            "max_drawdown": "--",
-            "annual_return": "--"
-        }
+    if isinstance(history, np.ndarray):
+        return _technical_indicators_from_navs(history)
+    if not history:
+        return dict(_EMPTY_INDICATORS)
+    return _technical_indicators_from_navs(np.array([item['nav'] for item in history], dtype=np.float64))
+
+
+def _technical_indicators_from_navs(navs: np.ndarray) -> Dict[str, Any]:
+    """
+    Same as _calculate_technical_indicators, on a NAV array (oldest first).
+    """
+    if navs is None or len(navs) < 10:
+        return dict(_EMPTY_INDICATORS)
     
     try:
-        import numpy as np
-        # Convert to numpy array of NAVs
-        navs = np.array([item['nav'] for item in history])
-        
         # 1. Returns (Daily)
         daily_returns = np.diff(navs) / navs[:-1]
         
         # 2. Annualized Return
         total_return = (navs[-1] - navs[0]) / navs[0]
         # Approximate years based on history length
-        years = len(history) / 250.0
+        years = len(navs) / 250.0
         annual_return = (1 + total_return)**(1/years) - 1 if years > 0 else 0
         
         # 3. Annualized Volatility
@@ -465,28 +682,127 @@ def _calculate_technical_indicators(history: List[Dict[str, Any]]) -> Dict[str,
         }
     except Exception as e:
         print(f"Indicator calculation error: {e}")
-        return {
-            "sharpe": "--",
-            "volatility": "--",
-            "max_drawdown": "--",
-            "annual_return": "--"
-        }
+        return dict(_EMPTY_INDICATORS)
 
-def get_fund_intraday(code: str) -> Dict[str, Any]:
+DETAIL_FIELDS = ("estimate", "profile", "holdings", "indicators")
+
+_pingzhong_cache = TTLCache("pingzhong", ttl=Config.DETAIL_STATIC_CACHE_TTL, max_size=64)
+_technical_cache = TTLCache("technical_indicators", ttl=Config.DETAIL_STATIC_CACHE_TTL, max_size=512)
+
+
+def _get_pingzhong_cached(code: str) -> Dict[str, Any]:
+    return _pingzhong_cache.get_or_load(code, lambda: get_eastmoney_pingzhong_data(code)) or {}
+
+
+def get_current_metrics(code: str) -> Dict[str, Any] | None:
+    """The nightly fund_metrics row, if it covers the last stored NAV."""
+    metrics = get_fund_metrics(code)
+    if metrics and metrics["as_of"] == (history_version(code) or "")[:10]:
+        return metrics
+    return None
+
+
+def get_stored_indicators(code: str) -> Dict[str, Any] | None:
+    """
+    Technical indicators of a fund with a local history, without recomputing
+    them: the nightly fund_metrics row if current, else the rolling state
+    (advanced in O(1) per new NAV). None for funds never synced.
+    """
+    if not history_version(code):
+        return None
+    sync_fund_history(code)
+    metrics = get_current_metrics(code)
+    if metrics:
+        indicators = technical_from_metrics(metrics)
+        if indicators:
+            return indicators
+    update_rolling(code)
+    return get_rolling_indicators(code)
+
+
+def _get_technical_indicators_cached(code: str, pz_data: Dict[str, Any]) -> Dict[str, Any]:
+    def load():
+        indicators = get_stored_indicators(code)
+        if indicators:
+            return indicators
+        # We take last 250 trading days (approx 1 year)
+        navs = pz_data.get("navs")
+        if navs is not None and len(navs):
+            # Indicators need 1 year
+            return _technical_indicators_from_navs(navs[-250:])
+        # Fallback to local history if PingZhong missed it (unlikely)
+        arrays = get_nav_arrays(code)
+        if arrays is not None:
+            return _calculate_technical_indicators(arrays[1][-250:])
+        return _calculate_technical_indicators(get_fund_history(code, limit=250))
+    # Keyed by the last NAV date: a newly synced NAV invalidates the entry
+    sync_fund_history(code)
+    return _technical_cache.get_or_load((code, history_version(code)), load)
+
+
+def parse_detail_fields(fields: str | None) -> tuple:
+    """
+    Parse `?fields=estimate,holdings` into a tuple of sections (None = all).
+    Raises ValueError on unknown names.
+    """
+    if not fields:
+        return DETAIL_FIELDS
+    selected = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in selected if f not in DETAIL_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)} (allowed: {', '.join(DETAIL_FIELDS)})")
+    return selected
+
+
+def get_detail_version(code: str, fields: tuple = DETAIL_FIELDS) -> tuple:
+    """
+    Data version of a detail response, for ETags: the valuation tick, the
+    last NAV date and the holdings report period, as far as the selected
+    sections depend on them. Checking it costs a cached valuation and a few
+    indexed lookups, not the sections themselves.
+    """
+    version: List[Any] = [code, fields]
+    if "estimate" in fields:
+        em_data = get_combined_valuation(code)
+        version += [em_data.get("time"), em_data.get("navDate"), em_data.get("estimate")]
+    if "profile" in fields or "indicators" in fields:
+        version.append(get_history_version(code))
+    if "holdings" in fields or "indicators" in fields:
+        conn = get_db_connection()
+        try:
+            row = conn.execute("SELECT report_period FROM fund_holdings_sync WHERE code = ?", (code,)).fetchone()
+        finally:
+            conn.close()
+        version.append(row["report_period"] if row else None)
+    if "holdings" in fields and is_trading_time():
+        # Per-stock changes move with the quote cache, not with the fund's valuation
+        version.append(int(time.time() // Config.STOCK_SPOT_CACHE_DURATION))
+    return tuple(version)
+
+
+def get_fund_intraday(code: str, fields: tuple = DETAIL_FIELDS) -> Dict[str, Any]:
     """
     Get fund holdings + real-time valuation estimate.
+    `fields` selects the sections to compute; polling clients ask only for
+    "estimate", the slow static sections are computed on demand and cached.
     """
+    response: Dict[str, Any] = {"id": str(code)}
+
     # 1) Get real-time valuation (Multi-source)
-    em_data = get_combined_valuation(code)
-    
-    name = em_data.get("name")
-    nav = float(em_data.get("nav", 0.0))
-    estimate = float(em_data.get("estimate", 0.0))
-    est_rate = float(em_data.get("estRate", 0.0))
-    update_time = em_data.get("time", time.strftime("%H:%M:%S"))
+    em_data = {}
+    if "estimate" in fields:
+        em_data = get_combined_valuation(code)
+        response.update({
+            "nav": float(em_data.get("nav", 0.0)),
+            "estimate": float(em_data.get("estimate", 0.0)),
+            "estRate": float(em_data.get("estRate", 0.0)),
+            "time": em_data.get("time", "--"),
+        })
 
     # 1.5) Enrich with detailed info
-    pz_data = get_eastmoney_pingzhong_data(code)
+    pz_data = {}
+    if "profile" in fields or "indicators" in fields:
+        pz_data = _get_pingzhong_cached(code)
     extra_info = {}
     if pz_data.get("name"): extra_info["full_name"] = pz_data["name"]
     if pz_data.get("manager"): extra_info["manager"] = pz_data["manager"]
@@ -498,94 +814,55 @@ def get_fund_intraday(code: str) -> Dict[str, Any]:
         if not extra_info.get("full_name"): extra_info["full_name"] = db_info["name"]
         extra_info["official_type"] = db_info["type"]
 
-    if not name:
-        name = extra_info.get("full_name", f"基金 {code}")
-    manager = extra_info.get("manager", "--")
-
-    # 2) Use history from PingZhong for Indicators
-    # We take last 250 trading days (approx 1 year)
-    history_data = pz_data.get("history", [])
-    if history_data:
-        # Indicators need 1 year
-        tech_indicators = _calculate_technical_indicators(history_data[-250:])
-    else:
-        # Fallback to AkShare if PingZhong missed it (unlikely)
-        history_data = get_fund_history(code, limit=250)
-        tech_indicators = _calculate_technical_indicators(history_data)
+    name = em_data.get("name") or extra_info.get("full_name", f"基金 {code}")
+    response["name"] = name
 
-    # 3) Get holdings from AkShare
-    holdings = []
-    concentration_rate = 0.0
-    try:
-        current_year = str(time.localtime().tm_year)
-        holdings_df = ak.fund_portfolio_hold_em(symbol=code, date=current_year)
-        if holdings_df is None or holdings_df.empty:
-             prev_year = str(time.localtime().tm_year - 1)
-             holdings_df = ak.fund_portfolio_hold_em(symbol=code, date=prev_year)
-             
-        if not holdings_df.empty:
-            holdings_df = holdings_df.copy()
-            if "占净值比例" in holdings_df.columns:
-                holdings_df["占净值比例"] = (
-                    holdings_df["占净值比例"].astype(str).str.replace("%", "", regex=False)
-                )
-                holdings_df["占净值比例"] = pd.to_numeric(holdings_df["占净值比例"], errors="coerce").fillna(0.0)
-            
-            sorted_holdings = holdings_df.sort_values(by="占净值比例", ascending=False)
-            top10 = sorted_holdings.head(10)
-            concentration_rate = top10["占净值比例"].sum()
-
-            stock_codes = [str(c) for c in holdings_df["股票代码"].tolist() if c]
-            spot_map = _fetch_stock_spots_sina(stock_codes)
-            
-            seen_codes = set()
-            for _, row in sorted_holdings.iterrows():
-                stock_code = str(row.get("股票代码"))
-                percent = float(row.get("占净值比例", 0.0))
-                if stock_code in seen_codes or percent < 0.01: continue
-                seen_codes.add(stock_code)
-                holdings.append({
-                    "name": row.get("股票名称"),
-                    "percent": percent,
-                    "change": spot_map.get(stock_code, 0.0), 
-                })
-            holdings = holdings[:20]
-    except:
-        pass
-
-    # 4) Determine sector/type
+    # 2) Determine sector/type
     sector = "未知"
-    matched_sector = None
-    for cat, keywords in MAJOR_CATEGORIES.items():
-        if any(kw in name for kw in keywords):
-            matched_sector = cat
-            break
-    
+    # Classified during the fund list sync; classify inline only if not yet stored
+    matched_sector = db_info.get("sector")
+    if matched_sector is None:
+        matched_sector = classify_sector(name)
+
     official_type = extra_info.get("official_type", "")
     if matched_sector:
         sector = matched_sector
     elif official_type:
         sector = official_type
-    
-    response = {
-        "id": str(code),
-        "name": name,
-        "type": sector, 
-        "manager": manager,
-        "nav": nav,
-        "estimate": estimate,
-        "estRate": est_rate,
-        "time": update_time,
-        "holdings": holdings,
-        "indicators": {
-            "returns": {
-                "1M": extra_info.get("syl_1y", "--"),
-                "3M": extra_info.get("syl_3y", "--"),
-                "6M": extra_info.get("syl_6y", "--"),
-                "1Y": extra_info.get("syl_1n", "--")
-            },
-            "concentration": round(concentration_rate, 2),
-            "technical": tech_indicators
+    response["type"] = sector
+
+    if "profile" in fields:
+        response["manager"] = extra_info.get("manager", "--")
+
+    # 3) Holdings (local table) joined with live stock quotes
+    holdings_data = None
+    if "holdings" in fields or "indicators" in fields:
+        holdings_data = get_fund_holdings(code)
+    if "holdings" in fields:
+        spot_map = _fetch_stock_spots_sina([h["code"] for h in holdings_data["holdings"]])
+        response["holdings_period"] = holdings_data["report_period"]
+        response["holdings"] = [
+            {"name": h["name"], "percent": h["percent"], "change": spot_map.get(h["code"], 0.0)}
+            for h in holdings_data["holdings"]
+        ]
+
+    # 4) Indicators: PingZhong returns + history-based technicals (cached)
+    if "indicators" in fields:
+        returns = {
+            "1M": extra_info.get("syl_1y", "--"),
+            "3M": extra_info.get("syl_3y", "--"),
+            "6M": extra_info.get("syl_6y", "--"),
+            "1Y": extra_info.get("syl_1n", "--")
         }
-    }
-    return response
\ No newline at end of file
+        if "--" in returns.values():
+            # Fill what PingZhong did not report from the nightly metrics
+            metrics = get_current_metrics(code)
+            if metrics:
+                stored = returns_from_metrics(metrics)
+                returns = {k: stored[k] if v == "--" else v for k, v in returns.items()}
+        response["indicators"] = {
+            "returns": returns,
+            "concentration": holdings_data["concentration"],
+            "technical": _get_technical_indicators_cached(code, pz_data)
+        }
+    return response
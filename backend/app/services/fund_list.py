@@ -0,0 +1,122 @@
+"""
+Fund list sync.
+
+The full list (~20k funds) is fetched from Eastmoney's fundcode_search.js
+(one small script, no pandas), or from AkShare as a fallback. Each row is
+hashed and compared with funds.content_hash, so a sync only writes new
+funds, changed funds (renames, type changes) and funds that disappeared.
+"""
+import hashlib
+import json
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import akshare as ak
+
+from ..config import Config
+from ..db import get_db_connection
+from . import http_client
+from .classifier import classify_sector
+
+logger = logging.getLogger(__name__)
+
+# (code, name, type, pinyin initials)
+FundRow = Tuple[str, str, Optional[str], Optional[str]]
+
+
+def content_hash(name: str, fund_type: Optional[str], pinyin: Optional[str]) -> str:
+    return hashlib.sha1(f"{name}\x1f{fund_type or ''}\x1f{pinyin or ''}".encode("utf-8")).hexdigest()
+
+
+def parse_fundcode_search(text: str) -> List[FundRow]:
+    """
+    `var r = [["000001","HXCZHH","华夏成长混合","混合型-灵活","HUAXIACHENGZHANGHUNHE"],...];`
+    """
+    start, end = text.find("["), text.rfind("]")
+    if start < 0 or end < start:
+        raise ValueError("Unexpected fundcode_search.js format")
+    rows = []
+    for item in json.loads(text[start:end + 1]):
+        if len(item) < 4 or not item[0] or not item[2]:
+            continue
+        rows.append((str(item[0]).strip(), item[2], item[3] or None, (item[1] or "").upper() or None))
+    return rows
+
+
+def fetch_fund_list_eastmoney() -> List[FundRow]:
+    text = http_client.run_sync(http_client.get_text("fundlist", Config.EASTMONEY_ALL_FUNDS_API_URL))
+    return parse_fundcode_search(text)
+
+
+def fetch_fund_list_akshare() -> List[FundRow]:
+    df = ak.fund_name_em()
+    if df is None or df.empty:
+        return []
+    pinyin = df["拼音缩写"] if "拼音缩写" in df.columns else [None] * len(df)
+    return [
+        (str(code).strip(), name, fund_type or None, str(py).upper() if py else None)
+        for code, name, fund_type, py in zip(df["基金代码"], df["基金简称"], df["基金类型"], pinyin)
+    ]
+
+
+def fetch_fund_list() -> List[FundRow]:
+    """Lightweight Eastmoney list first, AkShare if that fails (or FUND_LIST_SOURCE=akshare)."""
+    if Config.FUND_LIST_SOURCE != "akshare":
+        try:
+            rows = fetch_fund_list_eastmoney()
+            if rows:
+                return rows
+            logger.warning("Eastmoney fund list is empty, falling back to AkShare")
+        except Exception as e:
+            logger.warning(f"Eastmoney fund list failed, falling back to AkShare: {e}")
+    return fetch_fund_list_akshare()
+
+
+def sync_fund_list(rows: List[FundRow]) -> Dict[str, int]:
+    """
+    Diff `rows` against the funds table by content hash and write only the
+    differences, in one transaction. Returns the changed-row counts.
+
+    Deletions are skipped when the fetched list is much shorter than the
+    stored one (a truncated download must not wipe the table).
+    """
+    fetched: Dict[str, tuple] = {}
+    for code, name, fund_type, pinyin in rows:
+        fetched[code] = (name, fund_type, pinyin, content_hash(name, fund_type, pinyin))
+
+    conn = get_db_connection()
+    try:
+        stored = {r["code"]: r["content_hash"] for r in conn.execute("SELECT code, content_hash FROM funds")}
+
+        inserts, updates = [], []
+        for code, (name, fund_type, pinyin, digest) in fetched.items():
+            if code not in stored:
+                inserts.append((code, name, fund_type, classify_sector(name) or "", pinyin, digest))
+            elif stored[code] != digest:
+                updates.append((name, fund_type, classify_sector(name) or "", pinyin, digest, code))
+        deletes = [(code,) for code in stored.keys() - fetched.keys()]
+        if deletes and len(fetched) < len(stored) * Config.FUND_LIST_MIN_RATIO:
+            logger.warning(f"Fund list has {len(fetched)} rows vs {len(stored)} stored; skipping deletions")
+            deletes = []
+
+        with conn:
+            conn.executemany("""
+                INSERT INTO funds (code, name, type, sector, pinyin, content_hash, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            """, inserts)
+            conn.executemany("""
+                UPDATE funds SET name = ?, type = ?, sector = ?, pinyin = ?, content_hash = ?,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE code = ?
+            """, updates)
+            conn.executemany("DELETE FROM funds WHERE code = ?", deletes)
+    finally:
+        conn.close()
+
+    return {
+        "fetched": len(fetched),
+        "inserted": len(inserts),
+        "updated": len(updates),
+        "deleted": len(deletes),
+        "unchanged": len(fetched) - len(inserts) - len(updates),
+    }
@@ -0,0 +1,152 @@
+"""
+Materialized per-fund indicators (fund_metrics).
+
+After NAVs are published, a scheduler job syncs the histories of held and
+subscribed funds and computes, for all of them in one batch, 1M/3M/6M/1Y
+returns plus volatility, Sharpe, max drawdown and annual return over the
+last ROLLING_WINDOW NAVs. Each fund's window is right-aligned into one
+(window x funds) matrix and the screener's column-wise metrics are applied
+to it. Readers (detail page, AI prompt) use a row only while its as_of
+date equals the fund's last stored NAV date.
+"""
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..config import Config
+from ..db import get_db_connection
+from . import nav_store
+from .nav_history import sync_fund_history
+from .screener import compute_metrics
+
+logger = logging.getLogger(__name__)
+
+# Trailing return periods in calendar days
+RETURN_PERIODS = {"1m": 30, "3m": 91, "6m": 182, "1y": 365}
+MIN_POINTS = 10
+
+
+def _tracked_codes() -> List[str]:
+    conn = get_db_connection()
+    try:
+        rows = conn.execute("SELECT code FROM positions UNION SELECT code FROM subscriptions").fetchall()
+    finally:
+        conn.close()
+    return [r["code"] for r in rows]
+
+
+def compute_fund_metrics(histories: Dict[str, Tuple[np.ndarray, np.ndarray]]) -> List[Dict[str, Any]]:
+    """
+    Metrics rows for many funds at once from their (epoch days, NAVs)
+    arrays. Values are fractions (0.05 = 5%); None where the history is
+    too short.
+    """
+    codes = [code for code, (days, _) in histories.items() if len(days)]
+    if not codes:
+        return []
+    window = Config.ROLLING_WINDOW
+    offsets = np.array(list(RETURN_PERIODS.values()))
+    matrix = np.full((window, len(codes)), np.nan)
+    base = np.full((len(offsets), len(codes)), np.nan)
+    last_days = np.empty(len(codes), dtype=np.int64)
+    for j, code in enumerate(codes):
+        days, navs = histories[code]
+        tail = navs[-window:]
+        matrix[window - len(tail):, j] = tail
+        last_days[j] = days[-1]
+        # NAV on or before each period start (none if the fund is younger)
+        idx = np.searchsorted(days, days[-1] - offsets, side="right") - 1
+        ok = idx >= 0
+        base[ok, j] = navs[idx[ok]]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns = matrix[-1] / base - 1
+    metrics = compute_metrics(matrix)
+    enough = np.sum(~np.isnan(matrix), axis=0) >= MIN_POINTS
+
+    def value(x: float, ok: bool = True) -> Optional[float]:
+        return float(x) if ok and not np.isnan(x) else None
+
+    rows = []
+    for j, code in enumerate(codes):
+        row = {"code": code, "as_of": str(np.datetime64(int(last_days[j]), "D"))}
+        for k, period in enumerate(RETURN_PERIODS):
+            row[f"return_{period}"] = value(returns[k, j])
+        for key in ("annual_return", "volatility", "sharpe", "max_drawdown"):
+            row[key] = value(metrics[key][j], enough[j])
+        rows.append(row)
+    return rows
+
+
+def _save(rows: List[Dict[str, Any]]):
+    conn = get_db_connection()
+    try:
+        with conn:
+            conn.executemany("""
+                INSERT OR REPLACE INTO fund_metrics (
+                    code, as_of, return_1m, return_3m, return_6m, return_1y,
+                    annual_return, volatility, sharpe, max_drawdown, updated_at
+                ) VALUES (
+                    :code, :as_of, :return_1m, :return_3m, :return_6m, :return_1y,
+                    :annual_return, :volatility, :sharpe, :max_drawdown, CURRENT_TIMESTAMP
+                )
+            """, rows)
+    finally:
+        conn.close()
+
+
+def refresh_fund_metrics(codes: Optional[List[str]] = None) -> int:
+    """
+    Background job: sync histories of held and subscribed funds (or `codes`)
+    and rewrite their fund_metrics rows in one batch. Returns rows written.
+    """
+    codes = _tracked_codes() if codes is None else codes
+    histories = {}
+    for code in codes:
+        try:
+            sync_fund_history(code)
+            arrays = nav_store.load_arrays(code)
+        except Exception as e:
+            logger.warning(f"Metrics history load failed for {code}: {e}")
+            continue
+        if arrays is None:
+            continue
+        # Copy only the tail the batch reads (covers the window and 1Y lookback),
+        # so the memory maps can be released
+        tail = 2 * Config.ROLLING_WINDOW
+        histories[code] = (np.array(arrays[0][-tail:]), np.array(arrays[1][-tail:]))
+    rows = compute_fund_metrics(histories)
+    if rows:
+        _save(rows)
+    return len(rows)
+
+
+def get_fund_metrics(code: str) -> Optional[Dict[str, Any]]:
+    conn = get_db_connection()
+    try:
+        row = conn.execute("SELECT * FROM fund_metrics WHERE code = ?", (code,)).fetchone()
+    finally:
+        conn.close()
+    return dict(row) if row else None
+
+
+def _pct(value: Optional[float]) -> str:
+    return "--" if value is None else f"{round(value * 100, 2)}%"
+
+
+def technical_from_metrics(metrics: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """fund_metrics row -> the detail page's technical indicators format."""
+    if metrics.get("sharpe") is None:
+        return None
+    return {
+        "sharpe": round(metrics["sharpe"], 2),
+        "volatility": _pct(metrics["volatility"]),
+        "max_drawdown": _pct(metrics["max_drawdown"]),
+        "annual_return": _pct(metrics["annual_return"]),
+    }
+
+
+def returns_from_metrics(metrics: Dict[str, Any]) -> Dict[str, str]:
+    """fund_metrics row -> {"1M": "1.23%", ...}."""
+    return {period.upper(): _pct(metrics.get(f"return_{period}")) for period in RETURN_PERIODS}
@@ -0,0 +1,200 @@
+"""
+Fund holdings cache: disclosed stock holdings stored per (fund, report period).
+
+Holdings only change when a new quarterly report is published, so they are
+fetched from AkShare by a background refresh and read locally on requests.
+"""
+import logging
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import akshare as ak
+import pandas as pd
+
+from ..config import Config
+from ..db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# "2024年4季度股票投资明细" -> ("2024", "4")
+_PERIOD_RE = re.compile(r"(\d{4})年(\d)季度")
+
+
+def _parse_report_period(label: Any) -> Optional[str]:
+    match = _PERIOD_RE.search(str(label or ""))
+    if not match:
+        return None
+    return f"{match.group(1)}Q{match.group(2)}"
+
+
+def fetch_fund_holdings(code: str) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+    """
+    Fetch the latest disclosed holdings from AkShare.
+    Tries the current year first, then the previous year.
+    Returns (report_period, [{"code", "name", "percent"}, ...]).
+    """
+    year = time.localtime().tm_year
+    df = None
+    for y in (year, year - 1):
+        df = ak.fund_portfolio_hold_em(symbol=code, date=str(y))
+        if df is not None and not df.empty:
+            break
+    if df is None or df.empty:
+        return None, []
+
+    df = df.copy()
+    df["占净值比例"] = pd.to_numeric(
+        df["占净值比例"].astype(str).str.replace("%", "", regex=False), errors="coerce"
+    ).fillna(0.0)
+    if "季度" in df.columns:
+        df["period"] = df["季度"].map(_parse_report_period)
+        latest = df["period"].dropna().max()
+        if isinstance(latest, str):
+            df = df[df["period"] == latest]
+    else:
+        latest = None
+    if not isinstance(latest, str):
+        latest = f"{year}Q0"
+
+    rows = []
+    seen = set()
+    for stock_code, name, percent in zip(df["股票代码"], df["股票名称"], df["占净值比例"]):
+        stock_code = str(stock_code).strip()
+        if not stock_code or stock_code in seen:
+            continue
+        seen.add(stock_code)
+        rows.append({"code": stock_code, "name": name, "percent": float(percent)})
+    return latest, rows
+
+
+def refresh_fund_holdings(code: str) -> bool:
+    """
+    Fetch holdings for one fund and store them under their report period.
+    Funds without stock holdings (bond/money funds) are recorded as checked
+    too, so they are not re-fetched on every request.
+    """
+    try:
+        period, rows = fetch_fund_holdings(code)
+    except Exception as e:
+        logger.warning(f"Holdings fetch failed for {code}: {e}")
+        return False
+
+    conn = get_db_connection()
+    try:
+        with conn:
+            if period and rows:
+                conn.execute("DELETE FROM fund_holdings WHERE code = ? AND report_period = ?", (code, period))
+                conn.executemany("""
+                    INSERT INTO fund_holdings (code, report_period, stock_code, stock_name, percent)
+                    VALUES (?, ?, ?, ?, ?)
+                """, [(code, period, r["code"], r["name"], r["percent"]) for r in rows])
+            conn.execute("""
+                INSERT INTO fund_holdings_sync (code, report_period, checked_at)
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(code) DO UPDATE SET
+                    report_period = COALESCE(excluded.report_period, fund_holdings_sync.report_period),
+                    checked_at = CURRENT_TIMESTAMP
+            """, (code, period if rows else None))
+    finally:
+        conn.close()
+    return True
+
+
+def get_fund_holdings(code: str, limit: int = 20) -> Dict[str, Any]:
+    """
+    Latest stored holdings of a fund, sorted by weight.
+    Only a fund that was never synced is fetched inline (first view).
+    """
+    conn = get_db_connection()
+    try:
+        row = conn.execute(
+            "SELECT report_period FROM fund_holdings_sync WHERE code = ?", (code,)
+        ).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        refresh_fund_holdings(code)
+    return get_stored_holdings([code], limit=limit).get(code, {"report_period": None, "holdings": [], "concentration": 0.0})
+
+
+def get_stored_holdings(codes: List[str], limit: int = 20) -> Dict[str, Dict[str, Any]]:
+    """
+    Latest-period holdings for many funds from the local table (no network).
+    """
+    if not codes:
+        return {}
+    placeholders = ",".join("?" * len(codes))
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(f"""
+            SELECT h.code, h.report_period, h.stock_code, h.stock_name, h.percent
+            FROM fund_holdings h
+            JOIN fund_holdings_sync s ON s.code = h.code AND s.report_period = h.report_period
+            WHERE h.code IN ({placeholders}) AND h.percent >= 0.01
+            ORDER BY h.code, h.percent DESC
+        """, codes).fetchall()
+    finally:
+        conn.close()
+
+    result: Dict[str, Dict[str, Any]] = {}
+    for r in rows:
+        entry = result.setdefault(r["code"], {"report_period": r["report_period"], "holdings": [], "concentration": 0.0})
+        if len(entry["holdings"]) < 10:
+            entry["concentration"] += r["percent"]
+        if len(entry["holdings"]) < limit:
+            entry["holdings"].append({"code": r["stock_code"], "name": r["stock_name"], "percent": r["percent"]})
+    for entry in result.values():
+        entry["concentration"] = round(entry["concentration"], 2)
+    return result
+
+
+def load_holdings_weights(codes: List[str]) -> List[Tuple[str, str, float]]:
+    """
+    All latest-period (fund code, stock code, percent of NAV) rows for the
+    given funds, without the top-N cut. Used to build the estimator matrix.
+    """
+    if not codes:
+        return []
+    placeholders = ",".join("?" * len(codes))
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(f"""
+            SELECT h.code, h.stock_code, h.percent
+            FROM fund_holdings h
+            JOIN fund_holdings_sync s ON s.code = h.code AND s.report_period = h.report_period
+            WHERE h.code IN ({placeholders}) AND h.percent > 0
+        """, codes).fetchall()
+    finally:
+        conn.close()
+    return [(r["code"], r["stock_code"], float(r["percent"])) for r in rows]
+
+
+def refresh_tracked_holdings() -> int:
+    """
+    Background job: refresh holdings of held, subscribed and previously viewed
+    funds whose last check is older than HOLDINGS_REFRESH_INTERVAL.
+    At most HOLDINGS_REFRESH_BATCH funds per run, oldest first.
+    """
+    conn = get_db_connection()
+    try:
+        rows = conn.execute("""
+            SELECT c.code FROM (
+                SELECT code FROM positions
+                UNION SELECT code FROM subscriptions
+                UNION SELECT code FROM fund_holdings_sync
+            ) c
+            LEFT JOIN fund_holdings_sync s ON s.code = c.code
+            WHERE s.checked_at IS NULL
+               OR s.checked_at < datetime('now', ?)
+            ORDER BY s.checked_at IS NOT NULL, s.checked_at
+            LIMIT ?
+        """, (f"-{Config.HOLDINGS_REFRESH_INTERVAL} seconds", Config.HOLDINGS_REFRESH_BATCH)).fetchall()
+    finally:
+        conn.close()
+
+    refreshed = 0
+    for row in rows:
+        if refresh_fund_holdings(row["code"]):
+            refreshed += 1
+    return refreshed
@@ -0,0 +1,167 @@
+"""
+Shared upstream HTTP client.
+
+All data-source requests run on one dedicated asyncio loop ("IO loop") with a
+keep-alive connection pool per source, per-source timeouts and retry with
+jittered exponential backoff.
+
+- Async code (endpoints) awaits `get_text` directly, no worker thread is held.
+- Sync code (scheduler thread, akshare-heavy paths) calls `run_sync(coro)`.
+
+Every call is recorded in the source's monitor (latency, errors, circuit
+breaker); a source with an open circuit fails fast with CircuitOpenError.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Any, Awaitable, Dict, Optional, TypeVar
+
+import httpx
+
+from ..config import Config
+from .resilience import CircuitOpenError, get_monitor
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Start the IO loop thread on first use."""
+    global _loop
+    if _loop is not None:
+        return _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            t = threading.Thread(target=loop.run_forever, name="upstream-io", daemon=True)
+            t.start()
+            _loop = loop
+    return _loop
+
+
+def _get_client(source: str) -> httpx.AsyncClient:
+    """One pooled client per source (i.e. per upstream host). IO loop only."""
+    client = _clients.get(source)
+    if client is None:
+        timeout = Config.UPSTREAM_TIMEOUTS.get(source, Config.UPSTREAM_DEFAULT_TIMEOUT)
+        client = httpx.AsyncClient(
+            headers=DEFAULT_HEADERS,
+            timeout=httpx.Timeout(timeout, connect=min(timeout, 3.0)),
+            limits=httpx.Limits(
+                max_connections=Config.UPSTREAM_MAX_CONNECTIONS,
+                max_keepalive_connections=Config.UPSTREAM_MAX_KEEPALIVE,
+                keepalive_expiry=30.0,
+            ),
+        )
+        _clients[source] = client
+    return client
+
+
+def _is_retryable(e: Exception) -> bool:
+    if isinstance(e, httpx.TransportError):
+        return True
+    if isinstance(e, httpx.HTTPStatusError):
+        return e.response.status_code >= 500 or e.response.status_code == 429
+    return False
+
+
+async def _get_text_with_retries(source: str, url: str, headers: Optional[Dict[str, str]], params: Optional[Dict[str, Any]]) -> str:
+    client = _get_client(source)
+    retries = Config.UPSTREAM_RETRIES
+    for attempt in range(retries + 1):
+        try:
+            response = await client.get(url, headers=headers, params=params)
+            response.raise_for_status()
+            return response.text
+        except Exception as e:
+            if attempt >= retries or not _is_retryable(e):
+                raise
+            # Full jitter: spread retries so a hiccup does not turn into a burst
+            delay = random.uniform(0, Config.UPSTREAM_RETRY_BACKOFF * (2 ** attempt))
+            logger.debug(f"Retry {source} in {delay:.2f}s after {e!r}")
+            await asyncio.sleep(delay)
+    raise RuntimeError("unreachable")
+
+
+async def _get_text(source: str, url: str, headers: Optional[Dict[str, str]], params: Optional[Dict[str, Any]]) -> str:
+    monitor = get_monitor(source)
+    started = time.monotonic()
+    try:
+        text = await _get_text_with_retries(source, url, headers, params)
+    except asyncio.CancelledError:
+        monitor.record_cancelled(time.monotonic() - started)
+        raise
+    except Exception as e:
+        monitor.record_failure(time.monotonic() - started, trip=_is_retryable(e))
+        raise
+    monitor.record_success(time.monotonic() - started)
+    return text
+
+
+async def _on_io_loop(coro: Awaitable[T]) -> T:
+    """Await `coro` on the IO loop, from whichever loop we are on."""
+    loop = _get_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        return await coro
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+
+async def get_text(source: str, url: str, headers: Optional[Dict[str, str]] = None, params: Optional[Dict[str, Any]] = None) -> str:
+    """
+    GET `url` through the pooled client of `source` and return the body.
+    Raises on HTTP errors after retries are exhausted, and CircuitOpenError
+    without sending anything while the source's circuit is open.
+    """
+    if not get_monitor(source).allow():
+        raise CircuitOpenError(f"{source} circuit is open")
+    return await _on_io_loop(_get_text(source, url, headers, params))
+
+
+def source_available(source: str) -> bool:
+    """False while the source's circuit is open (callers can skip it up front)."""
+    return get_monitor(source).is_available()
+
+
+def run_sync(coro: Awaitable[T]) -> T:
+    """
+    Run a coroutine on the IO loop and block until it finishes.
+    For sync callers only - never call this from a running event loop.
+    """
+    loop = _get_loop()
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+    coro.close()
+    raise RuntimeError("run_sync() called from a running event loop; await the coroutine instead")
+
+
+async def _close_clients():
+    for client in list(_clients.values()):
+        await client.aclose()
+    _clients.clear()
+
+
+async def aclose():
+    """Close pooled connections (application shutdown)."""
+    if _loop is None:
+        return
+    try:
+        await _on_io_loop(_close_clients())
+    except Exception as e:
+        logger.warning(f"Failed to close upstream clients: {e}")
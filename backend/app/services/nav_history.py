@@ -0,0 +1,236 @@
+"""
+Incremental NAV history sync.
+
+fund_history_sync keeps, per fund, the last stored NAV date and when the
+upstream was last asked. A fund is only fetched when the trading calendar
+says a newer NAV can exist (and not more often than NAV_RECHECK_INTERVAL,
+since some funds publish late); then only dates from NAV_REFETCH_DAYS
+before the last stored one are requested (Eastmoney lsjz with startDate)
+and upserted in one executemany transaction. Re-requesting that short
+overlap picks up NAVs the upstream corrected after publishing: a changed
+NAV is overwritten and bumps the fund's revision, which is part of its
+history version. The first sync of a fund loads its full history from
+AkShare.
+"""
+import json
+import logging
+import math
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import akshare as ak
+import pandas as pd
+
+from ..config import Config
+from ..db import get_db_connection
+from . import http_client, nav_store
+from .rolling import update_rolling
+from .trading_calendar import latest_nav_date
+
+logger = logging.getLogger(__name__)
+
+LSJZ_HEADERS = {"Referer": "http://fundf10.eastmoney.com/"}
+
+
+def _sync_state(code: str) -> Optional[dict]:
+    conn = get_db_connection()
+    try:
+        row = conn.execute(
+            "SELECT last_date, checked_at, revision FROM fund_history_sync WHERE code = ?", (code,)
+        ).fetchone()
+    finally:
+        conn.close()
+    return dict(row) if row else None
+
+
+def needs_sync(state: Optional[dict], now: Optional[datetime] = None) -> bool:
+    """Whether the upstream can have NAVs newer than what is stored."""
+    if state is None:
+        return True
+    now = now or datetime.now()
+    publish = dtime(Config.NAV_PUBLISH_HOUR, 0)
+    if state["last_date"] and state["last_date"] >= latest_nav_date(now, publish).isoformat():
+        return False
+    try:
+        checked_at = datetime.fromisoformat(state["checked_at"])
+    except (TypeError, ValueError):
+        return True
+    # checked_at is SQLite CURRENT_TIMESTAMP (UTC)
+    age = datetime.now(timezone.utc).replace(tzinfo=None) - checked_at
+    return age.total_seconds() >= Config.NAV_RECHECK_INTERVAL
+
+
+def history_version(code: str) -> Optional[str]:
+    """
+    Last stored NAV date of a fund, suffixed with "#<revision>" once stored
+    NAVs were corrected (changes exactly when its history does).
+    """
+    state = _sync_state(code)
+    if not state:
+        return None
+    if state["revision"] and state["last_date"]:
+        return f"{state['last_date']}#{state['revision']}"
+    return state["last_date"]
+
+
+async def fetch_lsjz_since(code: str, start_date: str) -> List[Tuple[str, float]]:
+    """
+    NAVs on or after start_date from Eastmoney's paged lsjz API, oldest first.
+    Raises when the gap is too large for incremental paging.
+    """
+    page_size = Config.LSJZ_PAGE_SIZE
+    rows: List[Tuple[str, float]] = []
+    page, pages = 1, 1
+    while page <= pages:
+        text = await http_client.get_text("lsjz", Config.EASTMONEY_LSJZ_API_URL, headers=LSJZ_HEADERS, params={
+            "fundCode": code, "pageIndex": page, "pageSize": page_size, "startDate": start_date, "endDate": "",
+        })
+        payload = json.loads(text)
+        total = int(payload.get("TotalCount") or 0)
+        pages = math.ceil(total / page_size)
+        if pages > Config.LSJZ_MAX_PAGES:
+            raise ValueError(f"{total} missing NAVs for {code}, too many for incremental sync")
+        for item in (payload.get("Data") or {}).get("LSJZList") or []:
+            try:
+                rows.append((item["FSRQ"][:10], float(item["DWJZ"])))
+            except (KeyError, TypeError, ValueError):
+                continue  # unpublished / suspended rows have an empty DWJZ
+        page += 1
+    rows.sort()
+    return rows
+
+
+def fetch_full_history(code: str) -> List[Tuple[str, float]]:
+    df = ak.fund_open_fund_info_em(symbol=code, indicator="单位净值走势")
+    if df is None or df.empty:
+        return []
+    dates = pd.to_datetime(df["净值日期"]).dt.strftime("%Y-%m-%d")
+    navs = pd.to_numeric(df["单位净值"], errors="coerce")
+    mask = navs.notna()
+    return sorted(zip(dates[mask].tolist(), navs[mask].astype(float).tolist()))
+
+
+def _store(code: str, rows: List[Tuple[str, float]], last_date: Optional[str]) -> Tuple[int, int]:
+    """
+    Upsert rows and advance the sync state, in one transaction. Returns
+    (appended, corrected); a corrected NAV bumps the revision and drops the
+    fund's nightly metrics row, which no longer matches the history.
+    """
+    if rows:
+        last_date = max(last_date or "", rows[-1][0])
+    conn = get_db_connection()
+    try:
+        with conn:
+            stored = {}
+            if rows:
+                stored = {r["date"]: r["nav"] for r in conn.execute(
+                    "SELECT date, nav FROM fund_history WHERE code = ? AND date >= ? AND date <= ?",
+                    (code, rows[0][0], rows[-1][0])
+                )}
+            appended = sum(1 for d, _ in rows if d not in stored)
+            corrected = sum(1 for d, nav in rows if d in stored and stored[d] != nav)
+            conn.executemany("""
+                INSERT INTO fund_history (code, date, nav, updated_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(code, date) DO UPDATE SET
+                    nav = excluded.nav,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE nav != excluded.nav
+            """, [(code, d, nav) for d, nav in rows])
+            conn.execute("""
+                INSERT INTO fund_history_sync (code, last_date, checked_at)
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(code) DO UPDATE SET
+                    last_date = excluded.last_date,
+                    checked_at = CURRENT_TIMESTAMP,
+                    revision = revision + ?
+            """, (code, last_date, 1 if corrected else 0))
+            if corrected:
+                conn.execute("DELETE FROM fund_metrics WHERE code = ?", (code,))
+    finally:
+        conn.close()
+    return appended, corrected
+
+
+def sync_fund_history(code: str, force: bool = False) -> int:
+    """
+    Bring fund_history up to date for one fund. Returns the number of rows
+    appended or corrected (0 without any network I/O when nothing new can
+    exist).
+    """
+    state = _sync_state(code)
+    if not force and not needs_sync(state):
+        return 0
+
+    last_date = state["last_date"] if state else None
+    rows: List[Tuple[str, float]] = []
+    try:
+        if last_date:
+            start = (date.fromisoformat(last_date) - timedelta(days=Config.NAV_REFETCH_DAYS)).isoformat()
+            try:
+                rows = http_client.run_sync(fetch_lsjz_since(code, start))
+            except Exception as e:
+                logger.info(f"Incremental NAV fetch failed for {code}, loading full history: {e}")
+                rows = [r for r in fetch_full_history(code) if r[0] >= start]
+        else:
+            rows = fetch_full_history(code)
+    except Exception as e:
+        logger.warning(f"History fetch error for {code}: {e}")
+        return 0
+
+    appended, corrected = _store(code, rows, last_date)
+    if (appended or corrected) and Config.NAV_STORE_ENABLED:
+        try:
+            nav_store.rebuild_from_db(code)
+        except OSError as e:
+            logger.warning(f"NAV store write failed for {code}: {e}")
+    if appended or corrected:
+        try:
+            update_rolling(code, force=corrected > 0)
+        except Exception as e:
+            logger.warning(f"Rolling indicator update failed for {code}: {e}")
+    return appended + corrected
+
+
+# Row-value IN (...) needs 2 variables per pair; stay below SQLite's limit
+_LOOKUP_CHUNK = 400
+
+
+def _lookup_stored(pairs: List[Tuple[str, str]]) -> Dict[Tuple[str, str], float]:
+    found: Dict[Tuple[str, str], float] = {}
+    if not pairs:
+        return found
+    conn = get_db_connection()
+    try:
+        for i in range(0, len(pairs), _LOOKUP_CHUNK):
+            chunk = pairs[i:i + _LOOKUP_CHUNK]
+            values = ",".join("(?, ?)" for _ in chunk)
+            params = [v for pair in chunk for v in pair]
+            for r in conn.execute(
+                f"SELECT code, date, nav FROM fund_history WHERE (code, date) IN (VALUES {values})", params
+            ):
+                found[(r["code"], r["date"])] = float(r["nav"])
+    finally:
+        conn.close()
+    return found
+
+
+def get_navs_on_dates(pairs: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], float]:
+    """
+    Point-in-time NAVs for many (code, "YYYY-MM-DD") pairs.
+    Answered from fund_history (primary key lookups, one query); only the
+    distinct codes still missing a NAV that can already be published are
+    synced from upstream, then looked up again. Pairs without a NAV are
+    left out of the result.
+    """
+    wanted = list(dict.fromkeys((code, d[:10]) for code, d in pairs if code and d))
+    found = _lookup_stored(wanted)
+
+    latest = latest_nav_date(publish_time=dtime(Config.NAV_PUBLISH_HOUR, 0)).isoformat()
+    missing = [p for p in wanted if p not in found and p[1] <= latest]
+    synced = False
+    for code in dict.fromkeys(code for code, _ in missing):
+        synced = sync_fund_history(code) > 0 or synced
+    if synced:
+        found.update(_lookup_stored(missing))
+    return found
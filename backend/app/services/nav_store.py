@@ -0,0 +1,220 @@
+"""
+Memory-mapped columnar NAV store.
+
+One file per fund next to the database (data/nav/{code}.nav):
+
+    16-byte header  b"NAV1" + uint32 count + int32 last epoch day
+                    + uint32 history revision
+    int32[count]    epoch days (days since 1970-01-01), ascending
+    float64[count]  unit NAVs, 8-byte aligned
+
+Files are derived from fund_history (the source of truth) and rewritten
+atomically (temp file + os.replace) after each incremental sync. Readers
+get read-only NumPy views straight onto the mapped pages: opening a fund
+costs one mmap, and only the pages actually touched become resident.
+
+The header's last day and revision are checked against fund_history_sync
+when a file is opened; a stale file (e.g. a replace that failed on Windows because the
+file was still mapped) is rebuilt, or fund_history is read directly.
+"""
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..config import Config
+from ..db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"NAV1"
+HEADER_SIZE = 16
+
+_views: "OrderedDict[str, Tuple[np.ndarray, np.ndarray, Tuple[int, int]]]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _store_dir() -> str:
+    return Config.NAV_STORE_DIR or os.path.join(os.path.dirname(Config.DB_PATH), "nav")
+
+
+def _path(code: str) -> str:
+    return os.path.join(_store_dir(), f"{code}.nav")
+
+
+def _navs_offset(count: int) -> int:
+    end = HEADER_SIZE + 4 * count
+    return (end + 7) // 8 * 8
+
+
+def write_arrays(code: str, days: np.ndarray, navs: np.ndarray, revision: int = 0):
+    """Atomically replace the file of one fund."""
+    count = len(days)
+    buf = np.zeros(_navs_offset(count) + 8 * count, dtype=np.uint8)
+    buf[:4] = np.frombuffer(MAGIC, dtype=np.uint8)
+    buf[4:8] = np.frombuffer(np.uint32(count).tobytes(), dtype=np.uint8)
+    last_day = int(days[-1]) if count else 0
+    buf[8:12] = np.frombuffer(np.int32(last_day).tobytes(), dtype=np.uint8)
+    buf[12:16] = np.frombuffer(np.uint32(revision).tobytes(), dtype=np.uint8)
+    buf[HEADER_SIZE:HEADER_SIZE + 4 * count] = np.ascontiguousarray(days, dtype="<i4").view(np.uint8)
+    off = _navs_offset(count)
+    buf[off:] = np.ascontiguousarray(navs, dtype="<f8").view(np.uint8)
+
+    os.makedirs(_store_dir(), exist_ok=True)
+    path = _path(code)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    # Drop our own map first: Windows cannot replace a file that is still mapped
+    with _lock:
+        _views.pop(code, None)
+    try:
+        buf.tofile(tmp)
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _read_db(code: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(
+            "SELECT date, nav FROM fund_history WHERE code = ? ORDER BY date", (code,)
+        ).fetchall()
+    finally:
+        conn.close()
+    if not rows:
+        return None
+    days = np.array([r["date"][:10] for r in rows], dtype="datetime64[D]").astype(np.int32)
+    return days, np.array([r["nav"] for r in rows], dtype=np.float64)
+
+
+def _revision(code: str) -> int:
+    conn = get_db_connection()
+    try:
+        row = conn.execute("SELECT revision FROM fund_history_sync WHERE code = ?", (code,)).fetchone()
+    finally:
+        conn.close()
+    return row["revision"] if row else 0
+
+
+def rebuild_from_db(code: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """(Re)write one fund's file from fund_history. Returns None if it has no rows."""
+    revision = _revision(code)
+    arrays = _read_db(code)
+    if arrays is not None:
+        write_arrays(code, *arrays, revision=revision)
+    return arrays
+
+
+def _to_mark(last_date: Optional[str], revision: int) -> Optional[Tuple[int, int]]:
+    if not last_date:
+        return None
+    return int(np.datetime64(last_date[:10], "D").astype(np.int64)), revision
+
+
+def _expected_mark(code: str) -> Optional[Tuple[int, int]]:
+    """(Epoch day of the last synced NAV, revision); None if the fund was never synced."""
+    return history_marks([code]).get(code)
+
+
+def history_marks(codes: List[str]) -> Dict[str, Optional[Tuple[int, int]]]:
+    """_expected_mark for many funds in one query, for batch readers of get_arrays."""
+    result: Dict[str, Optional[Tuple[int, int]]] = {}
+    conn = get_db_connection()
+    try:
+        for i in range(0, len(codes), 500):
+            chunk = codes[i:i + 500]
+            rows = conn.execute(
+                f"SELECT code, last_date, revision FROM fund_history_sync WHERE code IN ({','.join('?' * len(chunk))})",
+                chunk
+            ).fetchall()
+            result.update((r["code"], _to_mark(r["last_date"], r["revision"])) for r in rows)
+    finally:
+        conn.close()
+    return result
+
+
+def _open(code: str, expected: Optional[Tuple[int, int]]) -> Optional[Tuple[np.ndarray, np.ndarray, Tuple[int, int]]]:
+    path = _path(code)
+    try:
+        mm = np.memmap(path, dtype=np.uint8, mode="r")
+    except (FileNotFoundError, ValueError):
+        return None  # missing or empty file
+    if len(mm) < HEADER_SIZE or bytes(mm[:4]) != MAGIC:
+        logger.warning(f"Corrupt NAV store file {path}")
+        return None
+    count = int(mm[4:8].view("<u4")[0])
+    mark = (int(mm[8:12].view("<i4")[0]), int(mm[12:16].view("<u4")[0]))
+    if expected is not None and mark != expected:
+        return None  # stale (or written before the header had the last day)
+    off = _navs_offset(count)
+    if len(mm) < off + 8 * count:
+        logger.warning(f"Truncated NAV store file {path}")
+        return None
+    days = mm[HEADER_SIZE:HEADER_SIZE + 4 * count].view("<i4")
+    navs = mm[off:off + 8 * count].view("<f8")
+    return days, navs, mark
+
+
+def _fallback(code: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """fund_history arrays when the file stays unusable; a stale file is removed if possible."""
+    try:
+        os.remove(_path(code))
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Stale NAV store file kept for {code}: {e}")
+    return _read_db(code)
+
+
+def get_arrays(code: str, expected_marks: Optional[Dict[str, Optional[Tuple[int, int]]]] = None) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Read-only (epoch days int32, NAV float64) views of a fund's full
+    history, oldest first; built from fund_history on first use or when
+    the file is stale. Open maps are kept in a small LRU (one file
+    descriptor each). If the file cannot be rewritten, the arrays are
+    read from fund_history instead (not cached). Batch callers pass
+    `expected_marks` from history_marks() to avoid one query per fund.
+    """
+    if not Config.NAV_STORE_ENABLED:
+        return None
+    with _lock:
+        views = _views.get(code)
+        if views is not None:
+            known = expected_marks.get(code) if expected_marks is not None else None
+            if known is None or views[2] == known:
+                _views.move_to_end(code)
+                return views[:2]
+            _views.pop(code, None)  # history changed without a rewrite through write_arrays
+    expected = expected_marks.get(code) if expected_marks is not None else _expected_mark(code)
+    views = _open(code, expected)
+    if views is None:
+        try:
+            if rebuild_from_db(code) is None:
+                return None
+        except OSError as e:
+            logger.warning(f"NAV store rebuild failed for {code}: {e}")
+        views = _open(code, expected)
+        if views is None:
+            return _fallback(code)
+    with _lock:
+        _views[code] = views
+        while len(_views) > Config.NAV_STORE_MAX_OPEN:
+            _views.popitem(last=False)
+    return views[:2]
+
+
+def load_arrays(code: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    get_arrays, or the same arrays read from fund_history when the store is
+    disabled. For batch jobs that must work either way.
+    """
+    if Config.NAV_STORE_ENABLED:
+        return get_arrays(code)
+    return _read_db(code)
@@ -0,0 +1,90 @@
+"""
+Single-pass parser for Eastmoney PingZhong data scripts
+(http://fund.eastmoney.com/pingzhongdata/{code}.js).
+
+The script is a few hundred KB of `var Name = <JSON>;/*comment*/` statements.
+Instead of one regex scan per field, walk the `var` assignments once, decode
+only the ones we need in place (json raw_decode, no substring copies) and
+turn Data_netWorthTrend directly into compact arrays.
+"""
+import json
+import re
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+_VAR_RE = re.compile(r'var\s+(\w+)\s*=\s*')
+# {"x":1536076800000,"y":1.0,"equityReturn":0,"unitMoney":""}
+_POINT_RE = re.compile(r'"x":(\d+),"y":(-?[\d.]+(?:[eE][-+]?\d+)?)')
+
+_STRING_VARS = {"fS_name", "fS_code", "syl_1n", "syl_6y", "syl_3y", "syl_1y"}
+_JSON_VARS = {"Data_currentFundManager", "Data_performanceEvaluation"}
+_NAV_TREND_VAR = "Data_netWorthTrend"
+
+# Timestamps are midnight China Standard Time (UTC+8) in milliseconds
+_CST_OFFSET_MS = 8 * 3600 * 1000
+_DAY_MS = 86400 * 1000
+
+_decoder = json.JSONDecoder()
+
+
+def _decode_nav_trend(text: str, pos: int) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Decode `[{"x":...,"y":...}, ...]` starting at `pos` into
+    (epoch days int32, NAVs float64) without building per-point dicts.
+    """
+    end = text.find("];", pos)
+    if end < 0:
+        end = len(text)
+    points = _POINT_RE.findall(text, pos, end)
+    if points:
+        raw = np.array(points, dtype=np.float64)
+        days = ((raw[:, 0] + _CST_OFFSET_MS) // _DAY_MS).astype(np.int32)
+        navs = raw[:, 1]
+    else:
+        # Unexpected key order: fall back to a regular JSON decode
+        items, _ = _decoder.raw_decode(text, pos)
+        days = np.array([(int(i["x"]) + _CST_OFFSET_MS) // _DAY_MS for i in items], dtype=np.int32)
+        navs = np.array([float(i["y"]) for i in items], dtype=np.float64)
+    return days, np.ascontiguousarray(navs), end
+
+
+def parse_pingzhong_data(text: str) -> Dict[str, Any]:
+    """
+    Extract the fields used by the detail page in one pass.
+
+    Returns name, code, manager, syl_* returns, performance scores and the
+    full NAV history as `nav_days` (days since 1970-01-01, int32) and
+    `navs` (float64), oldest first.
+    """
+    data: Dict[str, Any] = {}
+    pos = 0
+    while True:
+        m = _VAR_RE.search(text, pos)
+        if not m:
+            break
+        name = m.group(1)
+        pos = m.end()
+        try:
+            if name in _STRING_VARS:
+                value, pos = _decoder.raw_decode(text, pos)
+                key = {"fS_name": "name", "fS_code": "code"}.get(name, name)
+                data[key] = value
+            elif name in _JSON_VARS:
+                value, pos = _decoder.raw_decode(text, pos)
+                if name == "Data_currentFundManager":
+                    if value:
+                        data["manager"] = ", ".join([mgr["name"] for mgr in value])
+                elif value and "data" in value and "categories" in value:
+                    data["performance"] = dict(zip(value["categories"], value["data"]))
+            elif name == _NAV_TREND_VAR:
+                data["nav_days"], data["navs"], pos = _decode_nav_trend(text, pos)
+        except (ValueError, KeyError, TypeError):
+            continue
+    return data
+
+
+def history_records(days: np.ndarray, navs: np.ndarray) -> List[Dict[str, Any]]:
+    """Convert compact arrays to the API's [{"date": "YYYY-MM-DD", "nav": 1.23}, ...]."""
+    dates = days.astype("datetime64[D]").astype(str)
+    return [{"date": d, "nav": n} for d, n in zip(dates.tolist(), navs.tolist())]
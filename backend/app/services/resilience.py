@@ -0,0 +1,149 @@
+"""
+Per-source health: latency/error statistics and a circuit breaker.
+
+A source that keeps failing (timeouts, 5xx, 429) is skipped entirely for a
+cool-down window instead of making every request wait for it. After the
+cool-down one trial request is let through (half-open); its outcome closes
+or re-opens the circuit.
+"""
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from ..config import Config
+
+_registry: Dict[str, "SourceMonitor"] = {}
+_registry_lock = threading.Lock()
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a source whose circuit is open."""
+
+
+class SourceMonitor:
+    def __init__(self, name: str, failure_threshold: int, cooldown: float, window: int):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._probe_started = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.rejected = 0
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._probing or time.monotonic() - self._opened_at >= self.cooldown:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now. Claims the trial slot when half-open."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = time.monotonic()
+            # A trial that never reported back (lost before it was sent) expires too
+            if now - self._opened_at >= self.cooldown and (not self._probing or now - self._probe_started >= self.cooldown):
+                self._probing = True
+                self._probe_started = now
+                return True
+            self.rejected += 1
+            return False
+
+    def is_available(self) -> bool:
+        """Like allow(), but without claiming the trial slot (for planning)."""
+        return self.state != "open"
+
+    def record_success(self, latency: float):
+        with self._lock:
+            self.requests += 1
+            self._latencies.append(latency)
+            self._consecutive_failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self, latency: float, trip: bool = True):
+        """
+        trip=False for errors that say nothing about source health
+        (e.g. a 404 for an unknown fund): counted, but never opens the circuit.
+        """
+        with self._lock:
+            self.requests += 1
+            self.errors += 1
+            if not trip:
+                self._latencies.append(latency)
+                return
+            self._consecutive_failures += 1
+            if self._probing or self._consecutive_failures >= self.failure_threshold:
+                if self._opened_at is None or self._probing:
+                    self.trips += 1
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def record_cancelled(self, latency: float):
+        """
+        A request abandoned by its caller (e.g. the hedge won). Its elapsed
+        time is a lower bound of the real latency; keep it so the percentiles
+        are not biased towards fast answers. Frees the half-open trial slot.
+        """
+        with self._lock:
+            self._latencies.append(latency)
+            self._probing = False
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._latencies)
+        if not samples:
+            return None
+        idx = min(len(samples) - 1, max(0, math.ceil(q / 100 * len(samples)) - 1))
+        return samples[idx]
+
+    def sample_count(self) -> int:
+        return len(self._latencies)
+
+    def stats(self) -> Dict[str, Any]:
+        p50 = self.percentile(50)
+        p95 = self.percentile(95)
+        return {
+            "state": self.state,
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": round(self.errors / self.requests, 4) if self.requests else 0.0,
+            "rejected": self.rejected,
+            "trips": self.trips,
+            "consecutive_failures": self._consecutive_failures,
+            "latency_p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "latency_p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "samples": len(self._latencies),
+        }
+
+
+def get_monitor(source: str) -> SourceMonitor:
+    monitor = _registry.get(source)
+    if monitor is None:
+        with _registry_lock:
+            monitor = _registry.get(source)
+            if monitor is None:
+                monitor = SourceMonitor(
+                    source,
+                    failure_threshold=Config.CIRCUIT_FAILURE_THRESHOLD,
+                    cooldown=Config.CIRCUIT_COOLDOWN,
+                    window=Config.SOURCE_LATENCY_WINDOW,
+                )
+                _registry[source] = monitor
+    return monitor
+
+
+def get_source_stats() -> Dict[str, Dict[str, Any]]:
+    """Latency/error counters and circuit state of every upstream source."""
+    return {name: monitor.stats() for name, monitor in _registry.items()}
@@ -0,0 +1,159 @@
+"""
+Portfolio risk of held positions.
+
+Daily returns of every held fund are aligned on one date grid (the
+screener's NAV matrix) and the covariance/correlation matrices, portfolio
+volatility and each position's marginal and total risk contribution are
+computed with matrix products, no per-pair loops. Weights are market
+values at the last stored NAV.
+
+Funds covering less than RISK_MIN_COVERAGE of the window (new funds) are
+left out and listed under "excluded", so one young fund does not shorten
+the sample for all others. Results are cached per (window, holdings,
+last NAV dates): a new NAV date or a changed position gives a new key.
+"""
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ..config import Config
+from ..db import get_db_connection
+from .cache import TTLCache
+from .nav_history import sync_fund_history
+from .screener import build_nav_matrix, load_histories
+
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS = 250.0
+
+_risk_cache = TTLCache("risk", ttl=Config.RISK_CACHE_TTL, max_size=16)
+
+
+def _held_positions() -> List[Dict[str, Any]]:
+    conn = get_db_connection()
+    try:
+        rows = conn.execute("""
+            SELECT p.code, p.shares, f.name, s.last_date, s.revision
+            FROM positions p
+            LEFT JOIN funds f ON f.code = p.code
+            LEFT JOIN fund_history_sync s ON s.code = p.code
+            WHERE p.shares > 0
+            ORDER BY p.code
+        """).fetchall()
+    finally:
+        conn.close()
+    return [dict(r) for r in rows]
+
+
+def portfolio_risk(returns: np.ndarray, weights: np.ndarray) -> Dict[str, Any]:
+    """
+    Risk figures of a (days x funds) daily return matrix and weights summing
+    to 1. Covariances and volatilities are annualized.
+    """
+    t = returns.shape[0]
+    centered = returns - returns.mean(axis=0)
+    cov = centered.T @ centered / (t - 1) * TRADING_DAYS
+    vols = np.sqrt(np.clip(np.diag(cov), 0.0, None))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        corr = cov / np.outer(vols, vols)
+    corr = np.where(np.isfinite(corr), corr, 0.0)
+    np.fill_diagonal(corr, np.where(vols > 0, 1.0, 0.0))
+
+    port_var = float(weights @ cov @ weights)
+    port_vol = float(np.sqrt(max(port_var, 0.0)))
+    # d(vol)/d(w_i) and each position's share of portfolio volatility
+    marginal = cov @ weights / port_vol if port_vol > 0 else np.zeros_like(weights)
+    contribution = weights * marginal
+    return {
+        "covariance": cov,
+        "correlation": corr,
+        "volatilities": vols,
+        "volatility": port_vol,
+        "diversification_ratio": float(weights @ vols / port_vol) if port_vol > 0 else None,
+        "marginal": marginal,
+        "contribution": contribution,
+    }
+
+
+def _compute(positions: List[Dict[str, Any]], days: int) -> Dict[str, Any]:
+    codes = [p["code"] for p in positions]
+    empty = {"as_of": None, "window": None, "codes": [], "funds": [], "portfolio": None,
+             "correlation": [], "covariance": [], "excluded": codes}
+    end_day = int(np.datetime64("today", "D").astype(np.int64))
+    histories = load_histories(codes, end_day - days)
+    histories = {c: h for c, h in histories.items() if len(h[0])}
+    if not histories:
+        return empty
+
+    grid, matrix_codes, matrix = build_nav_matrix(histories, end_day - days, end_day)
+    if len(grid) < 3:
+        return empty
+    coverage = np.sum(~np.isnan(matrix), axis=0) / len(grid)
+    keep = coverage >= Config.RISK_MIN_COVERAGE
+    included = [c for c, k in zip(matrix_codes, keep) if k]
+    excluded = [c for c in codes if c not in included]
+    if not included:
+        return {**empty, "excluded": excluded}
+
+    navs = matrix[:, keep]
+    # Common sample: from the first day every included fund has a NAV
+    first = int(np.max(np.argmax(~np.isnan(navs), axis=0)))
+    navs = navs[first:]
+    returns = navs[1:] / navs[:-1] - 1
+    if len(returns) < 2:
+        return {**empty, "excluded": codes}
+
+    by_code = {p["code"]: p for p in positions}
+    values = np.array([by_code[c]["shares"] for c in included]) * navs[-1]
+    weights = values / values.sum()
+    risk = portfolio_risk(returns, weights)
+
+    funds = []
+    port_vol = risk["volatility"]
+    for i, code in enumerate(included):
+        funds.append({
+            "code": code,
+            "name": by_code[code].get("name"),
+            "weight": round(float(weights[i]), 6),
+            "volatility": round(float(risk["volatilities"][i]), 6),
+            "marginal": round(float(risk["marginal"][i]), 6),
+            "contribution": round(float(risk["contribution"][i]), 6),
+            "share": round(float(risk["contribution"][i] / port_vol), 6) if port_vol > 0 else None,
+        })
+    return {
+        "as_of": str(np.datetime64(int(grid[-1]), "D")),
+        "window": {
+            "start": str(np.datetime64(int(grid[first]), "D")),
+            "end": str(np.datetime64(int(grid[-1]), "D")),
+            "observations": int(len(returns)),
+        },
+        "codes": included,
+        "funds": funds,
+        "portfolio": {
+            "volatility": round(port_vol, 6),
+            "diversification_ratio": round(risk["diversification_ratio"], 4) if risk["diversification_ratio"] else None,
+            "market_value": round(float(values.sum()), 2),
+        },
+        "correlation": np.round(risk["correlation"], 4).tolist(),
+        "covariance": np.round(risk["covariance"], 8).tolist(),
+        "excluded": excluded,
+    }
+
+
+def get_account_risk(days: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Covariance/correlation of held funds over the last `days` calendar days,
+    portfolio volatility and per-position risk contributions (fractions,
+    annualized). Cached until a held fund gets a new or corrected NAV or
+    positions change.
+    """
+    days = days or Config.RISK_DEFAULT_DAYS
+    for code in [p["code"] for p in _held_positions()]:
+        try:
+            sync_fund_history(code)
+        except Exception as e:
+            logger.warning(f"History sync failed for {code}: {e}")
+    positions = _held_positions()
+    key = (days, tuple((p["code"], p["shares"], p["last_date"], p["revision"]) for p in positions))
+    return _risk_cache.get_or_load(key, lambda: _compute(positions, days))
@@ -0,0 +1,248 @@
+"""
+Incremental rolling-window indicators.
+
+fund_rolling_state keeps, per fund, running sums over the last
+ROLLING_WINDOW NAVs: sum and sum of squares of daily returns (mean and
+variance), the window's first/last NAV, its running peak and max drawdown
+(with the peak dates that bound them) and the all-time high. Each new NAV
+updates the state in O(1): one return enters, one leaves (its two NAVs
+are read from the NAV store by index). The window's drawdown is only
+recomputed, over the window slice, when its peak leaves the window.
+
+Every update also appends that day's rolling Sharpe and drawdown from the
+all-time high to fund_rolling_series, which backs the rolling series
+endpoint. A fund without state, or whose stored history no longer matches
+it, is rebuilt from its full history in one vectorized pass.
+"""
+import logging
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..config import Config
+from ..db import get_db_connection
+from . import nav_store
+
+logger = logging.getLogger(__name__)
+
+MIN_POINTS = 10
+RISK_FREE_RATE = 0.02
+TRADING_DAYS = 250.0
+
+
+def _day_str(day: int) -> str:
+    return str(np.datetime64(int(day), "D"))
+
+
+def _metrics(count: int, first_nav: float, last_nav: float, sum_r: float, sum_r2: float) -> Optional[Tuple[float, float, float]]:
+    """(annual return, volatility, Sharpe) of a window, as in the detail indicators."""
+    if count < MIN_POINTS:
+        return None
+    n = count - 1
+    mean = sum_r / n
+    volatility = math.sqrt(max(sum_r2 / n - mean * mean, 0.0)) * math.sqrt(TRADING_DAYS)
+    annual_return = (last_nav / first_nav) ** (TRADING_DAYS / count) - 1
+    sharpe = (annual_return - RISK_FREE_RATE) / volatility if volatility > 0 else 0.0
+    return annual_return, volatility, sharpe
+
+
+def _window_drawdown(navs: np.ndarray, start: int, end: int) -> Tuple[float, int, float, int]:
+    """
+    (peak NAV, peak index, max drawdown, index of that drawdown's peak) of
+    navs[start:end]. Ties resolve to the latest index, so a peak only
+    "leaves" the window when no equal value remains in it.
+    """
+    w = navs[start:end]
+    running = np.maximum.accumulate(w)
+    drawdowns = w / running - 1
+    peak_idx = start + len(w) - 1 - int(np.argmax(w[::-1]))
+    trough = int(np.argmin(drawdowns))
+    mdd = float(drawdowns[trough])
+    if mdd >= 0:
+        return float(navs[peak_idx]), peak_idx, 0.0, peak_idx
+    head = w[:trough + 1]
+    mdd_peak_idx = start + trough - int(np.argmax(head[::-1]))
+    return float(navs[peak_idx]), peak_idx, mdd, mdd_peak_idx
+
+
+def _rebuild(code: str, days: np.ndarray, navs: np.ndarray) -> int:
+    """Recompute state and the whole series from the full history."""
+    window = Config.ROLLING_WINDOW
+    n = len(navs)
+    idx = np.arange(n)
+    starts = np.maximum(idx - window + 1, 0)
+    counts = idx - starts + 1
+
+    returns = navs[1:] / navs[:-1] - 1
+    cs = np.concatenate(([0.0], np.cumsum(returns)))
+    cs2 = np.concatenate(([0.0], np.cumsum(returns * returns)))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        nr = counts - 1
+        mean = (cs[idx] - cs[starts]) / nr
+        var = np.maximum((cs2[idx] - cs2[starts]) / nr - mean * mean, 0.0)
+        volatility = np.sqrt(var) * np.sqrt(TRADING_DAYS)
+        annual = (navs / navs[starts]) ** (TRADING_DAYS / counts) - 1
+        sharpe = np.where(volatility > 0, (annual - RISK_FREE_RATE) / volatility, 0.0)
+    sharpe_list = [None if c < MIN_POINTS else round(float(s), 4) for c, s in zip(counts.tolist(), sharpe.tolist())]
+    drawdown = navs / np.maximum.accumulate(navs) - 1
+
+    # Final state from direct sums over the last window (no cumsum round-off)
+    start = int(starts[-1])
+    r = returns[start:]
+    peak_nav, peak_idx, mdd, mdd_peak_idx = _window_drawdown(navs, start, n)
+    state = {
+        "last_date": _day_str(days[-1]), "start_date": _day_str(days[start]), "count": int(counts[-1]),
+        "first_nav": float(navs[start]), "last_nav": float(navs[-1]),
+        "sum_r": float(np.sum(r)), "sum_r2": float(np.sum(r * r)),
+        "peak_nav": peak_nav, "peak_date": _day_str(days[peak_idx]),
+        "max_drawdown": mdd, "mdd_peak_date": _day_str(days[mdd_peak_idx]),
+        "ath_nav": float(np.max(navs)),
+    }
+    dates = days.astype("datetime64[D]").astype(str).tolist()
+    rows = list(zip(dates, sharpe_list, np.round(drawdown, 6).tolist()))
+    _save(code, state, rows, replace=True)
+    return n
+
+
+def _save(code: str, state: Dict[str, Any], rows: List[tuple], replace: bool = False):
+    conn = get_db_connection()
+    try:
+        with conn:
+            if replace:
+                conn.execute("DELETE FROM fund_rolling_series WHERE code = ?", (code,))
+            conn.executemany(
+                "INSERT OR REPLACE INTO fund_rolling_series (code, date, sharpe, drawdown) VALUES (?, ?, ?, ?)",
+                [(code, *row) for row in rows]
+            )
+            conn.execute("""
+                INSERT OR REPLACE INTO fund_rolling_state (
+                    code, last_date, start_date, count, first_nav, last_nav, sum_r, sum_r2,
+                    peak_nav, peak_date, max_drawdown, mdd_peak_date, ath_nav, updated_at
+                ) VALUES (
+                    :code, :last_date, :start_date, :count, :first_nav, :last_nav, :sum_r, :sum_r2,
+                    :peak_nav, :peak_date, :max_drawdown, :mdd_peak_date, :ath_nav, CURRENT_TIMESTAMP
+                )
+            """, {"code": code, **state})
+    finally:
+        conn.close()
+
+
+def _load_state(code: str) -> Optional[Dict[str, Any]]:
+    conn = get_db_connection()
+    try:
+        row = conn.execute("SELECT * FROM fund_rolling_state WHERE code = ?", (code,)).fetchone()
+    finally:
+        conn.close()
+    return dict(row) if row else None
+
+
+def _index_of(days: np.ndarray, date_str: str) -> int:
+    """Index of a stored date in `days`, or -1."""
+    day = int(np.datetime64(date_str, "D").astype(np.int64))
+    i = int(np.searchsorted(days, day))
+    return i if i < len(days) and int(days[i]) == day else -1
+
+
+def update_rolling(code: str, force: bool = False) -> int:
+    """
+    Bring a fund's rolling state up to its stored history. Appends one
+    series point per new NAV in O(1) each; returns the number of points
+    written (0 when already current). `force` rebuilds from scratch, for
+    histories corrected before the last stored NAV.
+    """
+    arrays = nav_store.load_arrays(code)
+    if arrays is None or len(arrays[0]) == 0:
+        return 0
+    days, navs = arrays
+    days, navs = days.view(np.ndarray), navs.view(np.ndarray)
+
+    state = _load_state(code)
+    last = _index_of(days, state["last_date"]) if state else -1
+    start = _index_of(days, state["start_date"]) if state else -1
+    # No state, or history rewritten underneath it (reload, corrected NAV)
+    if (force or last < 0 or start < 0 or navs[last] != state["last_nav"]
+            or last - start + 1 != state["count"]):
+        return _rebuild(code, days, navs)
+    if last == len(navs) - 1:
+        return 0
+
+    window = Config.ROLLING_WINDOW
+    s = dict(state)
+    peak_idx = _index_of(days, s["peak_date"])
+    mdd_peak_idx = _index_of(days, s["mdd_peak_date"])
+    rows = []
+    for i in range(last + 1, len(navs)):
+        nav = float(navs[i])
+        r = nav / navs[i - 1] - 1
+        s["sum_r"] += r
+        s["sum_r2"] += r * r
+        s["count"] += 1
+        if s["count"] > window:
+            # The oldest return leaves the window
+            start += 1
+            r_out = navs[start] / navs[start - 1] - 1
+            s["sum_r"] -= r_out
+            s["sum_r2"] -= r_out * r_out
+            s["count"] = window
+
+        if nav >= s["peak_nav"]:
+            s["peak_nav"], peak_idx = nav, i
+        dd = nav / s["peak_nav"] - 1
+        if dd < s["max_drawdown"]:
+            s["max_drawdown"], mdd_peak_idx = dd, peak_idx
+        if peak_idx < start or mdd_peak_idx < start:
+            s["peak_nav"], peak_idx, s["max_drawdown"], mdd_peak_idx = _window_drawdown(navs, start, i + 1)
+        s["ath_nav"] = max(s["ath_nav"], nav)
+        s["first_nav"], s["last_nav"] = float(navs[start]), nav
+
+        m = _metrics(s["count"], s["first_nav"], nav, s["sum_r"], s["sum_r2"])
+        rows.append((_day_str(days[i]), round(m[2], 4) if m else None, round(nav / s["ath_nav"] - 1, 6)))
+
+    s["last_date"] = _day_str(days[-1])
+    s["start_date"] = _day_str(days[start])
+    s["peak_date"] = _day_str(days[peak_idx])
+    s["mdd_peak_date"] = _day_str(days[mdd_peak_idx])
+    s.pop("code", None)
+    s.pop("updated_at", None)
+    _save(code, s, rows)
+    return len(rows)
+
+
+def get_rolling_indicators(code: str) -> Optional[Dict[str, Any]]:
+    """
+    Sharpe / volatility / max drawdown / annual return over the last
+    ROLLING_WINDOW NAVs, read from the stored state (same format as the
+    detail page's technical indicators). None if the fund has no state.
+    """
+    state = _load_state(code)
+    if state is None:
+        return None
+    m = _metrics(state["count"], state["first_nav"], state["last_nav"], state["sum_r"], state["sum_r2"])
+    if m is None:
+        return None
+    annual_return, volatility, sharpe = m
+    return {
+        "sharpe": round(float(sharpe), 2),
+        "volatility": f"{round(float(volatility) * 100, 2)}%",
+        "max_drawdown": f"{round(float(state['max_drawdown']) * 100, 2)}%",
+        "annual_return": f"{round(float(annual_return) * 100, 2)}%",
+    }
+
+
+def get_rolling_series(code: str, limit: int = 250) -> Dict[str, List[Any]]:
+    """Last `limit` points of rolling 1Y Sharpe and drawdown, oldest first (columns)."""
+    conn = get_db_connection()
+    try:
+        rows = conn.execute("""
+            SELECT date, sharpe, drawdown FROM fund_rolling_series
+            WHERE code = ? ORDER BY date DESC LIMIT ?
+        """, (code, limit)).fetchall()
+    finally:
+        conn.close()
+    rows.reverse()
+    return {
+        "dates": [r["date"] for r in rows],
+        "sharpe": [r["sharpe"] for r in rows],
+        "drawdown": [r["drawdown"] for r in rows],
+    }
@@ -2,14 +2,17 @@ import logging
 import threading
 import time
 from datetime import datetime, timedelta, timezone
-import akshare as ak
-import pandas as pd
 from ..db import get_db_connection
 from ..config import Config
 from ..services.fund import get_combined_valuation
 from ..services.subscription import get_active_subscriptions, update_notification_time
 from ..services.email import send_email
 from ..services.trade import process_pending_transactions
+from ..services.holdings import refresh_tracked_holdings
+from ..services.fund_metrics import refresh_fund_metrics
+from ..services.equity import update_equity_curve
+from ..services.fund_list import fetch_fund_list, sync_fund_list
+from ..services.search_index import get_search_index, load_search_index
 
 logger = logging.getLogger(__name__)
 
@@ -18,48 +21,29 @@ CST = timezone(timedelta(hours=8))
 
 def fetch_and_update_funds():
     """
-    Fetches the complete fund list from AkShare and updates the SQLite DB.
+    Fetches the complete fund list and writes only the changed rows to the SQLite DB.
     This is a blocking operation, should be run in a background thread.
+    Returns the changed-row counts (None on failure).
     """
     logger.info("Starting fund list update...")
     try:
-        # Fetch data
-        df = ak.fund_name_em()
-        if df is None or df.empty:
-            logger.warning("Fetched empty fund list from AkShare.")
-            return
-
-        # Rename columns to match our simple schema
-        # Expected cols: "基金代码", "基金简称", "基金类型"
-        df = df.rename(columns={
-            "基金代码": "code",
-            "基金简称": "name",
-            "基金类型": "type"
-        })
-        
-        # Select only relevant columns
-        data_to_insert = df[["code", "name", "type"]].to_dict(orient="records")
-        
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Use transaction for speed and safety
-        conn.execute("BEGIN")
-        
-        # Upsert logic (Replace is easier here since we just want the latest list)
-        # Using executemany is much faster than looping
-        cursor.executemany("""
-            INSERT OR REPLACE INTO funds (code, name, type, updated_at)
-            VALUES (:code, :name, :type, CURRENT_TIMESTAMP)
-        """, data_to_insert)
-        
-        conn.commit()
-        conn.close()
-        
-        logger.info(f"Fund list updated. Total funds: {len(data_to_insert)}")
-        
+        rows = fetch_fund_list()
+        if not rows:
+            logger.warning("Fetched empty fund list.")
+            return None
+
+        counts = sync_fund_list(rows)
+        logger.info(
+            f"Fund list updated. Total funds: {counts['fetched']}, "
+            f"inserted {counts['inserted']}, updated {counts['updated']}, deleted {counts['deleted']}"
+        )
+        if counts["inserted"] or counts["updated"] or counts["deleted"] or get_search_index() is None:
+            load_search_index()
+        return counts
+
     except Exception as e:
         logger.error(f"Failed to update fund list: {e}")
+        return None
 
 from ..services.subscription import get_active_subscriptions, update_notification_time, update_digest_time
 
@@ -143,31 +127,86 @@ def check_subscriptions():
                     if send_email(email, subject, content, is_html=True):
                         update_digest_time(sub_id)
 
+_metrics_refreshed_on = None
+
+def refresh_metrics_if_due():
+    """
+    Refresh fund_metrics once a day, after FUND_METRICS_HOUR (CST).
+    Returns the number of funds written (None if not due).
+    """
+    global _metrics_refreshed_on
+    now_cst = datetime.now(CST)
+    today = now_cst.date()
+    if now_cst.hour < Config.FUND_METRICS_HOUR or _metrics_refreshed_on == today:
+        return None
+    n = refresh_fund_metrics()
+    _metrics_refreshed_on = today
+    return n
+
+_fund_list_synced_at = None
+
+def sync_fund_list_if_due():
+    """
+    Re-sync the fund list every FUND_LIST_UPDATE_INTERVAL seconds. Only
+    changed rows are written (content_hash), so a daily run is cheap.
+    Returns the changed-row counts (None if not due or failed).
+    """
+    global _fund_list_synced_at
+    now = time.time()
+    if _fund_list_synced_at is not None and now - _fund_list_synced_at < Config.FUND_LIST_UPDATE_INTERVAL:
+        return None
+    _fund_list_synced_at = now
+    return fetch_and_update_funds()
+
 def start_scheduler():
     """
     Simple background thread to check if data needs update.
     """
     def _run():
+        try:
+            load_search_index()
+        except Exception as e:
+            logger.error(f"Failed to load search index: {e}")
+
         # 1. Initial fund list update
         conn = get_db_connection()
         cursor = conn.cursor()
         cursor.execute("SELECT count(*) as cnt FROM funds")
         count = cursor.fetchone()["cnt"]
+        # Rows from before migration 3 have no pinyin initials: only a list sync provides them
+        cursor.execute("SELECT count(*) as cnt FROM funds WHERE pinyin IS NULL")
+        missing_pinyin = cursor.fetchone()["cnt"]
         conn.close()
 
         if count == 0:
             logger.info("DB is empty. Performing initial fetch.")
-            fetch_and_update_funds()
+            sync_fund_list_if_due()
+        elif missing_pinyin:
+            logger.info(f"{missing_pinyin} funds lack pinyin initials. Syncing fund list.")
+            sync_fund_list_if_due()
 
         # 2. Main loop
         while True:
             try:
                 # 24/7 Monitoring
                 check_subscriptions()
+                # 基金列表：按 FUND_LIST_UPDATE_INTERVAL 定期增量同步
+                sync_fund_list_if_due()
                 # 待确认加仓/减仓：用当日已公布净值更新持仓
-                n = process_pending_transactions()
+                applied = process_pending_transactions()
+                if applied:
+                    logger.info(f"Applied {applied} pending add/reduce transactions.")
+                # 持仓明细：季度披露，后台按需刷新
+                n = refresh_tracked_holdings()
                 if n:
-                    logger.info(f"Applied {n} pending add/reduce transactions.")
+                    logger.info(f"Refreshed holdings for {n} funds.")
+                # 指标表：净值公布后每日批量计算一次
+                n = refresh_metrics_if_due()
+                if n is not None:
+                    logger.info(f"Refreshed metrics for {n} funds.")
+                # 收益曲线：只重放新成交/新净值影响的尾部
+                if applied or n is not None:
+                    update_equity_curve()
             except Exception as e:
                 logger.error(f"Scheduler loop error: {e}")
             
@@ -0,0 +1,288 @@
+"""
+Cross-fund screener.
+
+Ranks every fund with a locally stored NAV history by return, volatility,
+Sharpe and max drawdown over a period. Histories are aligned on one date
+grid (forward-filled, NaN before a fund's first NAV) into a
+(days x funds) matrix and the metrics are computed column-wise in NumPy,
+the same formulas as the per-fund detail indicators. Large universes are
+split into column chunks across a process pool.
+
+The metric table of a period is cached; filters and sorting run on the
+cached table per request.
+"""
+import logging
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..config import Config
+from ..db import get_db_connection
+from . import nav_store
+from .cache import TTLCache
+from .workers import get_process_pool
+
+logger = logging.getLogger(__name__)
+
+# Period -> calendar days covered
+SCREENER_PERIODS = {"3m": 91, "6m": 182, "1y": 365, "3y": 1095}
+SORT_FIELDS = ("return", "annual_return", "volatility", "sharpe", "max_drawdown")
+
+RISK_FREE_RATE = 0.02
+TRADING_DAYS = 250.0
+
+_metrics_cache = TTLCache("screener", ttl=Config.SCREENER_CACHE_TTL, max_size=len(SCREENER_PERIODS))
+
+
+def _universe() -> List[Dict[str, Any]]:
+    """Funds with a synced, non-empty history, with list metadata."""
+    conn = get_db_connection()
+    try:
+        rows = conn.execute("""
+            SELECT s.code, f.name, f.type, f.sector
+            FROM fund_history_sync s
+            LEFT JOIN funds f ON f.code = s.code
+            WHERE s.last_date IS NOT NULL
+            ORDER BY s.code
+        """).fetchall()
+    finally:
+        conn.close()
+    return [dict(r) for r in rows]
+
+
+def _histories_from_db(codes: List[str], start_day: int) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """Fallback when the NAV store is disabled: one range scan of fund_history."""
+    start = str(np.datetime64(int(start_day), "D"))
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(
+            "SELECT code, date, nav FROM fund_history WHERE date >= ? ORDER BY code, date", (start,)
+        ).fetchall()
+    finally:
+        conn.close()
+    wanted = set(codes)
+    grouped: Dict[str, Tuple[list, list]] = {}
+    for r in rows:
+        if r["code"] in wanted:
+            days, navs = grouped.setdefault(r["code"], ([], []))
+            days.append(r["date"][:10])
+            navs.append(r["nav"])
+    return {
+        code: (np.array(days, dtype="datetime64[D]").astype(np.int32), np.array(navs, dtype=np.float64))
+        for code, (days, navs) in grouped.items()
+    }
+
+
+def load_histories(codes: List[str], start_day: int) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """(days, navs) per fund from `start_day` on, plus the last NAV before it."""
+    if not Config.NAV_STORE_ENABLED:
+        return _histories_from_db(codes, start_day)
+    result = {}
+    expected = nav_store.history_marks(codes)
+    for code in codes:
+        arrays = nav_store.get_arrays(code, expected)
+        if arrays is None or len(arrays[0]) == 0:
+            continue
+        # Plain ndarray views: slicing np.memmap objects is several times slower
+        days, navs = arrays[0].view(np.ndarray), arrays[1].view(np.ndarray)
+        # Keep one point before the window so the grid start is forward-filled
+        i = max(int(days.searchsorted(start_day)) - 1, 0)
+        # Copy the window: holding views would keep every fund's map (and fd) open
+        result[code] = (days[i:].copy(), navs[i:].copy())
+    return result
+
+
+def build_nav_matrix(histories: Dict[str, Tuple[np.ndarray, np.ndarray]], start_day: int, end_day: int):
+    """
+    Align histories on the union of their NAV dates in [start_day, end_day].
+    Returns (grid days, codes, matrix[len(grid), len(codes)]); each column is
+    forward-filled and NaN before the fund's first NAV.
+    """
+    codes = list(histories)
+    if not codes:
+        return np.empty(0, dtype=np.int32), codes, np.empty((0, 0))
+    grid = np.unique(np.concatenate([d[(d >= start_day) & (d <= end_day)] for d, _ in histories.values()]))
+    matrix = np.full((len(grid), len(codes)), np.nan)
+    for j, code in enumerate(codes):
+        days, navs = histories[code]
+        tail = len(days) - len(grid)
+        if tail >= 0 and days[tail] == grid[0] and days[-1] == grid[-1]:
+            # Common case: the fund has a NAV on every grid day
+            matrix[:, j] = navs[tail:]
+            continue
+        # Index of the last NAV on or before each grid day
+        idx = days.searchsorted(grid, side="right") - 1
+        valid = idx >= 0
+        matrix[valid, j] = navs[idx[valid]]
+    return grid, codes, matrix
+
+
+def observed_mask(histories: Dict[str, Tuple[np.ndarray, np.ndarray]], grid: np.ndarray, codes: List[str]) -> np.ndarray:
+    """(grid x codes) mask of the cells where the fund published a NAV itself (not forward-filled)."""
+    mask = np.ones((len(grid), len(codes)), dtype=bool)
+    for j, code in enumerate(codes):
+        days = histories[code][0]
+        tail = len(days) - len(grid)
+        if tail >= 0 and days[tail] == grid[0] and days[-1] == grid[-1]:
+            continue  # NAV on every grid day (same fast path as build_nav_matrix)
+        idx = np.minimum(days.searchsorted(grid), len(days) - 1)
+        mask[:, j] = days[idx] == grid
+    return mask
+
+
+def compute_metrics(matrix: np.ndarray, observed: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    Column-wise metrics of a forward-filled (days x funds) NAV matrix. NaN
+    where a fund has fewer than two NAVs in the window. With `observed`
+    (see observed_mask), daily returns and the day count only use the
+    fund's own NAV dates, so a fund on another calendar (QDII, market
+    holidays) gets no artificial zero-return days, as in the detail page.
+    """
+    if observed is None:
+        observed = ~np.isnan(matrix)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        count = np.sum(observed, axis=0)
+        first_idx = np.argmax(~np.isnan(matrix), axis=0)
+        cols = np.arange(matrix.shape[1])
+        first = matrix[first_idx, cols]
+        last = matrix[-1, :]
+
+        total_return = last / first - 1
+        years = count / TRADING_DAYS
+        annual_return = np.where(years > 0, (1 + total_return) ** (1 / years) - 1, 0.0)
+
+        # Each own NAV against the fund's previous NAV (the filled value the day before)
+        daily_returns = np.where(observed[1:], matrix[1:] / matrix[:-1] - 1, np.nan)
+        volatility = np.nanstd(daily_returns, axis=0) * np.sqrt(TRADING_DAYS)
+        sharpe = np.where(volatility > 0, (annual_return - RISK_FREE_RATE) / volatility, 0.0)
+
+        running_max = np.fmax.accumulate(matrix, axis=0)
+        max_drawdown = np.nanmin(matrix / running_max - 1, axis=0)
+
+    invalid = count < 2
+    result = {
+        "return": total_return,
+        "annual_return": annual_return,
+        "volatility": volatility,
+        "sharpe": sharpe,
+        "max_drawdown": max_drawdown,
+    }
+    for values in result.values():
+        values[invalid] = np.nan
+    return result
+
+
+def compute_metrics_parallel(matrix: np.ndarray, observed: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """compute_metrics, split into column chunks across the process pool when the matrix is large."""
+    n = matrix.shape[1]
+    pool = get_process_pool() if n >= Config.SCREENER_PARALLEL_MIN_FUNDS else None
+    if pool is None:
+        return compute_metrics(matrix, observed)
+    if observed is None:
+        observed = ~np.isnan(matrix)
+    chunk = math.ceil(n / Config.PROCESS_POOL_WORKERS)
+    parts = [np.ascontiguousarray(matrix[:, i:i + chunk]) for i in range(0, n, chunk)]
+    masks = [np.ascontiguousarray(observed[:, i:i + chunk]) for i in range(0, n, chunk)]
+    try:
+        results = list(pool.map(compute_metrics, parts, masks))
+    except Exception as e:
+        logger.warning(f"Screener process pool failed, computing inline: {e}")
+        return compute_metrics(matrix, observed)
+    return {key: np.concatenate([r[key] for r in results]) for key in results[0]}
+
+
+def _round(value: float, scale: float = 100.0) -> Optional[float]:
+    return None if math.isnan(value) else round(float(value) * scale, 2)
+
+
+def _build_table(period: str) -> Dict[str, Any]:
+    funds = _universe()
+    if not funds:
+        return {"period": period, "as_of": None, "rows": []}
+    meta = {f["code"]: f for f in funds}
+
+    end_day = int(np.datetime64("today", "D").astype(np.int64))
+    start_day = end_day - SCREENER_PERIODS[period]
+    histories = load_histories(list(meta), start_day)
+    # Stale histories (delisted or not synced lately) would look flat after forward-fill
+    histories = {
+        code: h for code, h in histories.items()
+        if len(h[0]) and int(h[0][-1]) >= end_day - Config.SCREENER_MAX_STALE_DAYS
+    }
+    grid, codes, matrix = build_nav_matrix(histories, start_day, end_day)
+    if not codes or len(grid) < 2:
+        return {"period": period, "as_of": None, "rows": []}
+
+    metrics = compute_metrics_parallel(matrix, observed_mask(histories, grid, codes))
+    # Funds younger than the period would rank on an extrapolated annual return
+    coverage = np.sum(~np.isnan(matrix), axis=0) / len(grid)
+    rows = []
+    for j, code in enumerate(codes):
+        if np.isnan(metrics["return"][j]) or coverage[j] < Config.SCREENER_MIN_COVERAGE:
+            continue
+        info = meta[code]
+        rows.append({
+            "code": code,
+            "name": info.get("name"),
+            "type": info.get("type"),
+            "sector": info.get("sector") or None,
+            "as_of": str(np.datetime64(int(histories[code][0][-1]), "D")),
+            "return": _round(metrics["return"][j]),
+            "annual_return": _round(metrics["annual_return"][j]),
+            "volatility": _round(metrics["volatility"][j]),
+            "sharpe": _round(metrics["sharpe"][j], 1.0),
+            "max_drawdown": _round(metrics["max_drawdown"][j]),
+        })
+    return {"period": period, "as_of": str(np.datetime64(int(grid[-1]), "D")), "rows": rows}
+
+
+def get_metrics_table(period: str) -> Dict[str, Any]:
+    """Metrics of every fund for one period (cached for SCREENER_CACHE_TTL)."""
+    return _metrics_cache.get_or_load(period, lambda: _build_table(period))
+
+
+def screen_funds(
+    period: str = "1y",
+    sort: str = "sharpe",
+    order: str = "desc",
+    min_sharpe: Optional[float] = None,
+    min_return: Optional[float] = None,
+    max_volatility: Optional[float] = None,
+    max_drawdown: Optional[float] = None,
+    fund_type: Optional[str] = None,
+    sector: Optional[str] = None,
+    limit: int = 50,
+    offset: int = 0,
+) -> Dict[str, Any]:
+    """
+    Filter and rank the metric table. Percent figures (return, volatility,
+    max_drawdown) are in percent; max_drawdown is negative, and the
+    `max_drawdown` filter is a depth limit (20 -> drawdowns no worse than -20%).
+    """
+    table = get_metrics_table(period)
+    rows = table["rows"]
+    if min_sharpe is not None:
+        rows = [r for r in rows if r["sharpe"] is not None and r["sharpe"] >= min_sharpe]
+    if min_return is not None:
+        rows = [r for r in rows if r["return"] is not None and r["return"] >= min_return]
+    if max_volatility is not None:
+        rows = [r for r in rows if r["volatility"] is not None and r["volatility"] <= max_volatility]
+    if max_drawdown is not None:
+        rows = [r for r in rows if r["max_drawdown"] is not None and r["max_drawdown"] >= -abs(max_drawdown)]
+    if fund_type:
+        rows = [r for r in rows if r["type"] and fund_type in r["type"]]
+    if sector:
+        rows = [r for r in rows if r["sector"] == sector]
+
+    # Missing values always sort last
+    present = [r for r in rows if r[sort] is not None]
+    missing = [r for r in rows if r[sort] is None]
+    present.sort(key=lambda r: r[sort], reverse=(order == "desc"))
+    rows = present + missing
+    return {
+        "period": period,
+        "as_of": table["as_of"],
+        "total": len(rows),
+        "items": rows[offset:offset + limit],
+    }
@@ -0,0 +1,136 @@
+"""
+In-memory autocomplete index over the funds table.
+
+Loaded from SQLite at startup and rebuilt after every fund list sync; the
+new index replaces the old one with a single reference assignment, so
+readers never see a half-built index and never take a lock.
+
+- codes:   sorted code list, exact and prefix hits via bisect
+- pinyin:  sorted (initials, position) list for initials prefix hits
+- grams:   inverted index from character bigrams (and single characters)
+           of "code name pinyin" to fund positions, for substring hits
+"""
+import logging
+import time
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..config import Config
+from ..db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# Separates the fields in the searchable text; never part of a query
+_SEP = "\x00"
+
+
+class FundSearchIndex:
+    def __init__(self, rows: List[Tuple[str, str, Optional[str], Optional[str]]]):
+        """rows: (code, name, type, pinyin) tuples."""
+        rows = sorted(rows, key=lambda r: r[0])
+        self.codes = [r[0] for r in rows]
+        self.names = [r[1] for r in rows]
+        self.types = [r[2] or "未知" for r in rows]
+        self.size = len(rows)
+
+        self._pinyin = sorted((r[3].upper(), i) for i, r in enumerate(rows) if r[3])
+        self._pinyin_keys = [p for p, _ in self._pinyin]
+
+        self._texts = [f"{r[0]}{_SEP}{r[1].lower()}{_SEP}{(r[3] or '').lower()}" for r in rows]
+        # Substring hits rank shortest name first; posting lists are stored in
+        # that order so a query can stop after `limit` verified hits
+        fuzzy_order = sorted(range(self.size), key=lambda i: (len(self.names[i]), self.codes[i]))
+        postings: Dict[str, List[int]] = {}
+        for i in fuzzy_order:
+            text = self._texts[i]
+            grams = set(text)
+            grams.update(text[j:j + 2] for j in range(len(text) - 1))
+            for gram in grams:
+                if _SEP not in gram:
+                    postings.setdefault(gram, []).append(i)
+        self._grams = {gram: array("i", ids) for gram, ids in postings.items()}
+
+    def _prefix_range(self, keys: List[str], prefix: str) -> range:
+        lo = bisect_left(keys, prefix)
+        hi = bisect_left(keys, prefix + "\U0010ffff", lo)
+        return range(lo, hi)
+
+    def _substring_hits(self, q: str, want: int) -> List[int]:
+        """
+        Up to `want` funds whose text contains q, in rank order: walk the
+        rarest gram's postings and verify. Queries of one or two characters
+        are exact gram hits and need no verification.
+        """
+        grams = [q[j:j + 2] for j in range(len(q) - 1)] or [q]
+        postings = []
+        for gram in grams:
+            ids = self._grams.get(gram)
+            if ids is None:
+                return []
+            postings.append(ids)
+        candidates = min(postings, key=len)
+        if len(q) <= 2:
+            return list(candidates[:want])
+        texts = self._texts
+        hits = []
+        for i in candidates:
+            if q in texts[i]:
+                hits.append(i)
+                if len(hits) >= want:
+                    break
+        return hits
+
+    def search(self, q: str, limit: int) -> List[Dict[str, Any]]:
+        """Same ranking as the SQL search: exact code, code prefix, initials prefix, substring."""
+        q = q.strip()
+        if not q:
+            return []
+        picked: List[int] = []
+        seen = set()
+
+        def take(ids) -> bool:
+            for i in ids:
+                if i not in seen:
+                    seen.add(i)
+                    picked.append(i)
+                    if len(picked) >= limit:
+                        return True
+            return False
+
+        full = False
+        if q.isascii() and q.isdigit():
+            # Exact code sorts first within its own prefix range
+            full = take(self._prefix_range(self.codes, q)[:limit])
+        elif q.isascii() and q.isalnum():
+            # Sorted by (initials, code), so an exact initials match comes first
+            full = take(self._pinyin[k][1] for k in self._prefix_range(self._pinyin_keys, q.upper())[:limit])
+        if not full:
+            take(self._substring_hits(q.lower(), limit + len(picked)))
+
+        return [{"id": self.codes[i], "name": self.names[i], "type": self.types[i]} for i in picked]
+
+
+_index: Optional[FundSearchIndex] = None
+
+
+def load_search_index() -> Optional[FundSearchIndex]:
+    """(Re)build the index from the funds table and swap it in."""
+    global _index
+    if not Config.SEARCH_INDEX_IN_MEMORY:
+        return None
+    started = time.perf_counter()
+    conn = get_db_connection()
+    try:
+        rows = conn.execute("SELECT code, name, type, pinyin FROM funds").fetchall()
+    finally:
+        conn.close()
+    index = FundSearchIndex([(str(r["code"]), r["name"] or "", r["type"], r["pinyin"]) for r in rows])
+    _index = index
+    logger.info(f"Search index loaded: {index.size} funds in {(time.perf_counter() - started) * 1000:.0f}ms")
+    return index
+
+
+def get_search_index() -> Optional[FundSearchIndex]:
+    """The current index, or None until it has been loaded (or when disabled)."""
+    return _index
@@ -0,0 +1,111 @@
+"""
+Server-push valuation stream.
+
+One refresh loop fetches every subscribed code once per tick (through the
+shared valuation cache) and pushes only changed estimates to the clients
+subscribed to them. Upstream cost is O(unique codes), independent of how
+many tabs are connected.
+"""
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from ..config import Config
+from .fund import get_combined_valuations_async
+
+logger = logging.getLogger(__name__)
+
+
+class StreamClient:
+    """One connected browser tab. Updates are merged until it reads them."""
+
+    def __init__(self, codes: List[str]):
+        self.codes = codes
+        self.pending: Dict[str, Dict[str, Any]] = {}
+        self.event = asyncio.Event()
+
+    def push(self, code: str, data: Dict[str, Any]):
+        # A slow reader just sees the latest value per code, never a backlog
+        self.pending[code] = data
+        self.event.set()
+
+    def drain(self) -> List[Dict[str, Any]]:
+        items = [{"id": code, **data} for code, data in self.pending.items()]
+        self.pending = {}
+        self.event.clear()
+        return items
+
+
+class ValuationHub:
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._subscribers: Dict[str, Set[StreamClient]] = {}
+        self._last: Dict[str, Dict[str, Any]] = {}
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, codes: Iterable[str]) -> StreamClient:
+        client = StreamClient(list(dict.fromkeys(codes)))
+        new_codes = False
+        for code in client.codes:
+            subs = self._subscribers.setdefault(code, set())
+            new_codes = new_codes or not subs
+            subs.add(client)
+            # Initial snapshot from what the loop already knows
+            if code in self._last:
+                client.push(code, self._last[code])
+        if new_codes:
+            self._wake.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return client
+
+    def unsubscribe(self, client: StreamClient):
+        for code in client.codes:
+            subs = self._subscribers.get(code)
+            if subs is None:
+                continue
+            subs.discard(client)
+            if not subs:
+                del self._subscribers[code]
+                self._last.pop(code, None)
+
+    async def _tick(self):
+        codes = list(self._subscribers)
+        valuations = await get_combined_valuations_async(codes)
+        for code, data in valuations.items():
+            if not data or self._last.get(code) == data:
+                continue
+            self._last[code] = data
+            for client in self._subscribers.get(code, ()):
+                client.push(code, data)
+
+    async def _run(self):
+        while self._subscribers:
+            self._wake.clear()
+            try:
+                await self._tick()
+            except Exception as e:
+                logger.error(f"Valuation stream tick failed: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+        self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        clients = set()
+        for subs in self._subscribers.values():
+            clients.update(subs)
+        return {"clients": len(clients), "codes": len(self._subscribers)}
+
+
+_hub: Optional[ValuationHub] = None
+
+
+def get_valuation_hub() -> ValuationHub:
+    """The hub lives on the application event loop; create it lazily there."""
+    global _hub
+    if _hub is None:
+        _hub = ValuationHub(Config.STREAM_REFRESH_INTERVAL)
+    return _hub
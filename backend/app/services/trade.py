@@ -7,7 +7,7 @@ from datetime import datetime
 from typing import List, Dict, Any, Optional
 
 from ..db import get_db_connection
-from .fund import get_nav_on_date
+from .fund import get_nav_on_date, get_navs_on_dates
 from .account import upsert_position, remove_position
 from .trading_calendar import get_confirm_date, confirm_date_to_str
 
@@ -199,12 +199,16 @@ def process_pending_transactions() -> int:
     )
     pending = cursor.fetchall()
     conn.close()
+    if not pending:
+        return 0
+    # 一次批量查询全部确认日净值，只对仍缺净值的基金回源
+    navs = get_navs_on_dates([(row["code"], row["confirm_date"]) for row in pending if row["confirm_date"]])
     applied = 0
     for row in pending:
         tid, code, op_type, amount_cny, shares_redeemed, confirm_date = (
             row["id"], row["code"], row["op_type"], row["amount_cny"], row["shares_redeemed"], row["confirm_date"]
         )
-        nav = get_nav_on_date(code, confirm_date) if confirm_date else None
+        nav = navs.get((code, confirm_date[:10])) if confirm_date else None
         if not nav or nav <= 0:
             continue
         conn = get_db_connection()
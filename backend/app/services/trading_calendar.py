@@ -3,12 +3,15 @@
 A股交易日历：15:00 前按当日净值，15:00 后按下一交易日净值。
 仅考虑周末，节假日可后续扩展。
 """
-from datetime import datetime, date, timedelta
+from datetime import datetime, date, time, timedelta
 from typing import Optional
 
 # 15:00 为分界（同一日 15:00 整算当日）
 CUTOFF_HOUR, CUTOFF_MINUTE = 15, 0
 
+# 连续竞价时段（上午、下午）
+TRADING_SESSIONS = ((time(9, 30), time(11, 30)), (time(13, 0), time(15, 0)))
+
 
 def is_trading_day(d: date) -> bool:
     """是否为交易日（先只排除周末）"""
@@ -23,6 +26,63 @@ def next_trading_day(d: date) -> date:
     return n
 
 
+def previous_trading_day(d: date) -> date:
+    """上一交易日"""
+    p = d - timedelta(days=1)
+    while not is_trading_day(p):
+        p -= timedelta(days=1)
+    return p
+
+
+def latest_nav_date(now: Optional[datetime] = None, publish_time: time = time(19, 0)) -> date:
+    """
+    当前可能已公布的最新净值日期：交易日 publish_time 之后为当日，否则为上一交易日。
+    用于判断本地净值历史是否可能有更新（QDII 等 T+2 基金会更晚）。
+    """
+    if now is None:
+        now = datetime.now()
+    d = now.date()
+    if is_trading_day(d) and now.time() >= publish_time:
+        return d
+    return previous_trading_day(d)
+
+
+def is_trading_time(now: Optional[datetime] = None) -> bool:
+    """当前是否处于交易时段（盘中估值会变化）"""
+    if now is None:
+        now = datetime.now()
+    if not is_trading_day(now.date()):
+        return False
+    t = now.time()
+    return any(start <= t < end for start, end in TRADING_SESSIONS)
+
+
+def session_date(now: Optional[datetime] = None) -> date:
+    """当前行情涨跌幅所属的交易日：交易日开盘后为当日，否则为上一交易日。"""
+    if now is None:
+        now = datetime.now()
+    d = now.date()
+    if is_trading_day(d) and now.time() >= TRADING_SESSIONS[0][0]:
+        return d
+    return previous_trading_day(d)
+
+
+def seconds_until_next_session(now: Optional[datetime] = None) -> float:
+    """距离下一个交易时段开始的秒数（盘中返回 0）"""
+    if now is None:
+        now = datetime.now()
+    if is_trading_time(now):
+        return 0.0
+    d = now.date()
+    while True:
+        if is_trading_day(d):
+            for start, _ in TRADING_SESSIONS:
+                begin = datetime.combine(d, start)
+                if begin > now:
+                    return (begin - now).total_seconds()
+        d += timedelta(days=1)
+
+
 def get_confirm_date(trade_ts: Optional[datetime] = None) -> date:
     """
     根据交易时间计算确认净值日期。
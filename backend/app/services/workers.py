@@ -0,0 +1,36 @@
+"""
+Shared process pool for CPU-bound batch work (screener, backtests).
+
+Created lazily on first use with PROCESS_POOL_WORKERS processes; callers
+get None when the pool is disabled (<= 1 worker) and compute inline.
+"""
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    if Config.PROCESS_POOL_WORKERS <= 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=Config.PROCESS_POOL_WORKERS)
+    return _pool
+
+
+def shutdown_process_pool():
+    """Stop worker processes (application shutdown)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark: DCA backtest of N funds x 12 schedules over 10 years of daily NAVs.
+
+Usage (from backend/):
+    python benchmarks/bench_backtest.py [--funds 100] [--workers 4] [--curve 0]
+
+Writes synthetic histories into a temp NAV store and runs one
+run_dca_backtest call (monthly / weekly / biweekly / daily schedules at
+three order times each). --curve N also returns an N-point value curve
+per fund and schedule.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+import numpy as np
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from app.config import Config  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--funds", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=Config.PROCESS_POOL_WORKERS)
+    parser.add_argument("--curve", type=int, default=0)
+    args = parser.parse_args()
+
+    Config.DB_PATH = os.path.join(tempfile.mkdtemp(), "bench.db")
+    Config.NAV_STORE_ENABLED = True
+    Config.PROCESS_POOL_WORKERS = args.workers
+    from app.db import init_db, get_db_connection
+    from app.services import nav_store
+    from app.services.backtest import run_dca_backtest
+
+    init_db()
+    rng = np.random.default_rng(1)
+    end = np.datetime64("today", "D")
+    days = np.busday_offset(end, -np.arange(10 * 250)[::-1], roll="backward").astype("datetime64[D]")
+    codes = [f"{i:06d}" for i in range(args.funds)]
+    conn = get_db_connection()
+    with conn:
+        for code in codes:
+            navs = np.round(np.cumprod(1 + rng.normal(0.0003, 0.012, len(days))), 4)
+            nav_store.write_arrays(code, days.astype(np.int32), navs)
+        conn.executemany(
+            "INSERT INTO fund_history_sync (code, last_date, checked_at) VALUES (?, ?, CURRENT_TIMESTAMP)",
+            [(code, str(days[-1])) for code in codes],
+        )
+    conn.close()
+
+    schedules = [
+        {"frequency": frequency, "day": 3, "amount": 1000.0, "time": order_time}
+        for frequency in ("monthly", "weekly", "biweekly", "daily")
+        for order_time in ("10:00", "14:59", "15:00")
+    ]
+    start = date.fromisoformat(str(days[0]))
+    started = time.perf_counter()
+    result = run_dca_backtest(codes, schedules, start, date.fromisoformat(str(end)), curve_points=args.curve)
+    elapsed = time.perf_counter() - started
+    runs = sum(len(r["runs"]) for r in result["results"])
+    print(f"funds: {args.funds}, schedules: {len(schedules)}, days: {len(days)}, workers: {args.workers}")
+    print(f"{runs} backtests in {elapsed * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark: loading full NAV histories, SQLite rows vs the memory-mapped NAV store.
+
+Usage (from backend/):
+    python benchmarks/bench_nav_store.py [--funds 500] [--years 15]
+
+Writes synthetic histories (one NAV per weekday) for N funds into a temp
+database and NAV store, then loads every fund's full history and computes
+its max drawdown, both ways. Heap is the Python allocation peak
+(tracemalloc); mapped pages are shared page cache, not private memory.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from app.config import Config  # noqa: E402
+
+
+def max_drawdown(navs):
+    return float(np.min(navs / np.maximum.accumulate(navs) - 1))
+
+
+def load_sqlite(codes):
+    from app.db import get_db_connection
+    out = 0.0
+    conn = get_db_connection()
+    for code in codes:
+        rows = conn.execute("SELECT date, nav FROM fund_history WHERE code = ? ORDER BY date", (code,)).fetchall()
+        history = [{"date": r["date"], "nav": float(r["nav"])} for r in rows]
+        out += max_drawdown(np.array([h["nav"] for h in history]))
+    conn.close()
+    return out
+
+
+def load_store(codes):
+    from app.services import nav_store
+    nav_store._views.clear()  # cold: every fund is mapped again
+    out = 0.0
+    for code in codes:
+        _, navs = nav_store.get_arrays(code)
+        out += max_drawdown(navs)
+    return out
+
+
+def measure(fn, codes):
+    """Best of three timed runs, then one traced run for the heap peak."""
+    elapsed = float("inf")
+    for _ in range(3):
+        started = time.perf_counter()
+        result = fn(codes)
+        elapsed = min(elapsed, time.perf_counter() - started)
+    tracemalloc.start()
+    fn(codes)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--funds", type=int, default=500)
+    parser.add_argument("--years", type=int, default=15)
+    args = parser.parse_args()
+
+    Config.DB_PATH = os.path.join(tempfile.mkdtemp(), "bench.db")
+    Config.NAV_STORE_ENABLED = True
+    from app.db import init_db, get_db_connection
+    from app.services import nav_store
+
+    init_db()
+    rng = np.random.default_rng(1)
+    days = np.busday_offset("2010-01-04", np.arange(args.years * 250), roll="forward").astype("datetime64[D]")
+    dates = days.astype(str).tolist()
+    codes = [f"{i:06d}" for i in range(args.funds)]
+    conn = get_db_connection()
+    with conn:
+        for code in codes:
+            navs = np.cumprod(1 + rng.normal(0.0003, 0.012, len(days)))
+            conn.executemany("INSERT INTO fund_history (code, date, nav) VALUES (?, ?, ?)",
+                             [(code, d, n) for d, n in zip(dates, navs.tolist())])
+    conn.close()
+    for code in codes:
+        nav_store.rebuild_from_db(code)
+
+    print(f"funds: {args.funds}, points per fund: {len(days)}")
+    print(f"{'source':<16}{'time':>10}{'heap peak':>12}")
+    base, t_sql, m_sql = measure(load_sqlite, codes)
+    result, t_store, m_store = measure(load_store, codes)
+    assert abs(base - result) < 1e-6, "results differ"
+    print(f"{'sqlite rows':<16}{t_sql * 1000:>8.1f}ms{m_sql / 1024:>10.0f}KB")
+    print(f"{'nav store':<16}{t_store * 1000:>8.1f}ms{m_store / 1024:>10.0f}KB")
+    print(f"speedup: {t_sql / t_store:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
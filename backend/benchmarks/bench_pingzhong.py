@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: PingZhong script parsing, legacy multi-regex vs single pass.
+
+Usage (from backend/):
+    python benchmarks/bench_pingzhong.py [--points 5000] [--repeat 20] [--file 005827.js]
+
+Without --file a synthetic script shaped like the real one is generated
+(several large arrays besides Data_netWorthTrend, as in the live payload).
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+import timeit
+import tracemalloc
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from app.services.pingzhong import parse_pingzhong_data, history_records  # noqa: E402
+
+
+def legacy_parse(text):
+    """The implementation this parser replaced (regex per field + dict per point)."""
+    data = {}
+    name_match = re.search(r'fS_name\s*=\s*"(.*?)";', text)
+    if name_match: data["name"] = name_match.group(1)
+    code_match = re.search(r'fS_code\s*=\s*"(.*?)";', text)
+    if code_match: data["code"] = code_match.group(1)
+    manager_match = re.search(r'Data_currentFundManager\s*=\s*(\[.+?\])\s*;\s*/\*', text)
+    if manager_match:
+        managers = json.loads(manager_match.group(1))
+        if managers:
+            data["manager"] = ", ".join([m["name"] for m in managers])
+    for key in ["syl_1n", "syl_6y", "syl_3y", "syl_1y"]:
+        m = re.search(rf'{key}\s*=\s*"(.*?)";', text)
+        if m: data[key] = m.group(1)
+    perf_match = re.search(r'Data_performanceEvaluation\s*=\s*(\{.+?\})\s*;\s*/\*', text)
+    if perf_match:
+        perf = json.loads(perf_match.group(1))
+        if perf and "data" in perf and "categories" in perf:
+            data["performance"] = dict(zip(perf["categories"], perf["data"]))
+    history_match = re.search(r'Data_netWorthTrend\s*=\s*(\[.+?\])\s*;\s*/\*', text)
+    if history_match:
+        raw_hist = json.loads(history_match.group(1))
+        data["history"] = [
+            {"date": time.strftime('%Y-%m-%d', time.localtime(item['x'] / 1000)), "nav": float(item['y'])}
+            for item in raw_hist
+        ]
+    return data
+
+
+def synthetic_script(points):
+    rnd = random.Random(42)
+    start_ms = 1199116800000  # 2008-01-01 00:00 CST
+    nav = 1.0
+    trend, acc = [], []
+    for i in range(points):
+        nav = round(nav * (1 + rnd.gauss(0.0003, 0.012)), 4)
+        x = start_ms + i * 86400000
+        trend.append({"x": x, "y": nav, "equityReturn": round(rnd.gauss(0, 1.2), 2), "unitMoney": ""})
+        acc.append([x, round(nav * 1.3, 4)])
+    managers = [{"id": "30198", "pic": "", "name": "张三", "star": 4, "workTime": "10年", "fundSize": "100亿"}]
+    perf = {"avr": "72.25", "categories": ["选证能力", "收益率", "抗风险", "稳定性", "择时能力"], "data": [80.0, 70.0, 60.0, 75.0, 65.0]}
+    parts = [
+        'var ishb=false;/*基金名称*/var fS_name = "示例成长混合";var fS_code = "005827";',
+        'var fund_sourceRate="1.50";var fund_Rate="0.15";var fund_minsg="10";',
+        'var syl_1n="12.34";var syl_6y="5.67";var syl_3y="-1.23";var syl_1y="0.45";',
+        f'/*单位净值走势*/var Data_netWorthTrend = {json.dumps(trend, ensure_ascii=False, separators=(",", ":"))};',
+        f'/*累计净值走势*/var Data_ACWorthTrend = {json.dumps(acc, separators=(",", ":"))};',
+        f'/*累计收益率走势*/var Data_grandTotal = {json.dumps([{"name": "示例", "data": acc}], ensure_ascii=False, separators=(",", ":"))};',
+        f'/*业绩评价*/var Data_performanceEvaluation = {json.dumps(perf, ensure_ascii=False, separators=(",", ":"))};',
+        f'/*现任基金经理*/var Data_currentFundManager ={json.dumps(managers, ensure_ascii=False, separators=(",", ":"))} ;',
+        '/*申购赎回*/var Data_buySedemption = {"series":[],"categories":[]};',
+    ]
+    return "".join(parts)
+
+
+def measure(fn, text, repeat):
+    seconds = min(timeit.repeat(lambda: fn(text), number=1, repeat=repeat))
+    tracemalloc.start()
+    fn(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=5000, help="NAV points in the synthetic script")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--file", help="use a downloaded pingzhongdata script instead")
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            text = f.read()
+    else:
+        text = synthetic_script(args.points)
+
+    old, new = legacy_parse(text), parse_pingzhong_data(text)
+    assert len(old.get("history", [])) == len(new.get("navs", [])), "history length mismatch"
+    for key in ("name", "code", "manager", "syl_1n", "performance"):
+        assert old.get(key) == new.get(key), f"{key} mismatch"
+
+    print(f"script size: {len(text) / 1024:.0f} KB, NAV points: {len(new.get('navs', []))}")
+    print(f"{'parser':<28}{'best time':>12}{'peak alloc':>14}")
+    rows = [
+        ("legacy (regex + dicts)", legacy_parse),
+        ("single pass (arrays)", parse_pingzhong_data),
+        ("single pass + records", lambda t: history_records(*(lambda d: (d["nav_days"], d["navs"]))(parse_pingzhong_data(t)))),
+    ]
+    results = {}
+    for label, fn in rows:
+        seconds, peak = measure(fn, text, args.repeat)
+        results[label] = seconds
+        print(f"{label:<28}{seconds * 1000:>10.2f}ms{peak / 1024:>12.0f}KB")
+    base = results["legacy (regex + dicts)"]
+    print(f"speedup (arrays): {base / results['single pass (arrays)']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /api/search backends, SQLite (FTS5 / LIKE) vs the in-memory index.
+
+Usage (from backend/):
+    python benchmarks/bench_search.py [--funds 20000] [--queries 10000] [--db data/fund.db]
+
+Without --db a synthetic fund list shaped like the real one (company +
+theme + share class names, pinyin initials) is written to a temp database.
+Queries mix what users type: code prefixes, full codes, pinyin initials
+and 1-4 character name fragments.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from app.config import Config  # noqa: E402
+
+COMPANIES = [("易方达", "YFD"), ("华夏", "HX"), ("广发", "GF"), ("招商", "ZS"), ("南方", "NF"),
+             ("嘉实", "JS"), ("富国", "FG"), ("汇添富", "HTF"), ("博时", "BS"), ("天弘", "TH")]
+THEMES = [("中证白酒", "ZZBJ"), ("半导体", "BDT"), ("医疗器械", "YLQX"), ("新能源车", "XNYC"),
+          ("沪深300", "HS300"), ("中证500", "ZZ500"), ("纳斯达克100", "NSDK100"), ("消费行业", "XFHY"),
+          ("稳健收益", "WJSY"), ("价值精选", "JZJX"), ("创新成长", "CXCZ"), ("纯债", "CZ")]
+KINDS = [("指数", "ZS", "指数型"), ("混合", "HH", "混合型"), ("股票", "GP", "股票型"),
+         ("债券", "ZQ", "债券型"), ("ETF联接", "ETFLJ", "指数型")]
+
+
+def synthetic_funds(n):
+    rng = random.Random(42)
+    codes = rng.sample(range(1, 999999), n)
+    rows = []
+    for code in codes:
+        (c, cp), (t, tp), (k, kp, kind) = rng.choice(COMPANIES), rng.choice(THEMES), rng.choice(KINDS)
+        share = rng.choice(["A", "C", ""])
+        rows.append((f"{code:06d}", f"{c}{t}{k}{share}", kind, f"{cp}{tp}{kp}{share}"))
+    return rows
+
+
+def make_queries(rows, n):
+    rng = random.Random(7)
+    queries = []
+    for _ in range(n):
+        code, name, _, pinyin = rng.choice(rows)
+        kind = rng.random()
+        if kind < 0.3:
+            queries.append(code[:rng.randint(2, 6)])
+        elif kind < 0.5:
+            queries.append(pinyin[:rng.randint(1, 5)].lower())
+        else:
+            start = rng.randrange(len(name))
+            queries.append(name[start:start + rng.randint(1, 4)])
+    return queries
+
+
+def run(label, search, queries):
+    timings = []
+    for q in queries:
+        started = time.perf_counter()
+        search(q)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    p = lambda q: timings[min(len(timings) - 1, int(q * len(timings)))] * 1000
+    print(f"{label:<22}{statistics.mean(timings) * 1000:>9.3f}{p(0.5):>9.3f}{p(0.99):>9.3f}{timings[-1] * 1000:>9.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--funds", type=int, default=20000, help="synthetic funds")
+    parser.add_argument("--queries", type=int, default=10000)
+    parser.add_argument("--db", help="use an existing fund database instead")
+    args = parser.parse_args()
+
+    Config.DB_PATH = args.db or os.path.join(tempfile.mkdtemp(), "bench.db")
+    Config.SEARCH_INDEX_IN_MEMORY = True
+    from app.db import init_db, get_db_connection
+    from app.services import fund, search_index
+
+    init_db()
+    if not args.db:
+        conn = get_db_connection()
+        with conn:
+            conn.executemany("INSERT INTO funds (code, name, type, pinyin) VALUES (?, ?, ?, ?)", synthetic_funds(args.funds))
+        conn.close()
+
+    conn = get_db_connection()
+    rows = [tuple(r) for r in conn.execute("SELECT code, name, type, COALESCE(pinyin, '') FROM funds")]
+    conn.close()
+    queries = make_queries(rows, args.queries)
+
+    started = time.perf_counter()
+    index = search_index.load_search_index()
+    print(f"funds: {index.size}, index build: {(time.perf_counter() - started) * 1000:.0f}ms, queries: {len(queries)}")
+    print(f"{'backend':<22}{'mean':>9}{'p50':>9}{'p99':>9}{'max':>9}  (ms)")
+
+    search_index._index = None
+    run("sqlite", fund.search_funds, queries)
+    search_index._index = index
+    run("in-memory index", fund.search_funds, queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ FundVal Live Backend Entry Point
 """
 import sys
 import os
+import multiprocessing
 
 # 添加 backend 目录到 Python 路径
 backend_dir = os.path.dirname(os.path.abspath(__file__))
@@ -16,6 +17,8 @@ import uvicorn
 from app.main import app
 
 if __name__ == "__main__":
+    # Screener process pool workers in the packaged app
+    multiprocessing.freeze_support()
     port = int(os.getenv("PORT", "21345"))
     uvicorn.run(
         app,
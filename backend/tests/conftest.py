@@ -0,0 +1,25 @@
+"""
+Shared fixtures. Run from backend/:  python -m pytest -q
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import Config  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Fresh SQLite database (and NAV store directory) per test."""
+    monkeypatch.setattr(Config, "DB_PATH", str(tmp_path / "fund.db"))
+    monkeypatch.setattr(Config, "NAV_STORE_DIR", str(tmp_path / "nav"))
+    monkeypatch.setattr(Config, "PROCESS_POOL_WORKERS", 1)
+    from app.db import init_db
+    from app.services import nav_store
+    nav_store._views.clear()
+    init_db()
+    yield
+    nav_store._views.clear()
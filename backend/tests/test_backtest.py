@@ -0,0 +1,76 @@
+"""
+XIRR known answers and the cases where no rate exists.
+"""
+import numpy as np
+import pytest
+
+from app.services.backtest import _xirr, backtest_fund
+
+
+def _solve(*pairs, iterations=100):
+    """One row of (flow, years before the last day) pairs."""
+    flows = np.array([[f for f, _ in pairs]], dtype=np.float64)
+    years = np.array([[y for _, y in pairs]], dtype=np.float64)
+    return float(_xirr(flows, years, iterations)[0])
+
+
+@pytest.mark.parametrize("pairs, expected", [
+    (((-1000, 1), (1100, 0)), 0.10),
+    (((-1000, 2), (1210, 0)), 0.10),
+    (((-1000, 1), (900, 0)), -0.10),
+    (((-1000, 0.5), (1000, 0)), 0.0),
+    (((-100, 1), (-100, 0.5), (100 * 1.05 + 100 * 1.05 ** 0.5, 0)), 0.05),
+    (((-100, 3), (-100, 2), (-100, 1), (100 * (0.8 ** 3 + 0.8 ** 2 + 0.8), 0)), -0.20),
+])
+def test_known_answers(pairs, expected):
+    assert _solve(*pairs) == pytest.approx(expected, abs=1e-7)
+
+
+def test_rows_are_solved_independently_with_padding():
+    flows = np.array([[-1000, 0, 1100], [-100, -100, 100 * 1.05 + 100 * 1.05 ** 0.5], [-50, 0, 0]], dtype=np.float64)
+    years = np.array([[1, 0, 0], [1, 0.5, 0], [1, 0, 0]], dtype=np.float64)
+    rates = _xirr(flows, years)
+    assert rates[0] == pytest.approx(0.10, abs=1e-7)
+    assert rates[1] == pytest.approx(0.05, abs=1e-7)
+    assert np.isnan(rates[2])
+
+
+@pytest.mark.parametrize("pairs", [
+    ((-100, 1), (-100, 0.5), (0, 0)),   # contributions only, nothing left
+    ((100, 1), (50, 0)),                # inflows only
+    ((0, 1), (0, 0)),
+])
+def test_no_sign_change_has_no_rate(pairs):
+    assert np.isnan(_solve(*pairs))
+
+
+def test_not_converged_is_nan():
+    assert np.isnan(_solve((-1000, 3), (5000, 0), iterations=2))
+    assert _solve((-1000, 3), (5000, 0)) == pytest.approx(5 ** (1 / 3) - 1, abs=1e-7)
+
+
+def test_diverging_newton_is_nan():
+    # Flows change sign but net to less than zero at every rate: Newton
+    # runs into the -99.99% floor instead of finding a root
+    assert np.isnan(_solve((-1000, 1), (1000, 0.5), (-2000, 0)))
+
+
+def test_total_loss_reports_no_xirr():
+    # Monthly orders into a fund whose NAV ends at zero
+    days = np.arange(19000, 19000 + 400, dtype=np.int64)
+    navs = np.linspace(1.0, 0.5, len(days))
+    navs[-1] = 0.0
+    orders = [days[:-30:30]]
+    result = backtest_fund(days, navs, int(days[0]), orders, np.array([100.0]), 0.0)[0]
+    assert result["orders"] == len(orders[0])
+    assert result["value"] == 0.0
+    assert result["return"] == pytest.approx(-1.0)
+    assert result["xirr"] is None
+
+
+def test_backtest_fund_xirr_matches_known_growth():
+    # NAV compounding at 10% a year: every order earns exactly 10%
+    days = np.arange(19000, 19000 + 730, dtype=np.int64)
+    navs = 1.1 ** ((days - days[0]) / 365.0)
+    result = backtest_fund(days, navs, int(days[0]), [days[:-1:30]], np.array([1000.0]), 0.0)[0]
+    assert result["xirr"] == pytest.approx(0.10, abs=1e-4)
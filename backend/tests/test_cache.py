@@ -0,0 +1,164 @@
+"""
+TTLCache single-flight loading: concurrent callers (sync or async) share
+one in-flight load, a failing or cancelled owner never leaves waiters
+hanging, and the LRU bound holds.
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.cache import TTLCache
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_sync_waiter_shares_async_load():
+    cache = TTLCache("test-async-owner", ttl=60)
+    calls = []
+    waiter_result = {}
+
+    def waiter():
+        waiter_result["value"] = cache.get_or_load("k", lambda: calls.append("sync") or "sync")
+
+    async def main():
+        thread = threading.Thread(target=waiter)
+
+        async def load():
+            calls.append("async")
+            thread.start()
+            await asyncio.to_thread(_wait_for, lambda: cache.coalesced == 1)
+            return "async"
+
+        value = await cache.aget_or_load("k", load)
+        await asyncio.to_thread(thread.join)
+        return value
+
+    assert asyncio.run(main()) == "async"
+    assert waiter_result["value"] == "async"
+    assert calls == ["async"]
+    assert cache.stats()["inflight"] == 0
+    assert cache.get("k") == "async"
+
+
+def test_async_waiter_shares_sync_load():
+    cache = TTLCache("test-sync-owner", ttl=60)
+    calls = []
+    release = threading.Event()
+
+    def load():
+        calls.append("sync")
+        release.wait(2)
+        return "sync"
+
+    owner = threading.Thread(target=lambda: cache.get_or_load("k", load))
+    owner.start()
+    _wait_for(lambda: calls)
+
+    async def main():
+        async def load_async():
+            calls.append("async")
+            return "async"
+
+        task = asyncio.create_task(cache.aget_or_load("k", load_async))
+        await asyncio.to_thread(_wait_for, lambda: cache.coalesced == 1)
+        release.set()
+        return await task
+
+    assert asyncio.run(main()) == "sync"
+    owner.join()
+    assert calls == ["sync"]
+
+
+def test_owner_exception_reaches_owner_only():
+    cache = TTLCache("test-owner-error", ttl=60)
+    started = threading.Event()
+    owner_error = {}
+    waiter_result = {}
+
+    def failing():
+        started.set()
+        _wait_for(lambda: cache.coalesced == 1)
+        raise RuntimeError("upstream down")
+
+    def owner():
+        try:
+            cache.get_or_load("k", failing)
+        except RuntimeError as e:
+            owner_error["error"] = e
+
+    def waiter():
+        waiter_result["value"] = cache.get_or_load("k", lambda: "not called")
+
+    threads = [threading.Thread(target=owner)]
+    threads[0].start()
+    started.wait(2)
+    threads.append(threading.Thread(target=waiter))
+    threads[1].start()
+    for t in threads:
+        t.join(2)
+
+    assert str(owner_error["error"]) == "upstream down"
+    assert waiter_result["value"] is None  # waiters see a miss, not the owner's exception
+    assert cache.stats()["inflight"] == 0
+    # Nothing cached: the next caller loads again
+    assert cache.get_or_load("k", lambda: "fresh") == "fresh"
+
+
+def test_owner_cancellation_does_not_cancel_waiters():
+    cache = TTLCache("test-owner-cancel", ttl=60)
+
+    async def main():
+        started = asyncio.Event()
+
+        async def hang():
+            started.set()
+            await asyncio.Event().wait()
+
+        async def load():
+            return "waiter"
+
+        owner = asyncio.create_task(cache.aget_or_load("k", hang))
+        await started.wait()
+        waiter = asyncio.create_task(cache.aget_or_load("k", load))
+        while cache.coalesced < 1:
+            await asyncio.sleep(0)
+        owner.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await owner
+        # The waiter retries with its own loader instead of being cancelled
+        return await waiter
+
+    assert asyncio.run(main()) == "waiter"
+    assert cache.stats()["inflight"] == 0
+    assert cache.get("k") == "waiter"
+
+
+def test_lru_eviction_at_capacity():
+    cache = TTLCache("test-lru", ttl=60, max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" becomes most recently used
+    assert cache.get_or_load("c", lambda: 3) == 3
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    stats = cache.stats()
+    assert stats["size"] == 2
+    assert stats["evictions"] == 1
+
+
+def test_falsy_and_expired_values_are_not_served():
+    cache = TTLCache("test-ttl", ttl=60)
+    assert cache.get_or_load("empty", lambda: {}) == {}
+    assert cache.get_or_load("empty", lambda: {"x": 1}) == {"x": 1}
+    cache.set("old", 1, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("old") is None
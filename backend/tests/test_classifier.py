@@ -0,0 +1,68 @@
+"""
+The keyword automaton must return the same sector as the ordered
+first-match loop it replaced: categories in MAJOR_CATEGORIES order,
+`any(kw in name for kw in keywords)`.
+"""
+import random
+
+import pytest
+
+from app.services.classifier import MAJOR_CATEGORIES, KeywordMatcher, classify_sector
+
+
+def _first_match(name):
+    """The old loop."""
+    for category, keywords in MAJOR_CATEGORIES.items():
+        if any(kw in name for kw in keywords):
+            return category
+    return None
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("华夏半导体芯片ETF联接A", "科技"),
+    ("第三代半导体主题混合", "科技"),            # nested: 半导体 inside 第三代半导体
+    ("广发新能源车电池ETF", "能源"),              # 新能源 (能源) ranks before 新能源车 (工业制造)
+    ("嘉实消费电子精选", "科技"),                # 消费电子 (科技) before 消费
+    ("易方达消费行业股票", "消费"),
+    ("南方高端装备混合", "工业制造"),             # keyword listed in two categories
+    ("国泰军工电子指数", "科技"),                # 电子 (科技) before 军工电子 (军工)
+    ("华宝中证银行ETF联接C", "金融"),
+    ("博时黄金股ETF", "材料"),                  # 黄金 and 黄金股 overlap
+    ("招商中证白酒指数", "消费"),
+    ("易方达纳斯达克100(QDII)", "QDII"),
+    ("广发纯债债券A", "债券"),
+    ("某某可转债", "债券"),
+    ("光伏电力储能", "能源"),                    # several matches, first category wins
+    ("环境治理液冷", "环保"),
+    ("平安稳健增长", None),
+    ("", None),
+])
+def test_known_names(name, expected):
+    assert _first_match(name) == expected
+    assert classify_sector(name) == expected
+
+
+def test_random_names_match_old_loop():
+    rng = random.Random(11)
+    keywords = [kw for kws in MAJOR_CATEGORIES.values() for kw in kws]
+    alphabet = sorted({ch for kw in keywords for ch in kw}) + list("混合ABC指数联接型")
+    for _ in range(5000):
+        parts = []
+        for _ in range(rng.randint(1, 4)):
+            if rng.random() < 0.5:
+                kw = rng.choice(keywords)
+                # Partial keywords exercise the failure links
+                parts.append(kw[:rng.randint(1, len(kw))] if rng.random() < 0.3 else kw)
+            else:
+                parts.append("".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))))
+        name = "".join(parts)
+        assert classify_sector(name) == _first_match(name), name
+
+
+def test_matcher_suffix_and_overlap():
+    matcher = KeywordMatcher([("abcd", 2), ("bc", 1), ("cde", 0), ("e", 3)])
+    assert matcher.best("xabcx") == 1        # bc inside a partial abcd
+    assert matcher.best("abcde") == 0        # cde starts inside abcd
+    assert matcher.best("abce") == 1
+    assert matcher.best("e") == 3
+    assert matcher.best("xyz") is None
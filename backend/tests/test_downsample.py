@@ -0,0 +1,61 @@
+"""
+LTTB index selection: bounds, end points, ordering and NaN gaps.
+"""
+import numpy as np
+import pytest
+
+from app.services.downsample import lttb_indices
+
+
+def _series(size, seed=0):
+    rng = np.random.default_rng(seed)
+    x = np.arange(size, dtype=np.float64)
+    return x, np.cumsum(rng.normal(0, 1, size))
+
+
+@pytest.mark.parametrize("size, n", [(10, 10), (10, 50), (1, 3), (0, 3)])
+def test_points_at_least_size_is_identity(size, n):
+    x, y = _series(size)
+    assert lttb_indices(x, y, n).tolist() == list(range(size))
+
+
+@pytest.mark.parametrize("n, expected", [(2, [0, 99]), (1, [0]), (0, [])])
+def test_fewer_than_three_points_keeps_end_points(n, expected):
+    x, y = _series(100)
+    assert lttb_indices(x, y, n).tolist() == expected
+
+
+@pytest.mark.parametrize("size, n", [(100, 3), (100, 10), (1000, 99), (1000, 999), (5, 4)])
+def test_keeps_n_increasing_indices_with_end_points(size, n):
+    x, y = _series(size, seed=size + n)
+    keep = lttb_indices(x, y, n)
+    assert len(keep) == n
+    assert keep[0] == 0 and keep[-1] == size - 1
+    assert np.all(np.diff(keep) > 0)
+
+
+def test_keeps_extremes():
+    x = np.arange(200, dtype=np.float64)
+    y = np.zeros(200)
+    y[73], y[151] = 10.0, -10.0
+    keep = lttb_indices(x, y, 20)
+    assert 73 in keep and 151 in keep
+
+
+def test_nan_points_are_skipped():
+    x, y = _series(500, seed=3)
+    y[[0, 10, 11, 250, 499]] = np.nan
+    x[300] = np.nan
+    keep = lttb_indices(x, y, 50)
+    assert len(keep) == 50
+    assert np.all(np.diff(keep) > 0)
+    assert np.all(np.isfinite(y[keep])) and np.all(np.isfinite(x[keep]))
+    # End points are the first and last finite ones
+    assert keep[0] == 1 and keep[-1] == 498
+
+
+def test_mostly_nan_returns_the_finite_points():
+    x = np.arange(100, dtype=np.float64)
+    y = np.full(100, np.nan)
+    y[[5, 40, 90]] = 1.0
+    assert lttb_indices(x, y, 10).tolist() == [5, 40, 90]
@@ -0,0 +1,153 @@
+"""
+A replay resumed from a checkpoint must give the same curve as a replay
+from scratch, whatever changed: new NAV days, a back-dated trade, a trade
+confirmed before its NAV was published.
+"""
+import numpy as np
+import pytest
+
+from app.config import Config
+from app.db import get_db_connection
+from app.services import equity, nav_history
+
+CODES = ["000001", "000002", "000003"]
+
+
+@pytest.fixture
+def market(db, monkeypatch):
+    monkeypatch.setattr(Config, "EQUITY_CHECKPOINT_INTERVAL", 7)
+    rng = np.random.default_rng(0)
+    days = [str(d) for d in np.busday_offset(np.datetime64("2024-01-02"), np.arange(300), roll="forward")]
+    navs = {c: np.round(np.cumprod(1 + rng.normal(0, 0.01, len(days))), 4) for c in CODES}
+    launch = {"000001": 0, "000002": 0, "000003": 50}
+    published = {c: launch[c] for c in CODES}
+
+    def publish(n):
+        for c in CODES:
+            rows = [(days[i], float(navs[c][i])) for i in range(published[c], n)]
+            nav_history._store(c, rows, None)
+            published[c] = n
+
+    def trade(code, op, i, amount=None, shares=None, applied_at="2025-01-01 00:00:00"):
+        nav = float(navs[code][i])
+        conn = get_db_connection()
+        with conn:
+            if op == "add":
+                conn.execute("""
+                    INSERT INTO transactions (code, op_type, amount_cny, confirm_date, confirm_nav, shares_added, applied_at)
+                    VALUES (?, 'add', ?, ?, ?, ?, ?)
+                """, (code, amount, days[i], nav, round(amount / nav, 4), applied_at))
+            else:
+                conn.execute("""
+                    INSERT INTO transactions (code, op_type, amount_cny, shares_redeemed, confirm_date, confirm_nav, applied_at)
+                    VALUES (?, 'reduce', ?, ?, ?, ?, ?)
+                """, (code, round(shares * nav, 2), shares, days[i], nav, applied_at))
+        conn.close()
+
+    return days, navs, publish, trade
+
+
+def _curve():
+    conn = get_db_connection()
+    try:
+        return [tuple(r) for r in conn.execute("SELECT date, value, net_invested, pnl FROM equity_curve ORDER BY date")]
+    finally:
+        conn.close()
+
+
+def _from_scratch():
+    conn = get_db_connection()
+    with conn:
+        for table in ("equity_curve", "equity_checkpoints", "equity_state"):
+            conn.execute(f"DELETE FROM {table}")
+    conn.close()
+    equity.update_equity_curve()
+    return _curve()
+
+
+def test_backdated_trade_resumes_from_checkpoint(market):
+    days, navs, publish, trade = market
+    publish(200)
+    trade("000001", "add", 10, amount=1000)
+    trade("000002", "add", 30, amount=5000)
+    trade("000003", "add", 60, amount=2000)
+    trade("000001", "reduce", 120, shares=300)
+    assert equity.update_equity_curve() == 190
+    assert equity.update_equity_curve() == 0
+
+    trade("000002", "add", 150, amount=800, applied_at="2025-02-01 00:00:00")
+    rewritten = equity.update_equity_curve()
+    # Only the tail from the last checkpoint before day 150
+    assert 0 < rewritten <= 200 - 150 + Config.EQUITY_CHECKPOINT_INTERVAL
+    resumed = _curve()
+    assert resumed == _from_scratch()
+
+
+def test_new_days_and_late_nav(market):
+    days, navs, publish, trade = market
+    publish(200)
+    trade("000001", "add", 10, amount=1000)
+    trade("000003", "add", 60, amount=2000)
+    equity.update_equity_curve()
+
+    publish(205)
+    assert equity.update_equity_curve() <= 5 + Config.EQUITY_CHECKPOINT_INTERVAL
+    assert _curve() == _from_scratch()
+
+    # Confirmed on a day whose NAV is not stored yet: counted once it arrives
+    trade("000002", "add", 210, amount=500, applied_at="2025-03-01 00:00:00")
+    equity.update_equity_curve()
+    publish(215)
+    equity.update_equity_curve()
+    resumed = _curve()
+    assert resumed == _from_scratch()
+
+    # Last row against a direct sum over the ledger
+    last = resumed[-1]
+    assert last[0] == days[214]
+    expected = sum(
+        round(amount / navs[c][i], 4) * navs[c][214]
+        for c, i, amount in (("000001", 10, 1000), ("000003", 60, 2000), ("000002", 210, 500))
+    )
+    assert last[1] == pytest.approx(expected, abs=0.01)
+    assert last[2] == pytest.approx(3500)
+
+
+def test_same_second_trade_is_replayed(market):
+    days, navs, publish, trade = market
+    publish(200)
+    trade("000001", "add", 10, amount=1000)
+    equity.update_equity_curve()
+    trade("000001", "add", 100, amount=100)  # same applied_at as the stored mark
+    assert equity.update_equity_curve() > 0
+    assert _curve() == _from_scratch()
+
+
+def test_get_equity_curve_does_not_sync(market, monkeypatch):
+    days, navs, publish, trade = market
+    publish(50)
+    trade("000001", "add", 10, amount=1000)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("no upstream sync on the request path")
+    monkeypatch.setattr(nav_history, "sync_fund_history", fail)
+    out = equity.get_equity_curve(points=10)
+    assert len(out["dates"]) == 10
+    assert out["untracked"] == []
+
+
+def test_corrected_nav_is_replayed(market):
+    days, navs, publish, trade = market
+    publish(200)
+    trade("000001", "add", 10, amount=1000)
+    trade("000002", "add", 30, amount=5000)
+    equity.update_equity_curve()
+
+    # Upstream corrects an already stored NAV; the last date does not move
+    nav_history._store("000002", [(days[195], round(float(navs["000002"][195]) * 1.05, 4))], days[199])
+    assert equity.update_equity_curve() > 0
+    resumed = _curve()
+    assert resumed == _from_scratch()
+    assert resumed[195 - 10][1] != pytest.approx(
+        round(1000 / navs["000001"][10], 4) * navs["000001"][195]
+        + round(5000 / navs["000002"][30], 4) * navs["000002"][195], abs=0.01)
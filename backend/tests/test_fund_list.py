@@ -0,0 +1,120 @@
+"""
+Fund list sync writes only the differences (renames, additions,
+removals), and both search paths (FTS5 over funds, the in-memory index)
+agree with the table afterwards.
+"""
+import pytest
+
+from app.config import Config
+from app.db import get_db_connection
+from app.services import fund, fund_list, scheduler, search_index
+
+INITIAL = [
+    ("000001", "华夏成长混合", "混合型-灵活", "HXCZHH"),
+    ("000002", "易方达蓝筹精选", "股票型", "YFDLCJX"),
+    ("000003", "南方稳健纯债", "债券型-长债", "NFWJCZ"),
+]
+NEXT = [
+    ("000001", "华夏半导体精选", "混合型-灵活", "HXBDTJX"),   # renamed
+    ("000002", "易方达蓝筹精选", "股票型", "YFDLCJX"),        # unchanged
+    ("000004", "博时恒生科技指数", "指数型-海外股票", "BSHSKJZS"),  # added; 000003 removed
+]
+
+
+@pytest.fixture
+def funds(db, monkeypatch):
+    monkeypatch.setattr(Config, "SEARCH_INDEX_IN_MEMORY", True)
+    monkeypatch.setattr(search_index, "_index", None)
+    monkeypatch.setattr(fund, "_fts_available", None)
+    fund_list.sync_fund_list(INITIAL)
+
+
+def _stored():
+    conn = get_db_connection()
+    try:
+        return {r["code"]: dict(r) for r in conn.execute("SELECT code, name, type, sector, pinyin, content_hash FROM funds")}
+    finally:
+        conn.close()
+
+
+def _fts(phrase):
+    conn = get_db_connection()
+    try:
+        if not fund._search_index_available(conn.cursor()):
+            pytest.skip("SQLite without FTS5 trigram")
+        rows = conn.execute(
+            "SELECT f.code FROM funds_fts JOIN funds f ON f.rowid = funds_fts.rowid WHERE funds_fts MATCH ?",
+            ('"' + phrase + '"',)
+        ).fetchall()
+    finally:
+        conn.close()
+    return sorted(r["code"] for r in rows)
+
+
+def _index_codes(q):
+    return sorted(r["id"] for r in search_index.get_search_index().search(q, 20))
+
+
+def test_sync_writes_only_differences(funds):
+    before = _stored()
+    counts = fund_list.sync_fund_list(NEXT)
+    assert counts == {"fetched": 3, "inserted": 1, "updated": 1, "deleted": 1, "unchanged": 1}
+
+    after = _stored()
+    assert sorted(after) == ["000001", "000002", "000004"]
+    assert after["000001"]["name"] == "华夏半导体精选"
+    assert after["000001"]["sector"] == "科技"  # reclassified on rename
+    assert after["000001"]["content_hash"] == fund_list.content_hash("华夏半导体精选", "混合型-灵活", "HXBDTJX")
+    assert after["000002"] == before["000002"]
+    assert after["000004"]["sector"] == "科技"
+
+    assert fund_list.sync_fund_list(NEXT) == {"fetched": 3, "inserted": 0, "updated": 0, "deleted": 0, "unchanged": 3}
+
+
+def test_truncated_list_keeps_stored_funds(funds):
+    counts = fund_list.sync_fund_list(INITIAL[:1])
+    assert counts["deleted"] == 0
+    assert sorted(_stored()) == ["000001", "000002", "000003"]
+
+
+def test_fts_follows_the_table(funds):
+    assert _fts("华夏成长") == ["000001"]
+    fund_list.sync_fund_list(NEXT)
+
+    assert _fts("华夏成长") == []            # old name gone
+    assert _fts("半导体") == ["000001"]       # new name indexed
+    assert _fts("南方稳健") == []             # removed fund gone
+    assert _fts("恒生科技") == ["000004"]     # added fund indexed
+    assert _fts("BSHSKJ") == ["000004"]
+    conn = get_db_connection()
+    try:
+        # Raises if the external-content index disagrees with funds
+        conn.execute("INSERT INTO funds_fts (funds_fts) VALUES ('integrity-check')")
+    finally:
+        conn.close()
+
+
+def test_scheduler_sync_reloads_the_memory_index(funds, monkeypatch):
+    search_index.load_search_index()
+    assert _index_codes("华夏成长") == ["000001"]
+
+    monkeypatch.setattr(scheduler, "fetch_fund_list", lambda: NEXT)
+    assert scheduler.fetch_and_update_funds()["updated"] == 1
+
+    index = search_index.get_search_index()
+    assert index.size == 3
+    assert _index_codes("华夏成长") == []
+    assert _index_codes("半导体") == ["000001"]
+    assert _index_codes("南方稳健") == []
+    assert _index_codes("恒生科技") == ["000004"]
+    assert _index_codes("HXBDT") == ["000001"]
+
+
+@pytest.mark.parametrize("q", ["000001", "00000", "HXBDT", "YFD", "半导体", "恒生科技", "精选", "稳健"])
+def test_memory_index_matches_sql_search(funds, monkeypatch, q):
+    fund_list.sync_fund_list(NEXT)
+    search_index.load_search_index()
+    from_index = fund.search_funds(q)
+    monkeypatch.setattr(search_index, "_index", None)
+    from_sql = fund.search_funds(q)
+    assert {r["id"] for r in from_index} == {r["id"] for r in from_sql}
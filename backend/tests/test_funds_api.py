@@ -0,0 +1,57 @@
+"""
+Funds router: query parameters reach the services as documented.
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import Config
+from app.main import app
+from app.routers import funds
+
+
+@pytest.fixture
+def client():
+    # No `with`: the lifespan (scheduler, pools) is not started
+    return TestClient(app)
+
+
+def test_screener_type_filter(client, monkeypatch):
+    calls = []
+    monkeypatch.setattr(funds, "screen_funds", lambda **kwargs: calls.append(kwargs) or {"total": 0, "items": []})
+
+    assert client.get("/api/screener", params={"type": "股票型", "sector": "科技"}).status_code == 200
+    assert calls[-1]["fund_type"] == "股票型"
+    assert calls[-1]["sector"] == "科技"
+
+    assert client.get("/api/screener").status_code == 200
+    assert calls[-1]["fund_type"] is None
+
+
+def test_valuations_dedup_keeps_request_order(client, monkeypatch):
+    requested = []
+
+    async def valuations(codes):
+        requested.append(codes)
+        return {"000002": {"name": "B", "estimate": 1.2}, "000001": {"name": "A", "estimate": 1.1}}
+
+    monkeypatch.setattr(funds, "get_combined_valuations_async", valuations)
+    response = client.get("/api/funds/valuations", params={"codes": "000002, 000001,000002,,000003"})
+    assert response.status_code == 200
+    assert requested == [["000002", "000001", "000003"]]
+    assert response.json() == [
+        {"id": "000002", "name": "B", "estimate": 1.2},
+        {"id": "000001", "name": "A", "estimate": 1.1},
+        {"id": "000003"},
+    ]
+
+
+def test_valuations_rejects_too_many_codes(client, monkeypatch):
+    async def valuations(codes):
+        return {}
+
+    monkeypatch.setattr(Config, "VALUATION_BATCH_MAX_CODES", 3)
+    monkeypatch.setattr(funds, "get_combined_valuations_async", valuations)
+    codes = ",".join(f"{i:06d}" for i in range(4))
+    assert client.get("/api/funds/valuations", params={"codes": codes}).status_code == 400
+    # Duplicates do not count against the limit
+    assert client.get("/api/funds/valuations", params={"codes": "000001,000001,000002,000003,000003"}).status_code == 200
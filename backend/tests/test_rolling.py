@@ -0,0 +1,157 @@
+"""
+The O(1) rolling state must equal a batch recomputation over the last
+ROLLING_WINDOW NAVs after every update.
+"""
+import math
+
+import numpy as np
+import pytest
+
+from app.config import Config
+from app.services import nav_history, nav_store, rolling
+
+CODE = "000001"
+WINDOW = 20
+
+
+@pytest.fixture(params=[False, True], ids=["db", "nav_store"])
+def store(request, db, monkeypatch):
+    monkeypatch.setattr(Config, "ROLLING_WINDOW", WINDOW)
+    monkeypatch.setattr(Config, "NAV_STORE_ENABLED", request.param)
+
+
+def _append(dates, navs):
+    nav_history._store(CODE, list(zip(dates, navs)), None)
+    if Config.NAV_STORE_ENABLED:
+        nav_store.rebuild_from_db(CODE)
+
+
+def _batch(navs):
+    """Reference: indicators of the last WINDOW NAVs, computed directly."""
+    w = np.asarray(navs[-WINDOW:], dtype=np.float64)
+    r = np.diff(w) / w[:-1]
+    count = len(w)
+    expected = {
+        "count": count,
+        "first_nav": w[0],
+        "last_nav": w[-1],
+        "sum_r": float(np.sum(r)),
+        "sum_r2": float(np.sum(r * r)),
+        "peak_nav": float(np.max(w)),
+        "max_drawdown": float(np.min(w / np.maximum.accumulate(w) - 1)),
+        "ath_nav": float(np.max(navs)),
+    }
+    sharpe = None
+    if count >= rolling.MIN_POINTS:
+        volatility = np.std(r) * math.sqrt(rolling.TRADING_DAYS)
+        annual = (w[-1] / w[0]) ** (rolling.TRADING_DAYS / count) - 1
+        sharpe = (annual - rolling.RISK_FREE_RATE) / volatility if volatility > 0 else 0.0
+    return expected, sharpe
+
+
+def _assert_state(navs):
+    expected, sharpe = _batch(navs)
+    state = rolling._load_state(CODE)
+    for key, value in expected.items():
+        assert state[key] == pytest.approx(value, rel=1e-9, abs=1e-12), key
+    series = rolling.get_rolling_series(CODE, limit=1)
+    if sharpe is None:
+        assert series["sharpe"][-1] is None
+    else:
+        assert series["sharpe"][-1] == pytest.approx(sharpe, abs=1e-4)
+    assert series["drawdown"][-1] == pytest.approx(navs[-1] / max(navs) - 1, abs=1e-6)
+
+
+def _dates(n, rng):
+    """Trading-like dates with random gaps (weekends, holidays)."""
+    steps = rng.choice([1, 1, 1, 3, 5], size=n)
+    days = np.datetime64("2020-01-02") + np.cumsum(steps)
+    return [str(d) for d in days]
+
+
+def _replay(dates, navs, rng):
+    """Deliver the series in random batches of 1-3 NAVs, checking after each."""
+    i = 0
+    while i < len(navs):
+        j = min(len(navs), i + int(rng.integers(1, 4)))
+        _append(dates[i:j], navs[i:j])
+        rolling.update_rolling(CODE)
+        _assert_state(navs[:j])
+        i = j
+
+
+def test_random_series_matches_batch(store):
+    rng = np.random.default_rng(7)
+    n = 150
+    navs = np.round(np.cumprod(1 + rng.normal(0.0005, 0.02, n)), 4).tolist()
+    _replay(_dates(n, rng), navs, rng)
+
+
+def test_peak_leaving_window(store):
+    # Peak early, then a long decline: the peak and the max-drawdown peak leave the window
+    rng = np.random.default_rng(1)
+    up = np.linspace(1.0, 2.0, 15)
+    down = np.linspace(1.95, 1.2, 40)
+    rebound = np.linspace(1.25, 1.6, 15)
+    navs = np.round(np.concatenate([up, down, rebound]), 4).tolist()
+    _replay(_dates(len(navs), rng), navs, rng)
+
+
+def test_equal_peaks_and_flat_window(store):
+    rng = np.random.default_rng(2)
+    navs = ([1.0] * 25) + [1.1, 1.0, 1.1, 1.0] * 10
+    _replay(_dates(len(navs), rng), navs, rng)
+
+
+def test_redelivered_nav_is_noop(store):
+    rng = np.random.default_rng(3)
+    dates = _dates(40, rng)
+    navs = np.round(np.cumprod(1 + rng.normal(0, 0.01, 40)), 4).tolist()
+    _append(dates, navs)
+    rolling.update_rolling(CODE)
+    _append(dates[-3:], navs[-3:])
+    assert rolling.update_rolling(CODE) == 0
+    _assert_state(navs)
+
+
+def test_corrected_last_nav_rebuilds(store):
+    rng = np.random.default_rng(4)
+    dates = _dates(40, rng)
+    navs = np.round(np.cumprod(1 + rng.normal(0, 0.01, 40)), 4).tolist()
+    _append(dates, navs)
+    rolling.update_rolling(CODE)
+    navs[-1] = round(navs[-1] * 1.03, 4)
+    conn = nav_history.get_db_connection()
+    with conn:
+        conn.execute("UPDATE fund_history SET nav = ? WHERE code = ? AND date = ?", (navs[-1], CODE, dates[-1]))
+    conn.close()
+    if Config.NAV_STORE_ENABLED:
+        nav_store.rebuild_from_db(CODE)
+    rolling.update_rolling(CODE)
+    _assert_state(navs)
+
+
+def test_sync_applies_upstream_correction_mid_window(store, monkeypatch):
+    rng = np.random.default_rng(5)
+    dates = _dates(40, rng)
+    navs = np.round(np.cumprod(1 + rng.normal(0, 0.01, 40)), 4).tolist()
+    _append(dates, navs)
+    rolling.update_rolling(CODE)
+    upstream = list(zip(dates, navs))
+
+    async def fetch(code, start_date):
+        return [r for r in upstream if r[0] >= start_date]
+
+    monkeypatch.setattr(nav_history, "fetch_lsjz_since", fetch)
+    # The refetched overlap is unchanged: nothing to write
+    assert nav_history.sync_fund_history(CODE, force=True) == 0
+    assert nav_history.history_version(CODE) == dates[-1]
+
+    # Upstream corrects a NAV a few days back, inside the refetch overlap
+    navs[-3] = round(navs[-3] * 0.97, 4)
+    upstream[-3] = (dates[-3], navs[-3])
+    assert nav_history.sync_fund_history(CODE, force=True) == 1
+    assert nav_history.history_version(CODE) == f"{dates[-1]}#1"
+    _, stored = nav_store.load_arrays(CODE)
+    assert stored[-3] == navs[-3]
+    _assert_state(navs)
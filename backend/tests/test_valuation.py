@@ -0,0 +1,105 @@
+"""
+Hedged multi-source valuation: Eastmoney first, Sina for codes Eastmoney
+has not answered within the hedge delay, holdings estimate for the rest.
+Upstreams are stubbed.
+"""
+import asyncio
+
+import pytest
+
+from app.db import get_db_connection
+from app.services import fund, http_client
+
+EM = {"name": "华夏成长混合", "nav": 1.0, "estimate": 1.01, "estRate": 1.0, "time": "2026-10-16 10:00"}
+SINA = {"nav": 1.0, "estimate": 1.02, "estRate": 2.0, "time": "2026-10-16 10:00:00"}
+LOCAL = {"nav": 1.0, "estimate": 1.03, "estRate": 3.0, "source": "holdings"}
+
+
+@pytest.fixture
+def upstream(db, monkeypatch):
+    conn = get_db_connection()
+    with conn:
+        conn.executemany("INSERT INTO funds (code, name, type) VALUES (?, ?, ?)",
+                         [("000001", "华夏成长混合", "混合型"), ("000002", "易方达沪深300ETF联接", "指数型")])
+    conn.close()
+
+    calls = {"eastmoney": [], "sina": [], "local": []}
+    state = {"em_delay": 0.0, "em": {}, "sina": {}, "local": {}, "open": set()}
+
+    async def eastmoney(code):
+        calls["eastmoney"].append(code)
+        await asyncio.sleep(state["em_delay"])
+        return dict(state["em"].get(code, {}))
+
+    async def sina(codes):
+        calls["sina"].append(list(codes))
+        return {c: dict(state["sina"][c]) for c in codes if c in state["sina"]}
+
+    async def local(codes):
+        calls["local"].append(list(codes))
+        return {c: dict(state["local"][c]) for c in codes if c in state["local"]}
+
+    monkeypatch.setattr(fund, "fetch_eastmoney_valuation", eastmoney)
+    monkeypatch.setattr(fund, "fetch_sina_valuations", sina)
+    monkeypatch.setattr(fund, "estimate_from_holdings_async", local)
+    monkeypatch.setattr(fund, "_hedge_delay", lambda: 0.05)
+    monkeypatch.setattr(http_client, "source_available", lambda source: source not in state["open"])
+    return state, calls
+
+
+def _fetch(codes):
+    return asyncio.run(fund._fetch_combined_valuations(codes))
+
+
+def test_eastmoney_in_time_skips_sina(upstream):
+    state, calls = upstream
+    state["em"] = {"000001": EM}
+    state["sina"] = {"000001": SINA}
+    out = _fetch(["000001"])
+    assert out["000001"]["estimate"] == EM["estimate"]
+    assert calls["sina"] == []
+
+
+def test_slow_eastmoney_is_hedged_and_name_backfilled(upstream):
+    state, calls = upstream
+    state["em_delay"] = 1.0
+    state["em"] = {"000002": EM}
+    state["sina"] = {"000002": SINA}
+    out = _fetch(["000002"])
+    assert out["000002"]["estimate"] == SINA["estimate"]
+    assert calls["sina"] == [["000002"]]
+    # Sina has no name: taken from the funds table
+    assert out["000002"]["name"] == "易方达沪深300ETF联接"
+
+
+def test_open_breaker_skips_eastmoney(upstream):
+    state, calls = upstream
+    state["open"] = {"eastmoney"}
+    state["em"] = {"000001": EM}
+    state["sina"] = {"000001": SINA}
+    out = _fetch(["000001"])
+    assert calls["eastmoney"] == []
+    assert out["000001"]["estimate"] == SINA["estimate"]
+    assert out["000001"]["name"] == "华夏成长混合"
+
+
+def test_both_breakers_open_use_holdings_estimate(upstream):
+    state, calls = upstream
+    state["open"] = {"eastmoney", "sina"}
+    state["local"] = {"000001": LOCAL}
+    out = _fetch(["000001", "000002"])
+    assert calls["eastmoney"] == [] and calls["sina"] == []
+    assert calls["local"] == [["000001", "000002"]]
+    assert out["000001"]["estimate"] == LOCAL["estimate"]
+    assert out["000001"]["name"] == "华夏成长混合"
+    assert out["000002"] == {}  # nothing known: not given a bare name (would be cached)
+
+
+def test_estimate_merges_into_answer_without_estimate(upstream):
+    state, calls = upstream
+    # Eastmoney answers in time but without an estimate (e.g. closed QDII): Sina fills it in
+    state["em"] = {"000001": {**EM, "estimate": 0.0}}
+    state["sina"] = {"000001": SINA}
+    out = _fetch(["000001"])
+    assert out["000001"]["estimate"] == SINA["estimate"]
+    assert out["000001"]["name"] == EM["name"]
@@ -11,7 +11,7 @@ import { FundDetail } from './pages/FundDetail';
 import Account from './pages/Account';
 import Settings from './pages/Settings';
 import { SubscribeModal } from './components/SubscribeModal';
-import { searchFunds, getFundDetail, getAccountPositions, subscribeFund } from './services/api';
+import { searchFunds, getFundDetail, subscribeValuations, getAccountPositions, subscribeFund } from './services/api';
 import packageJson from '../../package.json';
 
 const APP_VERSION = packageJson.version;
@@ -70,30 +70,36 @@ export default function App() {
   
   // --- Data Fetching ---
   
-  // Polling for updates
+  // Live estimates pushed by the server (only changed funds are sent)
+  const watchIds = watchlist.map(f => f.id).join(',');
+
+  useEffect(() => {
+    if (!watchIds) return;
+
+    const source = subscribeValuations(watchIds.split(','), (updates) => {
+        const byId = new Map(updates.map(v => [v.id, v]));
+        setWatchlist(prev => prev.map(fund => byId.has(fund.id) ? { ...fund, ...byId.get(fund.id) } : fund));
+    });
+    return () => source.close();
+  }, [watchIds]);
+
+  // The open fund's intraday sections (estimate, holdings quotes) are refreshed;
+  // profile and indicators only change with a new NAV and keep their loaded values
   useEffect(() => {
-    if (watchlist.length === 0) return;
+    if (!detailFundId) return;
 
     const tick = async () => {
         try {
-            const updatedList = await Promise.all(watchlist.map(async (fund) => {
-                try {
-                    const detail = await getFundDetail(fund.id);
-                    return { ...fund, ...detail };
-                } catch (e) {
-                    console.error(e);
-                    return fund;
-                }
-            }));
-            setWatchlist(updatedList); 
+            const detail = await getFundDetail(detailFundId, ['estimate', 'holdings']);
+            setWatchlist(prev => prev.map(fund => fund.id === detail.id ? { ...fund, ...detail } : fund));
         } catch (e) {
-             console.error("Polling error", e);
+            console.error("Polling error", e);
         }
     };
 
     const interval = setInterval(tick, 15000);
     return () => clearInterval(interval);
-  }, [watchlist]); 
+  }, [detailFundId]);
 
 
   // --- Handlers ---
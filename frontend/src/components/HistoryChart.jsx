@@ -2,6 +2,9 @@ import React, { useEffect, useState } from 'react';
 import { AreaChart, Area, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer } from 'recharts';
 import { getFundHistory } from '../services/api';
 
+// The chart is a few hundred pixels wide; longer ranges are downsampled server-side
+const CHART_POINTS = 400;
+
 const RANGES = [
   { label: '近1周', val: 5 },
   { label: '近1月', val: 22 },
@@ -22,7 +25,7 @@ export const HistoryChart = ({ fundId }) => {
     const fetchHistory = async () => {
       setLoading(true);
       try {
-        const history = await getFundHistory(fundId, range);
+        const history = await getFundHistory(fundId, range, range > CHART_POINTS ? CHART_POINTS : null);
         setData(history);
       } catch (e) {
         console.error("Failed to load history", e);
@@ -1,6 +1,6 @@
 import React, { useState, useEffect, useRef } from 'react';
 import { Plus, X, Edit2, Trash2, RefreshCw, ArrowUpDown, ChevronDown, TrendingUp, TrendingDown, History } from 'lucide-react';
-import { getAccountPositions, updatePosition, deletePosition, addPositionTrade, reducePositionTrade, getTransactions } from '../services/api';
+import { getAccountPositions, subscribeValuations, updatePosition, deletePosition, addPositionTrade, reducePositionTrade, getTransactions } from '../services/api';
 import { getRateColor } from '../components/StatCard';
 import { PortfolioChart } from '../components/PortfolioChart';
 
@@ -18,6 +18,62 @@ function buildTradeTime(dateStr, cutoff) {
   return `${dateStr}T${time}`;
 }
 
+const round2 = (x) => Math.round(x * 100) / 100;
+
+// 将推送的估值增量应用到已加载的持仓（与后端 build_positions 相同的计算），
+// 不再为每次推送重新请求 /account/positions
+function applyValuationUpdates(data, updates) {
+  const byCode = Object.fromEntries(updates.map(u => [u.id, u]));
+  const positions = (data.positions || []).map(p => {
+    const u = byCode[p.code];
+    if (!u || p.name === 'Error') return p;
+    const nav = Number(u.nav ?? p.nav) || 0;
+    const estimate = Number(u.estimate ?? p.estimate) || 0;
+    const estRate = Number(u.estRate ?? u.est_rate ?? p.est_rate) || 0;
+    const name = u.name || p.name;
+    const isEstValid = estimate > 0 && nav > 0 && (Math.abs(estRate) < 10 || name.includes('ETF') || name.includes('联接'));
+    const costBasis = p.cost * p.shares;
+    const navMarketValue = nav * p.shares;
+    const accumulatedIncome = navMarketValue - costBasis;
+    const dayIncome = isEstValid ? (estimate - nav) * p.shares : 0;
+    const estMarketValue = isEstValid ? estimate * p.shares : navMarketValue;
+    const totalIncome = accumulatedIncome + dayIncome;
+    return {
+      ...p,
+      name,
+      nav,
+      nav_date: u.navDate || p.nav_date,
+      estimate,
+      est_rate: estRate,
+      is_est_valid: isEstValid,
+      nav_market_value: round2(navMarketValue),
+      est_market_value: round2(estMarketValue),
+      accumulated_income: round2(accumulatedIncome),
+      accumulated_return_rate: costBasis > 0 ? round2(accumulatedIncome / costBasis * 100) : 0,
+      day_income: round2(dayIncome),
+      total_income: round2(totalIncome),
+      total_return_rate: costBasis > 0 ? round2(totalIncome / costBasis * 100) : 0,
+      update_time: u.time || p.update_time,
+    };
+  });
+  const totalMarketValue = positions.reduce((s, p) => s + (p.est_market_value || 0), 0);
+  const totalCost = positions.reduce((s, p) => s + (p.cost_basis || 0), 0);
+  const totalDayIncome = positions.reduce((s, p) => s + (p.day_income || 0), 0);
+  const totalIncome = totalMarketValue - totalCost;
+  return {
+    ...data,
+    summary: {
+      ...data.summary,
+      total_market_value: round2(totalMarketValue),
+      total_cost: round2(totalCost),
+      total_day_income: round2(totalDayIncome),
+      total_income: round2(totalIncome),
+      total_return_rate: totalCost > 0 ? round2(totalIncome / totalCost * 100) : 0,
+    },
+    positions: positions.sort((a, b) => b.est_market_value - a.est_market_value),
+  };
+}
+
 const SORT_OPTIONS = [
   { label: '预估总值（从高到低）', key: 'est_market_value', direction: 'desc' },
   { label: '预估总值（从低到高）', key: 'est_market_value', direction: 'asc' },
@@ -125,16 +181,22 @@ const Account = ({ onSelectFund, onPositionChange, onSyncWatchlist, syncLoading,
     fetchData();
   }, []);
 
-  // 轮询机制：每 15 秒自动刷新数据（静默模式）
+  // 推送机制：估值变化直接在本地重算持仓（替代 15 秒轮询）
+  const positionCodes = (data.positions || []).map(p => p.code).join(',');
+
   useEffect(() => {
-    if (!isActive) return;
+    if (!isActive || !positionCodes) return;
 
-    const interval = setInterval(() => {
-      fetchData(); // 静默刷新
-    }, 15000);
+    const source = subscribeValuations(positionCodes.split(','), (updates) => {
+      setData(prev => {
+        const next = applyValuationUpdates(prev, updates);
+        localStorage.setItem('account_data_cache', JSON.stringify(next));
+        return next;
+      });
+    });
 
-    return () => clearInterval(interval);
-  }, [isActive]);
+    return () => source.close();
+  }, [isActive, positionCodes]);
 
   // 点击外部关闭下拉菜单
   useEffect(() => {
@@ -16,9 +16,11 @@ export const searchFunds = async (query) => {
   }
 };
 
-export const getFundDetail = async (fundId) => {
+// fields: sections to compute, e.g. ['estimate', 'holdings'] (default: all)
+export const getFundDetail = async (fundId, fields = null) => {
   try {
-    const response = await api.get(`/fund/${fundId}`);
+    const params = fields ? { fields: fields.join(',') } : {};
+    const response = await api.get(`/fund/${fundId}`, { params });
     return response.data;
   } catch (error) {
     console.error(`Get fund ${fundId} failed`, error);
@@ -26,10 +28,32 @@ export const getFundDetail = async (fundId) => {
   }
 };
 
-export const getFundHistory = async (fundId, limit = 30) => {
+// Server-Sent Events: onUpdate receives only the estimates that changed
+export const subscribeValuations = (fundIds, onUpdate) => {
+  const url = `${API_BASE_URL}/stream/valuations?codes=${encodeURIComponent(fundIds.join(','))}`;
+  const source = new EventSource(url);
+  source.addEventListener('valuations', (event) => {
     try {
-        const response = await api.get(`/fund/${fundId}/history`, { params: { limit } });
-        return response.data;
+      onUpdate(JSON.parse(event.data));
+    } catch (error) {
+      console.error("Bad valuation event", error);
+    }
+  });
+  return source;
+};
+
+export const getFundHistory = async (fundId, limit = 30, points = null) => {
+    try {
+        if (!points) {
+            const response = await api.get(`/fund/${fundId}/history`, { params: { limit } });
+            return response.data;
+        }
+        // Downsampled on the server (LTTB), columnar payload
+        const response = await api.get(`/fund/${fundId}/history`, {
+            params: { limit, points, format: 'columns' }
+        });
+        const { dates = [], navs = [] } = response.data || {};
+        return dates.map((date, i) => ({ date, nav: navs[i] }));
     } catch (error) {
         console.error("Get history failed", error);
         return [];